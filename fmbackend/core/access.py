@@ -0,0 +1,62 @@
+"""Group permission resolver.
+
+A user's ``{group_id: permissions}`` map is loaded once per request (memoised
+on the user object) and cached across requests under a per-user key. The
+cache entry is dropped whenever one of the user's ``UserGroup`` rows is saved
+or deleted (see ``core.signals``).
+"""
+from django.core.cache import cache
+
+from .models import UserGroup
+from . import profiling
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f'core:group-permissions:{user_id}'
+
+
+def _group_id(group):
+    return getattr(group, 'pk', group)
+
+
+def get_memberships(user):
+    """Return ``{group_id: permissions}`` for ``user`` in membership order."""
+    memberships = getattr(user, '_group_permissions', None)
+    if memberships is not None:
+        return memberships
+    key = _cache_key(user.pk)
+    with profiling.span('access'):
+        memberships = cache.get(key)
+        if memberships is None:
+            memberships = dict(
+                UserGroup.objects.filter(user=user).order_by('pk').values_list('group_id', 'permissions'))
+            cache.set(key, memberships, CACHE_TIMEOUT)
+    user._group_permissions = memberships
+    return memberships
+
+
+def invalidate(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def can(user, group, resource, level='read'):
+    """Whether ``user`` may access ``resource`` in ``group`` at ``level``.
+
+    Members need a non-``none`` permission for the resource; admins need only
+    that, everyone else needs ``level`` or ``write``.
+    """
+    return allows(user.role, get_memberships(user).get(_group_id(group)), resource, level)
+
+
+def allows(role, permissions, resource, level='read'):
+    """``can`` for a membership's raw ``permissions`` dict and the member's role."""
+    if permissions is None or permissions.get(resource, 'none') == 'none':
+        return False
+    return role == 'admin' or permissions.get(resource) in [level, 'write']
+
+
+def group_ids(user, resource, level='read'):
+    """Ids of the groups in which ``user`` can access ``resource`` at ``level``."""
+    return [group_id for group_id in get_memberships(user) if can(user, group_id, resource, level)]
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, FamilyGroup, UserGroup, Asset, Transaction, Document, Notification
+from .models import User, FamilyGroup, UserGroup, Asset, Transaction, Document, Blob, Notification, MonthlyRollup, Job
 
 # Custom User Admin
 class UserAdmin(BaseUserAdmin):
@@ -82,7 +82,7 @@ class AssetAdmin(admin.ModelAdmin):
     list_filter = ('type', 'group__name', 'last_updated')
     search_fields = ('name', 'group__name', 'api_source')
     fieldsets = (
-        (None, {'fields': ('group', 'type', 'name', 'value', 'api_source')}),
+        (None, {'fields': ('group', 'type', 'name', 'value', 'api_source', 'units')}),
         ('Metadata', {'fields': ('last_updated',)}),
     )
     readonly_fields = ('last_updated',)
@@ -166,5 +166,29 @@ class NotificationAdmin(admin.ModelAdmin):
         return obj.message[:50] + ('...' if len(obj.message) > 50 else '')
     message_preview.short_description = 'Message'
 
+# Monthly Rollup Admin
+@admin.register(MonthlyRollup)
+class MonthlyRollupAdmin(admin.ModelAdmin):
+    """Read-only view of the per-group monthly transaction rollups."""
+    list_display = ('group', 'month', 'category', 'income', 'expense', 'count')
+    list_filter = ('month', 'group__name')
+    readonly_fields = ('group', 'month', 'category', 'income', 'expense', 'count')
+
+# Background Job Admin
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Queued, running and finished background jobs."""
+    list_display = ('task', 'status', 'run_at', 'attempts', 'max_attempts', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('attempts', 'claimed_by', 'claimed_at', 'last_error', 'created_at', 'finished_at')
+
+# Stored Document Blob Admin
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    """Read-only view of the deduplicated document contents."""
+    list_display = ('sha256', 'name', 'size', 'ref_count', 'last_used_at')
+    search_fields = ('sha256', 'name')
+    readonly_fields = ('sha256', 'name', 'size', 'ref_count', 'last_used_at')
+
 # Register custom User model with UserAdmin
 admin.site.register(User, UserAdmin)
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""Batch detection of unusual transactions (``Transaction.is_unusual``).
+
+Transactions are loaded once as NumPy columns and scored without per-row
+Python. Rows are scored in month-sized slices; each slice's reference window
+is the preceding ``WINDOW_DAYS`` of the same groups, from which we take:
+
+* the per (group, category) median and MAD of the amount, giving a robust
+  z-score ``0.6745 * |amount - median| / MAD``;
+* whether the description is new for the group (first time it appears);
+* how rare the transaction's hour of day is for the group.
+
+A transaction is unusual when ``z + merchant/hour bonuses >= THRESHOLD``.
+Incremental runs only score rows created since the last watermark, less
+``OVERLAP``: ``created_at`` is set when a row is inserted, not when its
+transaction commits, so a row can become visible after a run has moved the
+watermark past it. Rescoring a row is idempotent.
+"""
+import uuid
+from datetime import timedelta
+
+import numpy as np
+from django.db import connections
+from django.db.models import BooleanField, ExpressionWrapper, FloatField, Func, Max, Min, Q, Value
+from django.utils import timezone
+
+from .models import Transaction, Watermark
+from . import changes
+
+WATERMARK = 'unusual-transactions'
+WINDOW_DAYS = 365
+MIN_HISTORY = 5  # Category rows needed before its amounts are trusted
+THRESHOLD = 3.5
+NEW_MERCHANT_WEIGHT = 1.5
+ODD_HOUR_WEIGHT = 1.0
+ODD_HOUR_SHARE = 0.02  # Hours holding less than this share of a group's rows are odd
+MIN_HOUR_HISTORY = 50
+UPDATE_CHUNK = 500
+OVERLAP = timedelta(minutes=5)  # Longer than any transaction that inserts transactions stays open
+TICKS_PER_UNIT = 200
+
+COLUMNS = ('id', 'group_id', 'category', 'amount', 'ts', 'description', 'is_unusual', 'target')
+
+
+def _codes(values):
+    """Dense integer codes for hashable values, plus the distinct values in code order."""
+    lookup = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    return np.fromiter(map(lookup.__getitem__, values), dtype=np.int64, count=len(values)), list(lookup)
+
+
+def _segment_median(keys, values, size):
+    """Median of ``values`` for each key in ``range(size)`` (NaN where a key has no rows)."""
+    # Amounts have two decimals, so values and their deviations from a median are exact
+    # multiples of half a cent: sorting one int64 (key, value) code beats a lexsort.
+    ticks = np.rint((values - values.min()) * TICKS_PER_UNIT).astype(np.int64) if len(values) else values
+    span = int(ticks.max()) + 1 if len(ticks) else 1
+    if size * span < 2 ** 62:
+        order = np.argsort(keys * span + ticks)
+    else:
+        order = np.lexsort((ticks, keys))
+    values = values[order]
+    counts = np.bincount(keys, minlength=size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = np.full(size, np.nan)
+    present = counts > 0
+    lo = starts[present] + (counts[present] - 1) // 2
+    hi = starts[present] + counts[present] // 2
+    medians[present] = (values[lo] + values[hi]) / 2
+    return medians, counts
+
+
+class Epoch(Func):
+    """Seconds since 1970 of a datetime column, computed by the database."""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)',
+                           **extra_context)
+
+
+class Ledger:
+    """Column arrays for a set of transactions, ordered by date."""
+
+    def __init__(self, rows):
+        columns = np.array(rows, dtype=object).reshape(-1, len(COLUMNS)).T
+        ids, groups, categories, amounts, dates, descriptions, flags, targets = columns
+        dates = dates.astype(np.float64)
+        order = np.argsort(dates, kind='stable')
+        self.size = len(order)
+        self.ts = dates[order]
+        self.ids = ids[order]
+        group, self.group_ids = _codes(groups)
+        category, categories = _codes(categories)
+        description, descriptions = _codes(descriptions)
+        self.n_groups = len(self.group_ids)
+        self.group = group[order]
+        self.key = (group * max(len(categories), 1) + category)[order]
+        self.n_keys = self.n_groups * max(len(categories), 1)
+        self.merchant = (group * max(len(descriptions), 1) + description)[order]
+        self.amount = amounts.astype(np.float64)[order]
+        self.flags = flags.astype(bool)[order]
+        self.targets = np.flatnonzero(targets.astype(bool)[order])
+        offset = timezone.localtime().utcoffset().total_seconds()
+        self.hour = ((self.ts + offset) // 3600 % 24).astype(np.int64)
+        self.month = (self.ts + offset) // (86400 * 31)  # Coarse month buckets are fine for slicing
+
+    @classmethod
+    def load(cls, queryset, targets=None):
+        """Load ``queryset``; rows matching the ``targets`` Q (default: all) are the ones to score."""
+        # Plain cursor rows with epoch seconds from the database: the ORM's per-value
+        # UUID/datetime converters (and an ORDER BY) cost more than the scoring itself.
+        target = ExpressionWrapper(targets, output_field=BooleanField()) if targets else Value(True)
+        queryset = queryset.order_by().annotate(ts=Epoch('date'), target=target)
+        sql, params = queryset.values_list(*COLUMNS).query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cls(cursor.fetchall())
+
+    def score(self, targets):
+        """Unusual flags for the row indices in ``targets``."""
+        result = np.zeros(len(targets), dtype=bool)
+        if not len(targets):
+            return result
+
+        # First appearance of each (group, description) within the loaded window
+        _, first = np.unique(self.merchant, return_index=True)
+        new_merchant = np.zeros(self.size, dtype=bool)
+        new_merchant[first] = True
+
+        window = WINDOW_DAYS * 86400
+        months = self.month[targets]
+        for month in np.unique(months):
+            in_month = months == month
+            idx = targets[in_month]
+            lo = np.searchsorted(self.ts, self.ts[idx].min() - window, side='left')
+            hi = np.searchsorted(self.ts, self.ts[idx].max(), side='right')
+            ref = np.arange(lo, hi)
+
+            medians, counts = _segment_median(self.key[ref], self.amount[ref], self.n_keys)
+            deviation = np.abs(self.amount[ref] - medians[self.key[ref]])
+            mads, _ = _segment_median(self.key[ref], deviation, self.n_keys)
+
+            key = self.key[idx]
+            scale = np.maximum(mads[key], np.maximum(0.01 * np.abs(medians[key]), 1.0))
+            z = 0.6745 * np.abs(self.amount[idx] - medians[key]) / scale
+            z = np.where(counts[key] >= MIN_HISTORY, z, 0.0)
+
+            hours = np.bincount(self.group[ref] * 24 + self.hour[ref], minlength=self.n_groups * 24)
+            totals = np.bincount(self.group[ref], minlength=self.n_groups)
+            share = hours[self.group[idx] * 24 + self.hour[idx]] / np.maximum(totals[self.group[idx]], 1)
+            odd_hour = (totals[self.group[idx]] >= MIN_HOUR_HISTORY) & (share < ODD_HOUR_SHARE)
+
+            score = z + NEW_MERCHANT_WEIGHT * new_merchant[idx] + ODD_HOUR_WEIGHT * odd_hour
+            result[in_month] = score >= THRESHOLD
+        return result
+
+    def apply(self, targets, flags):
+        """Write changed flags back with chunked ``UPDATE ... WHERE id IN`` statements."""
+        differs = flags != self.flags[targets]
+        changed, values = targets[differs], flags[differs]
+        for value in (True, False):
+            ids = list(self.ids[changed[values == value]])
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                Transaction.objects.filter(id__in=ids[start:start + UPDATE_CHUNK]).update(is_unusual=value)
+        # update() skips the save signals
+        for group in np.unique(self.group[changed]):
+            changes.bump_group(uuid.UUID(str(self.group_ids[group])))
+        return len(changed)
+
+
+def rescore(group_ids=None):
+    """Score every transaction (optionally only in ``group_ids``)."""
+    queryset = Transaction.objects.all()
+    if group_ids is not None:
+        queryset = queryset.filter(group_id__in=group_ids)
+    latest = queryset.aggregate(created=Max('created_at'))['created']
+    ledger = Ledger.load(queryset)
+    flags = ledger.score(ledger.targets)
+    changed = ledger.apply(ledger.targets, flags)
+    if group_ids is None and latest is not None:
+        # Everything up to here has been scored; the next incremental run starts after it
+        Watermark.objects.update_or_create(name=WATERMARK, defaults={'value': latest})
+    return {'scored': ledger.size, 'unusual': int(flags.sum()), 'changed': changed}
+
+
+def score_new():
+    """Score transactions created since the last run and advance the watermark."""
+    watermark = Watermark.objects.filter(name=WATERMARK).first()
+    new = Transaction.objects.all()
+    since = watermark.value - OVERLAP if watermark is not None else None
+    if since is not None:
+        new = new.filter(created_at__gte=since)
+    bounds = new.aggregate(created=Max('created_at'), start=Min('date'), end=Max('date'))
+    if bounds['created'] is None:
+        return {'scored': 0, 'unusual': 0, 'changed': 0}
+
+    created = Q(created_at__lte=bounds['created'])
+    if since is not None:
+        created &= Q(created_at__gte=since)
+    ledger = Ledger.load(Transaction.objects.filter(
+        group__in=new.values('group_id').distinct(),
+        date__gte=bounds['start'] - timedelta(days=WINDOW_DAYS),
+        date__lte=bounds['end'],
+    ), targets=created)
+    flags = ledger.score(ledger.targets)
+    changed = ledger.apply(ledger.targets, flags)
+
+    # Never moves back, even if the newest rows it passed have since been deleted
+    latest = bounds['created'] if watermark is None else max(bounds['created'], watermark.value)
+    Watermark.objects.update_or_create(name=WATERMARK, defaults={'value': latest})
+    return {'scored': len(ledger.targets), 'unusual': int(flags.sum()), 'changed': changed}
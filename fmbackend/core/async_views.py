@@ -0,0 +1,156 @@
+"""Async variants of the read-heavy API views, served under ASGI.
+
+``core.middleware.async_routing_middleware`` points ASGI requests at
+``fmbackend.urls_async``, which routes these endpoints here and everything
+else to ``core.views``. The GET handlers use Django's async ORM (independent
+queries are awaited together with ``asyncio.gather``) so a request waiting on
+the database does not pin a worker thread; other methods are handed to the
+DRF view. Response bodies match the DRF views.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import exception_handler
+
+from .authentication import CachedJWTAuthentication, request_user
+from .filters import filter_transactions
+from .models import Asset, Transaction
+from .pagination import KeysetPagination
+from .queryplan import optimize_queryset
+from .serializers import AssetSerializer, TransactionSerializer
+from . import access, changes, compact, dashboard, insights, views
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    """``JsonResponse`` rendered like DRF's ``JSONRenderer`` (compact, UTF-8)."""
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder,
+                        json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+
+
+def _authenticate(request):
+    user = request_user(request)
+    if user is None:
+        raise NotAuthenticated()
+    access.get_memberships(user)  # Memoised on the user, so access.* is query-free from here on
+    return user
+
+
+def error_response(request, exc):
+    """``exc`` rendered as DRF renders it for the sync views, ``WWW-Authenticate`` included."""
+    if isinstance(exc, (AuthenticationFailed, NotAuthenticated)):
+        exc.auth_header = CachedJWTAuthentication().authenticate_header(request)
+    handled = exception_handler(exc, {})
+    response = json_response(handled.data, status=handled.status_code)
+    for header in ('WWW-Authenticate', 'Retry-After'):
+        if handled.has_header(header):
+            response[header] = handled[header]
+    return response
+
+
+class AsyncAPIView(View):
+    """Token authentication and the ``HasGroupPermission`` check for async views.
+
+    Methods without an async handler are served by ``sync_view``.
+    """
+    sync_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated like the DRF views, so no CSRF cookie check
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not hasattr(self, request.method.lower()) and self.sync_view is not None:
+            return await sync_to_async(self.sync_view.as_view())(request, *args, **kwargs)
+
+        try:
+            user = await sync_to_async(_authenticate)(request)
+        except APIException as exc:
+            return error_response(request, exc)
+        request.user = user
+        if not (user.role == 'admin' or access.get_memberships(user)):
+            return json_response({"detail": "You do not have permission to perform this action."},
+                                 status=status.HTTP_403_FORBIDDEN)
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return error_response(request, exc)
+
+
+class DashboardView(AsyncAPIView):
+    """Fetch aggregated data for the dashboard."""
+
+    @changes.aconditional_get(lambda request: dashboard.dependencies(request.user))
+    async def get(self, request):
+        return json_response(await dashboard.aget_snapshot(request.user))
+
+
+class AssetListView(AsyncAPIView):
+    """List assets (creation goes to the DRF view)."""
+    sync_view = views.AssetListView
+
+    @changes.aconditional_get(lambda request: (access.group_ids(request.user, 'assets'), ()))
+    async def get(self, request):
+        assets = Asset.objects.filter(group__in=access.group_ids(request.user, 'assets'))
+        if compact.wants_compact(request):
+            rows = compact.finalize([row async for row in assets.values(*compact.ASSET_FIELDS)])
+            return json_response({'results': rows, **await sync_to_async(compact.side_load)(rows)})
+        assets = [asset async for asset in optimize_queryset(assets, AssetSerializer)]
+        return json_response(AssetSerializer(assets, many=True).data)
+
+
+class TransactionListView(AsyncAPIView):
+    """List transactions (creation goes to the DRF view)."""
+    sync_view = views.TransactionListView
+
+    async def get(self, request):
+        transactions = Transaction.objects.filter(group__in=access.group_ids(request.user, 'transactions'))
+        transactions = filter_transactions(transactions, request.GET)
+
+        paginator = KeysetPagination()
+        if compact.wants_compact(request):
+            rows = transactions.values(*compact.TRANSACTION_FIELDS)
+            if paginator.is_requested(request):
+                rows = compact.finalize(await paginator.apaginate_queryset(rows, request, view=self))
+                side = await sync_to_async(compact.side_load)(rows, with_assets=True)
+                return json_response(paginator.get_paginated_data(rows, **side))
+            rows = compact.finalize([row async for row in rows])
+            return json_response({'results': rows, **await sync_to_async(compact.side_load)(rows, with_assets=True)})
+
+        transactions = optimize_queryset(transactions, TransactionSerializer)
+        if paginator.is_requested(request):
+            page = await paginator.apaginate_queryset(transactions, request, view=self)
+            return json_response(paginator.get_paginated_data(TransactionSerializer(page, many=True).data))
+        transactions = [txn async for txn in transactions]
+        return json_response(TransactionSerializer(transactions, many=True).data)
+
+
+class BudgetInsightView(AsyncAPIView):
+    """Get budget recommendations."""
+
+    async def get(self, request):
+        try:
+            period = insights.parse_period(request.GET.get('period'))
+        except ValueError as exc:
+            return json_response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        transactions = insights.budget_transactions(access.group_ids(request.user, 'transactions'))
+        if not period:
+            totals = await transactions.aaggregate(**insights.BUDGET_SUMS)
+            return json_response(insights.budget(totals['income'], totals['expense']))
+        rows = [row async for row in insights.budget_rows(transactions, period)]
+        return json_response(insights.budget_breakdown(rows))
+
+
+class TrendInsightView(AsyncAPIView):
+    """Get expense trends."""
+
+    async def get(self, request):
+        trends = await insights.aget_trends(request.user)
+        if trends is None:
+            return json_response({"message": "No transactions available"})
+        return json_response(trends)
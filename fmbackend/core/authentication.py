@@ -0,0 +1,121 @@
+"""JWT authentication that skips the per-request user lookup.
+
+Tokens carry a ``membership_version`` claim. Every user has a version stamp in
+the cache that is replaced whenever the user or one of their ``UserGroup`` rows
+changes (see ``core.signals``). While the token's stamp matches the cached one,
+the user is served from a small per-process LRU instead of the database.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import profiling
+
+VERSION_CLAIM = 'membership_version'
+USER_CACHE_SIZE = 1024
+
+
+def _version_key(user_id):
+    return f'core:membership-version:{user_id}'
+
+
+def membership_version(user_id):
+    """Current version stamp for ``user_id``, seeding one if the cache has none."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_membership_version(user_id):
+    """Invalidate every token-cached copy of ``user_id``."""
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+class _RecentUsers:
+    """Thread-safe LRU of ``user_id -> (version, user)``."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, version, user):
+        with self.lock:
+            self.entries[user_id] = (version, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+recent_users = _RecentUsers(USER_CACHE_SIZE)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that trusts current tokens and avoids the user query."""
+
+    def authenticate(self, request):
+        with profiling.span('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        version = membership_version(user_id)
+        if validated_token.get(VERSION_CLAIM) == version:
+            user = recent_users.get(user_id, version)
+            if user is not None:
+                # Hand out a copy so per-request state never leaks between requests.
+                return copy.copy(user)
+
+        user = super().get_user(validated_token)
+        recent_users.put(user_id, version, user)
+        return copy.copy(user)
+
+
+def request_user(request, token_param=None):
+    """The user for a plain Django request's bearer token, or ``None`` without one.
+
+    For views outside DRF (async views, event streams). ``token_param`` also
+    accepts the token as a query parameter, for clients such as EventSource
+    that cannot set headers. A bad, expired or inactive user's token raises
+    ``AuthenticationFailed`` as it would in a DRF view.
+    """
+    auth = CachedJWTAuthentication()
+    with profiling.span('auth'):
+        raw = request.GET.get(token_param) if token_param else None
+        if raw:
+            return auth.get_user(auth.get_validated_token(raw))
+        result = auth.authenticate(request)
+    return result[0] if result else None
+
+
+def authenticate_request(request, token_param=None):
+    """``request_user``, with ``None`` for any token that fails authentication."""
+    try:
+        return request_user(request, token_param)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
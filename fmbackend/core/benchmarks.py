@@ -0,0 +1,417 @@
+"""Helpers shared by the ``benchmark_*`` management commands.
+
+Benchmarks run against a throwaway test database so they never touch the
+configured one.
+"""
+import asyncio
+import logging
+import random
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections
+from django.db.models import Count, F
+from django.test import RequestFactory
+from django.test.utils import (CaptureQueriesContext, override_settings, setup_test_environment,
+                               teardown_test_environment)
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .imports import TransactionImporter
+from .models import User, FamilyGroup, UserGroup, Asset, Transaction, Document, Notification
+from .views import get_tokens_for_user
+from . import synthetic
+
+FULL_PERMISSIONS = {'assets': 'write', 'transactions': 'write', 'documents': 'write'}
+CATEGORIES = ['groceries', 'rent', 'utilities', 'salary', 'travel', 'dining', 'insurance', None]
+CONTENTION_PATHS = ['/api/transactions/?limit=50', '/api/assets/', '/api/notifications/']
+
+
+SCRATCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@contextmanager
+def scratch_database(name=None):
+    """Create a test database and an empty local-memory cache for the duration of the block.
+
+    The database is in memory unless ``name`` gives a file for it. The other
+    aliases (the read connection) are pointed at it as well.
+    """
+    setup_test_environment()
+    test_settings = connection.settings_dict['TEST']
+    test_name = test_settings['NAME']
+    if name:
+        test_settings['NAME'] = str(name)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    mirrors = {alias: connections[alias].settings_dict['NAME'] for alias in connections if alias != DEFAULT_DB_ALIAS}
+    for alias in mirrors:
+        connections[alias].close()
+        connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        with override_settings(CACHES=SCRATCH_CACHES):
+            yield
+    finally:
+        for alias, mirror_name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = mirror_name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = test_name
+        teardown_test_environment()
+
+
+def create_family(name='Benchmark Family', role='family_member'):
+    """Create a user with full permissions on a new group and one asset."""
+    user = User.objects.create_user(username=name[:20], email=f'{name.lower().replace(" ", ".")}@example.com',
+                                    password='benchmark', role=role)
+    group = FamilyGroup.objects.create(name=name, admin=user)
+    UserGroup.objects.create(user=user, group=group, permissions=FULL_PERMISSIONS)
+    asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('1000.00'))
+    return user, group, asset
+
+
+def add_transactions(group, asset, count, seed=0, batch_size=5000, days=5 * 365):
+    """Bulk insert ``count`` synthetic transactions spread over the last ``days`` days."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    batch = []
+    for _ in range(count):
+        batch.append(Transaction(
+            asset=asset, group=group,
+            amount=Decimal(rng.randint(-50000, 50000)) / 100,
+            category=rng.choice(CATEGORIES),
+            description='Synthetic transaction',
+            date=now - timedelta(minutes=rng.randint(0, days * 24 * 60)),
+        ))
+        if len(batch) >= batch_size:
+            Transaction.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Transaction.objects.bulk_create(batch)
+
+
+def measure(fn, repeat):
+    """Call ``fn`` ``repeat`` times and return the latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+    }
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def wsgi_get(app, path, headers):
+    """GET ``path`` through a WSGI application; returns the status code."""
+    environ = RequestFactory().get(path, headers=headers).environ
+    status = []
+    body = app(environ, lambda code, response_headers, exc_info=None: status.append(code))
+    try:
+        b''.join(body)
+    finally:
+        body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(app, path, headers):
+    """GET ``path`` through an ASGI application like a server would; returns the status code."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()  # The client never hangs up early
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+
+def largest_family():
+    """The group with the most transactions, with its ``admin`` (the family's head) loaded."""
+    group_id = (Transaction.objects.values('group').annotate(n=Count('id')).order_by('-n')
+                .values_list('group', flat=True).first())
+    return FamilyGroup.objects.select_related('admin').get(pk=group_id)
+
+
+def endpoint_requests(seed=0):
+    """Requests covering every route in ``core/urls.py``, made against a ``core.synthetic`` dataset.
+
+    Returns ``{label: (user, build)}``: ``user`` sends the request (``None``
+    for anonymous) and ``build(i)`` returns the i-th request as ``(method,
+    path, data, format)``. Writes vary with ``i`` (and set up what they
+    consume, such as notifications to delete) so repeating them stays valid.
+    Requests come from the head of the family with the largest ledger, the
+    worst case, and from the site admin for admin routes.
+    """
+    admin = User.objects.get(email=f'admin.s{seed}@{synthetic.EMAIL_DOMAIN}')
+    group = largest_family()
+    head = group.admin
+    # Any membership but a head's, so the benchmarked user's own permissions never change
+    membership = UserGroup.objects.exclude(user=F('group__admin')).first()
+    permissions_url = f'/api/groups/{membership.group_id}/permissions/'
+    asset = Asset.objects.filter(group=group).first()
+    document = Document.objects.filter(group=group).first()
+    if document is None:
+        document = Document(group=group, name='Benchmark', type='policy')
+        document.file.save('benchmark.txt', ContentFile(b'Benchmark document\n' * 100))
+    notification = (Notification.objects.filter(user=head).first()
+                    or Notification.objects.create(user=head, message='Benchmark', type='reminder'))
+    refresh = get_tokens_for_user(head)['refresh']
+
+    def get(path, **params):
+        return lambda i: ('GET', path, params or None, None)
+
+    def send(method, path, data, format='json'):
+        return lambda i: (method, path, data(i), format)
+
+    def import_file(i):
+        rows = [f'{asset.pk},-{n + 1}.00,groceries,Import {i}.{n},2026-01-{n % 28 + 1:02d}' for n in range(100)]
+        content = '\n'.join(['asset,amount,category,description,date'] + rows).encode()
+        return {'file': SimpleUploadedFile('import.csv', content, 'text/csv')}
+
+    def notifications_to_delete(i):
+        created = Notification.objects.bulk_create(
+            Notification(user=head, message=f'Disposable {i}', type='reminder', is_read=True) for _ in range(20))
+        return {'ids': [str(n.pk) for n in created]}
+
+    return {
+        'GET /api/': (None, get('/api/')),
+        'POST /api/auth/login/': (None, send('POST', '/api/auth/login/', lambda i: {
+            'email': head.email, 'password': synthetic.PASSWORD})),
+        'POST /api/auth/refresh/': (None, send('POST', '/api/auth/refresh/', lambda i: {'refresh': refresh})),
+        'POST /api/users/': (admin, send('POST', '/api/users/', lambda i: {
+            'email': f'bench{i}@{synthetic.EMAIL_DOMAIN}', 'password': 'benchmark', 'role': 'family_member',
+            'first_name': 'Bench', 'last_name': str(i)})),
+        'GET /api/users/<id>/': (head, get(f'/api/users/{head.pk}/')),
+        'PUT /api/users/<id>/': (head, send('PUT', f'/api/users/{head.pk}/', lambda i: {'first_name': f'Head {i}'})),
+        'GET /api/groups/': (admin, get('/api/groups/')),
+        'POST /api/groups/': (admin, send('POST', '/api/groups/', lambda i: {'name': f'Bench group {i}'})),
+        'PUT /api/groups/<id>/permissions/': (admin, send('PUT', permissions_url, lambda i: {
+            'user_id': str(membership.user_id),
+            'permissions': {'assets': 'read', 'transactions': ('read', 'write')[i % 2], 'documents': 'read'}})),
+        'GET /api/assets/': (head, get('/api/assets/')),
+        'POST /api/assets/': (head, send('POST', '/api/assets/', lambda i: {
+            'type': 'bank_account', 'name': f'Bench {i}', 'value': '100.00'})),
+        'GET /api/assets/<id>/': (head, get(f'/api/assets/{asset.pk}/')),
+        'PUT /api/assets/<id>/': (head, send('PUT', f'/api/assets/{asset.pk}/', lambda i: {'value': f'{1000 + i}.00'})),
+        'GET /api/dashboard/': (head, get('/api/dashboard/')),
+        'GET /api/transactions/': (head, get('/api/transactions/')),
+        'GET /api/transactions/?limit=50': (head, get('/api/transactions/', limit=50)),
+        'GET /api/transactions/?shape=compact&limit=50': (head, get('/api/transactions/', shape='compact', limit=50)),
+        'POST /api/transactions/': (head, send('POST', '/api/transactions/', lambda i: {
+            'asset': str(asset.pk), 'amount': '-12.50', 'category': 'dining', 'description': f'Bench {i}',
+            'date': timezone.now().isoformat()})),
+        'POST /api/transactions/import/': (head, send('POST', '/api/transactions/import/', import_file, 'multipart')),
+        'GET /api/transactions/export/': (head, get('/api/transactions/export/')),
+        'GET /api/documents/': (head, get('/api/documents/')),
+        'POST /api/documents/': (head, send('POST', '/api/documents/', lambda i: {
+            'name': f'Bench {i}', 'type': 'policy',
+            'file': SimpleUploadedFile(f'bench{i}.txt', f'Benchmark document {i}\n'.encode() * 100)}, 'multipart')),
+        'GET /api/documents/<id>/': (head, get(f'/api/documents/{document.pk}/')),
+        'PUT /api/documents/<id>/': (head, send('PUT', f'/api/documents/{document.pk}/', lambda i: {
+            'name': f'Doc {i}'})),
+        'GET /api/documents/<id>/download/': (head, get(f'/api/documents/{document.pk}/download/')),
+        'GET /api/notifications/': (head, get('/api/notifications/')),
+        'GET /api/notifications/archive/': (head, get('/api/notifications/archive/')),
+        # /api/notifications/stream/ never ends and is only served over ASGI (see benchmark_async)
+        'PUT /api/notifications/bulk/': (head, send('PUT', '/api/notifications/bulk/', lambda i: {
+            'type': 'reminder', 'is_read': bool(i % 2)})),
+        'DELETE /api/notifications/bulk/': (head, send('DELETE', '/api/notifications/bulk/', notifications_to_delete)),
+        'PUT /api/notifications/<id>/': (head, send('PUT', f'/api/notifications/{notification.pk}/', lambda i: {
+            'is_read': bool(i % 2)})),
+        'GET /api/insights/budget/': (head, get('/api/insights/budget/')),
+        'GET /api/insights/budget/?period=month,category': (head, get('/api/insights/budget/',
+                                                                       period='month,category')),
+        'GET /api/insights/trends/': (head, get('/api/insights/trends/')),
+        'GET /api/insights/net-worth/': (head, get('/api/insights/net-worth/', interval='week', points=200)),
+    }
+
+
+def _send(client, build, i):
+    """Make the i-th request; returns ``(status, milliseconds, queries)``, reading streamed bodies to the end."""
+    method, path, data, format = build(i)
+    kwargs = {'format': format} if format else {}
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(client, method.lower())(path, data, **kwargs)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        response.close()
+        elapsed = (time.perf_counter() - start) * 1000
+    return response.status_code, elapsed, len(queries)
+
+
+def profile_endpoints(requests, repeat):
+    """Latency percentiles, query counts and peak allocations of each of ``requests`` (see ``endpoint_requests``).
+
+    The first request is reported separately as ``cold_ms`` (caches empty),
+    the next ``repeat`` make up the percentiles, and one more runs under
+    ``tracemalloc`` for ``peak_kb`` so that tracing does not skew the timings.
+    The profiling middleware still times each request, but samples and logs
+    none of them.
+    """
+    clients, results = {}, {}
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)  # Error responses are reported by status instead of logged
+    try:
+        with override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_SLOW_MS=None):
+            for label, (user, build) in requests.items():
+                results[label] = _profile(clients, user, build, repeat)
+    finally:
+        request_logger.setLevel(level)
+    return results
+
+
+def _profile(clients, user, build, repeat):
+    if user not in clients:
+        clients[user] = APIClient()
+        clients[user].raise_request_exception = False  # A failing endpoint is reported, not fatal
+        if user is not None:
+            clients[user].credentials(HTTP_AUTHORIZATION='Bearer ' + get_tokens_for_user(user)['access'])
+    client = clients[user]
+    statuses, samples, query_counts = Counter(), [], []
+    _, cold_ms, _ = _send(client, build, 0)
+    for i in range(1, repeat + 1):
+        status, elapsed, queries = _send(client, build, i)
+        statuses[status] += 1
+        samples.append(elapsed)
+        query_counts.append(queries)
+    tracemalloc.start()
+    try:
+        _send(client, build, repeat + 1)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': statuses.most_common(1)[0][0],
+        'cold_ms': round(cold_ms, 3),
+        **summarize(samples),
+        'queries': int(statistics.median(query_counts)),
+        'peak_kb': round(peak / 1024),
+    }
+
+
+@contextmanager
+def database_settings(**overrides):
+    """Apply ``overrides`` (``OPTIONS``, ``CONN_MAX_AGE``, ...) to every database alias for the block."""
+    saved = {alias: {key: connections[alias].settings_dict[key] for key in overrides} for alias in connections}
+    for alias in connections:
+        connections[alias].close()
+        connections[alias].settings_dict.update(overrides)
+    try:
+        yield
+    finally:
+        for alias, values in saved.items():
+            connections[alias].close()
+            connections[alias].settings_dict.update(values)
+
+
+def read_contention(user, asset, readers, duration, batch_size, write=True):
+    """Throughput of ``readers`` threads GETting ``CONTENTION_PATHS`` for ``duration`` seconds.
+
+    Requests go through a ``WSGIHandler``, as a threaded server would send
+    them, so connections are opened and closed as configured. With ``write``,
+    another thread meanwhile imports batches of ``batch_size`` transactions
+    into ``asset`` as ``TransactionImporter`` does. Returns reads per second
+    and their latencies, failed reads, and rows written per second with the
+    batches that failed.
+    """
+    app = WSGIHandler()
+    headers = {'Authorization': 'Bearer ' + get_tokens_for_user(user)['access']}
+    stop = threading.Event()
+
+    def read(n):
+        samples, failed = [], 0
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                failed += wsgi_get(app, CONTENTION_PATHS[n % len(CONTENTION_PATHS)], headers) != 200
+                samples.append((time.perf_counter() - start) * 1000)
+                n += 1
+        finally:
+            connections.close_all()
+        return samples, failed
+
+    def import_batches():
+        rng, now = random.Random(0), timezone.now()
+        importer, failed, n = TransactionImporter(user, batch_size=batch_size), 0, 0
+        try:
+            while not stop.is_set():
+                batch = [Transaction(asset_id=asset.pk, group_id=asset.group_id,
+                                     amount=Decimal(rng.randint(-50000, 50000)) / 100,
+                                     category=rng.choice(CATEGORIES), description=f'Imported {n + i}',
+                                     date=now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)))
+                         for i in range(batch_size)]
+                n += batch_size
+                try:
+                    importer.flush(batch)
+                except OperationalError:  # "database is locked" once the busy timeout ran out
+                    failed += 1
+        finally:
+            connections.close_all()
+        return importer.created, failed
+
+    with ThreadPoolExecutor(max_workers=readers + 1) as pool:
+        start = time.perf_counter()
+        reads = [pool.submit(read, n) for n in range(readers)]
+        writes = pool.submit(import_batches) if write else None
+        stop.wait(duration)
+        stop.set()
+        results = [future.result() for future in reads]
+        created, write_errors = writes.result() if writes else (0, 0)
+        elapsed = time.perf_counter() - start
+
+    samples = [ms for own, _ in results for ms in own]
+    return {
+        'reads_per_s': round(len(samples) / elapsed, 1),
+        **(summarize(samples) if samples else {'p50_ms': None, 'p99_ms': None, 'mean_ms': None}),
+        'read_errors': sum(failed for _, failed in results),
+        'rows_per_s': round(created / elapsed, 1),
+        'write_errors': write_errors,
+    }
@@ -0,0 +1,106 @@
+"""Per-group and per-user change stamps for conditional GETs.
+
+Writes to assets, transactions and group details replace their group's stamp;
+writes to notifications replace their user's stamp (see ``core.signals``).
+Views combine the stamps they depend on into an ETag, which can be checked
+against ``If-None-Match`` before any of the view's queries run.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .authentication import membership_version
+
+
+def _group_key(group_id):
+    return f'core:changes:group:{group_id}'
+
+
+def _user_key(user_id):
+    return f'core:changes:user:{user_id}'
+
+
+def bump_group(group_id):
+    cache.set(_group_key(group_id), time.time_ns(), None)
+
+
+def bump_user(user_id):
+    cache.set(_user_key(user_id), time.time_ns(), None)
+
+
+def _stamps(keys):
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, time.time_ns(), None)
+            stamps[key] = cache.get(key)
+    return [stamps[key] for key in keys]
+
+
+def user_stamps(user_ids):
+    """Current change stamps of ``user_ids``, in order."""
+    return _stamps([_user_key(u) for u in user_ids])
+
+
+def fingerprint(user, group_ids=(), user_ids=(), extra=''):
+    """Digest that changes whenever ``user``'s access or any listed group/user changes."""
+    keys = [_group_key(g) for g in sorted(set(map(str, group_ids)))]
+    keys += [_user_key(u) for u in sorted(set(map(str, user_ids)))]
+    parts = [extra, str(user.pk), str(membership_version(user.pk))]
+    parts += map(str, _stamps(keys))
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def compute_etag(request, group_ids=(), user_ids=(), extra=''):
+    """ETag for ``request`` given the groups and users its response depends on."""
+    return quote_etag(fingerprint(request.user, group_ids, user_ids, extra=request.get_full_path() + extra))
+
+
+def conditional_get(dependencies, extra=None):
+    """Answer ``GET`` with 304 when the client's ETag is current.
+
+    ``dependencies(request)`` returns ``(group_ids, user_ids)`` and must be
+    cheap: it runs before the wrapped view touches the database. So must
+    ``extra(request)``, a string for anything else the response depends on,
+    such as the current date.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            group_ids, user_ids = dependencies(request)
+            etag = compute_etag(request, group_ids, user_ids, extra(request) if extra else '')
+            if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = get(self, request, *args, **kwargs)
+            if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
+
+
+def aconditional_get(dependencies, extra=None):
+    """``conditional_get`` for async views that return plain Django responses."""
+    def decorator(get):
+        @wraps(get)
+        async def wrapper(self, request, *args, **kwargs):
+            group_ids, user_ids = dependencies(request)
+            etag = await sync_to_async(compute_etag)(
+                request, group_ids, user_ids, extra(request) if extra else '')
+            if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+                response = HttpResponseNotModified()
+            else:
+                response = await get(self, request, *args, **kwargs)
+            if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,73 @@
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .models import User, FamilyGroup, Asset, Document
+
+# Columns emitted for each row/reference in ``?shape=compact`` responses.
+TRANSACTION_FIELDS = ('id', 'asset_id', 'group_id', 'amount', 'category', 'description', 'date', 'is_unusual')
+ASSET_FIELDS = ('id', 'group_id', 'type', 'name', 'value', 'last_updated', 'api_source', 'units')
+DOCUMENT_FIELDS = ('id', 'group_id', 'name', 'file', 'preview', 'type', 'expiry_date', 'uploaded_at')
+GROUP_FIELDS = ('id', 'name', 'admin_id', 'created_at')
+USER_FIELDS = ('id', 'email', 'role', 'first_name', 'last_name', 'date_joined', 'profile_img', 'profile_thumb')
+
+# Decimal columns are rendered as strings, matching DRF's DecimalField output.
+DECIMAL_FIELDS = {'amount', 'value', 'units'}
+
+
+def wants_compact(request):
+    # request.GET works for DRF requests and the plain ones async views get
+    return request.GET.get('shape') == 'compact'
+
+
+def finalize(rows):
+    """Render decimal columns as strings, matching DRF's DecimalField output."""
+    rows = list(rows)
+    for row in rows:
+        for name in DECIMAL_FIELDS.intersection(row):
+            if row[name] is not None:
+                row[name] = str(row[name])
+    return rows
+
+
+def add_file_urls(rows, request):
+    """Add the URLs ``DocumentSerializer`` renders, resolved through the same storages."""
+    file_storage = Document._meta.get_field('file').storage
+    for row in rows:
+        row['file_url'] = request.build_absolute_uri(file_storage.url(row['file'])) if row['file'] else None
+        row['download_url'] = (request.build_absolute_uri(reverse('document_download', args=[row['id']]))
+                               if row['file'] else None)
+        # Previews are derivatives, kept in the default storage (see core.derivatives)
+        row['preview'] = request.build_absolute_uri(default_storage.url(row['preview'])) if row['preview'] else None
+    return rows
+
+
+def _by_id(rows):
+    return {str(row['id']): row for row in rows}
+
+
+def side_load(rows, with_assets=False):
+    """Build the ``assets``/``groups``/``users`` reference maps for compact ``rows``.
+
+    Each referenced object is emitted once no matter how many rows point at it,
+    and each map is filled by a single ``values()`` query.
+    """
+    group_ids = {row['group_id'] for row in rows}
+    data = {}
+
+    if with_assets:
+        asset_ids = {row['asset_id'] for row in rows}
+        assets = finalize(Asset.objects.filter(id__in=asset_ids).values(*ASSET_FIELDS)) if asset_ids else []
+        group_ids.update(asset['group_id'] for asset in assets)
+        data['assets'] = _by_id(assets)
+
+    groups = list(FamilyGroup.objects.filter(id__in=group_ids).values(*GROUP_FIELDS)) if group_ids else []
+    user_ids = {group['admin_id'] for group in groups}
+    users = list(User.objects.filter(id__in=user_ids).values(*USER_FIELDS)) if user_ids else []
+    image_storage = User._meta.get_field('profile_img').storage
+    for user in users:
+        user['profile_img'] = image_storage.url(user['profile_img']) if user['profile_img'] else None
+        user['profile_thumb'] = default_storage.url(user['profile_thumb']) if user['profile_thumb'] else None
+
+    data['groups'] = _by_id(groups)
+    data['users'] = _by_id(users)
+    return data
@@ -0,0 +1,92 @@
+"""Per-user dashboard snapshots.
+
+A snapshot is cached under a key derived from the change stamps of everything
+it reads (the user's asset and transaction groups, their notifications and
+their group permissions). The model signals in ``core.signals`` replace those
+stamps on every write, so a write moves the user to a fresh key and the next
+request recomputes; unchanged dashboards are served straight from the cache.
+"""
+import asyncio
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import Asset, Transaction, Notification
+from .queryplan import optimize_queryset
+from .serializers import TransactionSerializer, NotificationSerializer
+from . import access, changes, inbox
+
+RECENT_TRANSACTIONS = 5
+TOP_NOTIFICATIONS = 20
+SNAPSHOT_TIMEOUT = 60 * 60
+
+
+def dependencies(user):
+    """``(group_ids, user_ids)`` whose change stamps the snapshot depends on."""
+    return access.group_ids(user, 'assets') + access.group_ids(user, 'transactions'), [user.pk]
+
+
+def _queries(user):
+    asset_groups = access.group_ids(user, 'assets')
+    transaction_groups = access.group_ids(user, 'transactions')
+    unread = Notification.objects.filter(user=user, is_read=False)
+    return (
+        Asset.objects.filter(group__in=asset_groups),
+        optimize_queryset(Transaction.objects.filter(group__in=transaction_groups).order_by('-date', '-id'),
+                          TransactionSerializer)[:RECENT_TRANSACTIONS],
+        optimize_queryset(unread.order_by('-created_at'), NotificationSerializer)[:TOP_NOTIFICATIONS],
+    )
+
+
+def _payload(assets, transactions, unread_count, notifications):
+    return {
+        'total_asset_value': assets['total_value'] or Decimal('0.00'),
+        'recent_transactions': TransactionSerializer(transactions, many=True).data,
+        'unread_count': unread_count,
+        'notifications': NotificationSerializer(notifications, many=True).data,
+    }
+
+
+def compute(user):
+    """Build the dashboard payload from the database."""
+    assets, transactions, notifications = _queries(user)
+    return _payload(assets.aggregate(total_value=Sum('value')), transactions, inbox.unread_count(user.pk),
+                    notifications)
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def acompute(user):
+    """``compute`` for async views, with the independent queries awaited together."""
+    assets, transactions, notifications = _queries(user)
+    return _payload(*await asyncio.gather(assets.aaggregate(total_value=Sum('value')), _alist(transactions),
+                                          inbox.aunread_count(user.pk), _alist(notifications)))
+
+
+def _snapshot_key(user):
+    group_ids, user_ids = dependencies(user)
+    return f'core:dashboard:{changes.fingerprint(user, group_ids, user_ids)}'
+
+
+def get_snapshot(user):
+    """Cached dashboard payload for ``user``, recomputed when it is missing or stale."""
+    key = _snapshot_key(user)
+    data = cache.get(key)
+    if data is None:
+        data = compute(user)
+        cache.set(key, data, SNAPSHOT_TIMEOUT)
+    return data
+
+
+async def aget_snapshot(user):
+    """``get_snapshot`` for async views."""
+    key = await sync_to_async(_snapshot_key)(user)
+    data = await cache.aget(key)
+    if data is None:
+        data = await acompute(user)
+        await cache.aset(key, data, SNAPSHOT_TIMEOUT)
+    return data
@@ -0,0 +1,107 @@
+"""Thumbnails, avatars and extracted text for uploaded files.
+
+Saving a document or a profile image queues a job (see ``core.signals`` and
+``core.tasks``). The job works out which derivatives the file needs, and the
+missing ones are rendered in a process pool by ``core.processing``.
+
+Derivatives are cached under ``derivatives/<aa>/<sha256>-<variant>`` in the
+default storage, keyed by the content hash, so identical files (common with
+the content-addressed document storage) share them. A cached file is reused
+without rendering anything. List payloads link the small WebP variants
+instead of the originals. PDF text extraction needs the optional ``pypdf``
+package.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Document, DocumentText, User
+from . import processing, storage
+
+DERIVATIVE_DIR = 'derivatives'
+THUMBNAIL_SIZE = 256
+AVATAR_SIZE = 128
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff'}
+
+_pool = None
+
+
+def pypdf_available():
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pool():
+    """The shared process pool (``DERIVATIVE_PROCESSES`` workers, default one per CPU)."""
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked: the parent holds database connections and worker threads
+        _pool = ProcessPoolExecutor(max_workers=getattr(settings, 'DERIVATIVE_PROCESSES', None),
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def derivative_name(digest, variant):
+    return f'{DERIVATIVE_DIR}/{digest[:2]}/{digest}-{variant}'
+
+
+def render(jobs):
+    """Render the ``{name: (function, source path, *args)}`` derivatives not cached yet, in parallel.
+
+    Each function is called as ``function(source path, destination path, *args)``.
+    """
+    futures = {}
+    for name, (func, src, *args) in jobs.items():
+        if not default_storage.exists(name):
+            futures[name] = pool().submit(func, src, default_storage.path(name), *args)
+    for future in futures.values():
+        future.result()  # Re-raises a worker's exception, so the job is retried
+
+
+def build_document(document_id):
+    """Store the preview thumbnail and the searchable text of a document."""
+    document = Document.objects.filter(pk=document_id).only('file', 'preview').first()
+    if document is None or not document.file:
+        return
+    extension = os.path.splitext(document.file.name)[1].lower()
+    is_image, is_pdf = extension in IMAGE_EXTENSIONS, extension == '.pdf' and pypdf_available()
+    if not (is_image or is_pdf):
+        return
+
+    digest = storage.file_digest(document.file)
+    src = document.file.path
+    preview = derivative_name(digest, f'thumb{THUMBNAIL_SIZE}.webp') if is_image else ''
+    text = derivative_name(digest, 'text.txt') if is_pdf else None
+    jobs = {}
+    if preview:
+        jobs[preview] = (processing.render_thumbnail, src, THUMBNAIL_SIZE)
+    if text:
+        jobs[text] = (processing.extract_pdf_text, src)
+    render(jobs)
+
+    if document.preview != preview:
+        document.preview = preview
+        document.save(update_fields=['preview'])
+    if text:
+        with default_storage.open(text, 'rb') as fh:
+            DocumentText.objects.update_or_create(document=document, defaults={'text': fh.read().decode()})
+
+
+def build_profile(user_id):
+    """Store the avatar-sized variant of a user's profile image."""
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    thumb = ''
+    if user.profile_img:
+        thumb = derivative_name(storage.file_digest(user.profile_img), f'avatar{AVATAR_SIZE}.webp')
+        render({thumb: (processing.render_thumbnail, user.profile_img.path, AVATAR_SIZE)})
+    if user.profile_thumb != thumb:
+        user.profile_thumb = thumb
+        user.save(update_fields=['profile_thumb'])
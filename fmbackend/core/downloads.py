@@ -0,0 +1,133 @@
+"""Serving stored document files with Range, ETag and Last-Modified support.
+
+Files are never read into memory. With ``DOCUMENT_SENDFILE_HEADER`` set, the
+response only carries ``X-Accel-Redirect`` (nginx, pointing into the internal
+``DOCUMENT_SENDFILE_PREFIX`` location) or ``X-Sendfile`` (Apache/lighttpd) and
+the web server sends the file, ranges included. Otherwise a whole file is
+returned as a ``FileResponse`` (which WSGI servers such as gunicorn hand to
+``os.sendfile`` through ``wsgi.file_wrapper``), and a single byte range is
+streamed in ``BLOCK_SIZE`` chunks.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+
+from .storage import blob_digest
+
+BLOCK_SIZE = 256 * 1024
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Read-only view of ``length`` bytes of ``file`` starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(name, stat):
+    # Content-addressed blobs are named by their SHA-256, which makes a strong validator
+    return quote_etag(blob_digest(name) or f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def parse_range(header, size):
+    """``(start, length)`` for a single ``bytes=`` range, ``None`` to send the whole file.
+
+    Raises ``ValueError`` when the range cannot be satisfied.
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None  # Multiple or malformed ranges: a full 200 response is always allowed
+    first, last = match.groups()
+    if first == '':
+        start = max(size - int(last), 0)  # Suffix range: the last N bytes
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def serve(request, field_file, filename, as_attachment=False):
+    """Response serving ``field_file`` (honouring conditional and Range headers) as ``filename``."""
+    name = field_file.name
+    path = field_file.storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    etag, last_modified = file_etag(name, stat), int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return _validators(response, etag, last_modified)
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    sendfile = getattr(settings, 'DOCUMENT_SENDFILE_HEADER', None)
+    if sendfile:
+        response = HttpResponse(content_type=content_type)
+        if sendfile.lower() == 'x-accel-redirect':
+            response[sendfile] = quote(getattr(settings, 'DOCUMENT_SENDFILE_PREFIX', '/protected-media/') + name)
+        else:
+            response[sendfile] = path
+    else:
+        byte_range = None
+        header = request.headers.get('Range')
+        if header and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(header, stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+        file = open(path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, length = byte_range
+            response = FileResponse(FileRange(file, start, length), content_type=content_type,
+                                    status=status.HTTP_206_PARTIAL_CONTENT)
+            response['Content-Range'] = f'bytes {start}-{start + length - 1}/{stat.st_size}'
+            response['Content-Length'] = length
+        response.block_size = BLOCK_SIZE
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return _validators(response, etag, last_modified)
+
+
+def _validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'  # Cached by the client, revalidated (permissions may change)
+    return response
+
+
+def _if_range_matches(request, etag, last_modified):
+    """Whether a ``Range`` request applies (``If-Range`` absent or still current)."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag  # Weak validators never match
+    return parse_http_date_safe(if_range) == last_modified
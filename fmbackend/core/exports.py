@@ -0,0 +1,123 @@
+"""Streaming transaction exports (CSV, NDJSON and Parquet).
+
+Rows are read with ``values_list().iterator(chunk_size=...)`` and written to
+the response one chunk at a time, so memory use does not depend on the size
+of the ledger. Parquet output needs the optional ``pyarrow`` package.
+"""
+import csv
+import io
+import json
+
+EXPORT_COLUMNS = ('id', 'date', 'asset_id', 'group_id', 'amount', 'category', 'description', 'is_unusual')
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def _chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Yield lists of row tuples from a server-side iterator."""
+    chunk = []
+    for row in queryset.values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text_row(row):
+    pk, date, asset_id, group_id, amount, category, description, is_unusual = row
+    return (str(pk), date.isoformat(), str(asset_id), str(group_id), str(amount), category or '', description,
+            is_unusual)
+
+
+def stream_csv(queryset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _chunks(queryset):
+        writer.writerows(_text_row(row) for row in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_ndjson(queryset):
+    for chunk in _chunks(queryset):
+        lines = []
+        for row in chunk:
+            values = _text_row(row)
+            record = dict(zip(EXPORT_COLUMNS, values))
+            record['category'] = row[5]
+            lines.append(json.dumps(record))
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that hands its contents out as they are produced."""
+
+    def __init__(self):
+        self.pending = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.pending.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.pending = b''.join(self.pending), []
+        return data
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_parquet(queryset):
+    """Write one Parquet row group per chunk and stream the bytes as each is flushed."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.string()),
+        ('date', pa.timestamp('us', tz='UTC')),
+        ('asset_id', pa.string()),
+        ('group_id', pa.string()),
+        ('amount', pa.decimal128(15, 2)),
+        ('category', pa.string()),
+        ('description', pa.string()),
+        ('is_unusual', pa.bool_()),
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(queryset, chunk_size=CHUNK_SIZE * 5):
+        columns = list(zip(*chunk))
+        columns[0] = [str(v) for v in columns[0]]
+        columns[2] = [str(v) for v in columns[2]]
+        columns[3] = [str(v) for v in columns[3]]
+        writer.write_table(pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, schema)],
+                                                schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+STREAMERS = {'csv': stream_csv, 'ndjson': stream_ndjson, 'parquet': stream_parquet}
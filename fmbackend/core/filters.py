@@ -0,0 +1,96 @@
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def _parse_bound(value, name):
+    """Parse a date or datetime bound into ``(aware datetime, is_whole_day)``.
+
+    Plain dates become midnight so the comparison stays a range on the raw
+    ``date`` column and can use the (group, date, id) index.
+    """
+    parsed, is_day = None, False
+    try:
+        # Dates first: parse_datetime also accepts a plain date, as midnight
+        day = parse_date(value)
+        if day is not None:
+            parsed, is_day = datetime.combine(day, time.min), True
+        else:
+            parsed = parse_datetime(value)
+    except ValueError:
+        pass
+    if parsed is None:
+        raise ValidationError({"error": f"Invalid {name}: {value}"})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed, is_day
+
+
+def _parse_bool(value, name):
+    if value.lower() not in ('true', 'false', '1', '0'):
+        raise ValidationError({"error": f"Invalid {name}: {value}"})
+    return value.lower() in ('true', '1')
+
+
+def filter_transactions(queryset, params):
+    """Apply the transaction list query-string filters in SQL."""
+    date_from = params.get('date_from')
+    if date_from:
+        bound, _ = _parse_bound(date_from, 'date_from')
+        queryset = queryset.filter(date__gte=bound)
+
+    date_to = params.get('date_to')
+    if date_to:
+        bound, is_day = _parse_bound(date_to, 'date_to')
+        if is_day:
+            # An inclusive day bound covers everything before the next midnight.
+            queryset = queryset.filter(date__lt=bound + timedelta(days=1))
+        else:
+            queryset = queryset.filter(date__lte=bound)
+
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(category=category)
+
+    asset = params.get('asset')
+    if asset:
+        try:
+            queryset = queryset.filter(asset_id=uuid.UUID(asset))
+        except ValueError:
+            raise ValidationError({"error": f"Invalid asset: {asset}"})
+
+    is_unusual = params.get('is_unusual')
+    if is_unusual is not None:
+        queryset = queryset.filter(is_unusual=_parse_bool(is_unusual, 'is_unusual'))
+
+    return queryset
+
+
+def filter_notifications(queryset, params):
+    """Apply the notification list query-string filters (``?is_read=false`` uses the unread partial index)."""
+    is_read = params.get('is_read')
+    if is_read is not None:
+        queryset = queryset.filter(is_read=_parse_bool(is_read, 'is_read'))
+
+    type = params.get('type')
+    if type:
+        queryset = queryset.filter(type=type)
+
+    return queryset
+
+
+def parse_range(params):
+    """``(start, end)`` from ``?start=``/``?end=``, ``None`` where absent; a plain-date ``end`` covers that day."""
+    start = end = None
+    if params.get('start'):
+        start, _ = _parse_bound(params['start'], 'start')
+    if params.get('end'):
+        end, is_day = _parse_bound(params['end'], 'end')
+        if is_day:
+            end += timedelta(days=1)
+    if start and end and start >= end:
+        raise ValidationError({"error": "start must be before end"})
+    return start, end
@@ -0,0 +1,217 @@
+"""Streaming bulk import of transactions from CSV, OFX or JSON uploads.
+
+Rows are parsed one at a time from the uploaded file (which Django spools to
+disk once it is larger than ``FILE_UPLOAD_MAX_MEMORY_SIZE``) or straight from
+the request body, validated with the transaction serializer rules,
+de-duplicated against existing rows and written with ``bulk_create`` one batch
+per database transaction. The duplicate check runs in the same transaction.
+"""
+import codecs
+import csv
+import json
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import Asset, Transaction
+from .serializers import TransactionImportSerializer
+from . import access, changes, rollups
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 1000
+EXTENSIONS = {'.csv': 'csv', '.ofx': 'ofx', '.qfx': 'ofx', '.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ofx': 'ofx',
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+}
+
+
+def detect_format(filename):
+    filename = (filename or '').lower()
+    for ext, fmt in EXTENSIONS.items():
+        if filename.endswith(ext):
+            return fmt
+    return None
+
+
+def _lines(fh):
+    """Decode a binary file-like object line by line."""
+    return codecs.iterdecode(iter(fh.readline, b''), 'utf-8-sig')
+
+
+def read_csv(fh):
+    """Yield one dict per CSV data row (header: date, amount, description, category, asset)."""
+    for row in csv.DictReader(_lines(fh)):
+        yield {key.strip().lower(): (value.strip() if isinstance(value, str) else value)
+               for key, value in row.items() if key}
+
+
+def read_ndjson(fh):
+    for line in _lines(fh):
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json_array(fh, chunk_size=64 * 1024):
+    """Yield the elements of a top-level JSON array without decoding the whole document."""
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, started, done = '', False, False
+    while not done:
+        chunk = fh.read(chunk_size)
+        buffer += reader.decode(chunk, final=not chunk)
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise ValueError("Expected a JSON array.")
+                buffer, started = buffer[1:], True
+                continue
+            if buffer.startswith(','):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith(']'):
+                done = True
+                break
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # Need more input
+            yield item
+            buffer = buffer[end:]
+        if not chunk and not done:
+            raise ValueError("Unterminated JSON array.")
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+OFX_DATE = re.compile(r'(\d{8})(\d{6})?(?:\.\d+)?(?:\[([+-]?\d+(?:\.\d+)?)(?::\w+)?\])?')
+
+
+def _ofx_date(value):
+    match = OFX_DATE.match(value.strip())
+    if not match:
+        return value
+    day, time_part, offset = match.groups()
+    parsed = datetime.strptime(day + (time_part or '000000'), '%Y%m%d%H%M%S')
+    tz = dt_timezone(timedelta(hours=float(offset))) if offset else dt_timezone.utc
+    return parsed.replace(tzinfo=tz).isoformat()
+
+
+def read_ofx(fh):
+    """Yield one dict per ``<STMTTRN>`` block of an OFX (SGML or XML) statement."""
+    current = None
+    for line in _lines(fh):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield {
+                        'date': _ofx_date(current.get('DTPOSTED', '')),
+                        'amount': current.get('TRNAMT'),
+                        'description': current.get('NAME') or current.get('MEMO') or current.get('TRNTYPE', ''),
+                        'category': None,
+                    }
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+READERS = {'csv': read_csv, 'ofx': read_ofx, 'json': read_json_array, 'ndjson': read_ndjson}
+
+
+class TransactionImporter:
+    """Validate, de-duplicate and insert rows, collecting a per-row report."""
+
+    def __init__(self, user, default_asset=None, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.default_asset = default_asset
+        writable = access.group_ids(user, 'transactions', 'write')
+        self.asset_groups = dict(Asset.objects.filter(group__in=writable).values_list('id', 'group_id'))
+        self.serializer = TransactionImportSerializer()
+        self.created = self.duplicates = 0
+        self.errors = []
+        self.error_count = 0
+        self.groups = set()
+
+    def add_error(self, row_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def validate(self, row_number, row):
+        if not isinstance(row, dict):
+            self.add_error(row_number, {'non_field_errors': ["Row must be an object."]})
+            return None
+        if not row.get('asset') and self.default_asset:
+            row = {**row, 'asset': self.default_asset}
+        try:
+            data = self.serializer.run_validation(row)
+        except serializers.ValidationError as exc:
+            self.add_error(row_number, exc.detail)
+            return None
+        group_id = self.asset_groups.get(data['asset'])
+        if group_id is None:
+            self.add_error(row_number, {'asset': ["Unknown asset or permission denied."]})
+            return None
+        return Transaction(asset_id=data['asset'], group_id=group_id, amount=data['amount'],
+                           category=data.get('category'), description=data['description'], date=data['date'])
+
+    def run(self, rows):
+        """Import every row; rows validated before a parse error are still written."""
+        batch = []
+        try:
+            for row_number, row in enumerate(rows, start=1):
+                txn = self.validate(row_number, row)
+                if txn is not None:
+                    batch.append(txn)
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+        finally:
+            if batch:
+                self.flush(batch)
+            for group_id in self.groups:
+                changes.bump_group(group_id)
+        return self.report()
+
+    def flush(self, batch):
+        """Insert one batch, skipping rows that already exist or repeat within the batch."""
+        # The check runs in the insert's transaction, which begins IMMEDIATE and so holds the write lock:
+        # a concurrent import of the same rows waits for this one and then sees its rows.
+        with transaction.atomic():
+            # group + date lets SQLite probe the (group, date, id) index per date
+            existing = set(Transaction.objects.filter(
+                group_id__in={t.group_id for t in batch}, date__in={t.date for t in batch},
+                asset_id__in={t.asset_id for t in batch},
+            ).values_list('asset_id', 'date', 'amount', 'description'))
+            fresh = []
+            for txn in batch:
+                key = (txn.asset_id, txn.date, txn.amount, txn.description)
+                if key in existing:
+                    self.duplicates += 1
+                    continue
+                existing.add(key)
+                fresh.append(txn)
+            Transaction.objects.bulk_create(fresh)
+            # bulk_create skips the save signals, so keep the rollups current here
+            rollups.apply_many(fresh)
+        self.created += len(fresh)
+        self.groups.update(t.group_id for t in fresh)
+
+    def report(self):
+        return {
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
@@ -0,0 +1,152 @@
+"""Bulk notification operations and the per-user unread counter.
+
+Bulk updates run as one ``UPDATE ... WHERE`` per call and bulk deletes as
+one ``DELETE ... WHERE`` per read state (``delete_rows``). The affected row
+counts come straight from those statements, so the counter moves by exactly
+the number of rows that changed read state. Single-row writes keep
+the counter current through ``core.signals``. A user's counter row is created
+(from a ``COUNT``) the first time it is needed, and ``recount`` reconciles
+every counter from the notification table.
+
+Read notifications older than ``RETENTION_DAYS`` are moved to
+``NotificationArchive`` in batches by ``archive_read``, so the live table (and
+inbox queries) grow with recent and unread notifications rather than history.
+"""
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import EmptyResultSet, FullResultSet
+from django.db import router, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive, NotificationCounter, User
+from . import changes
+
+RETENTION_DAYS = 90
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def delete_rows(queryset):
+    """Delete ``queryset``'s rows with one ``DELETE ... WHERE``; returns the number deleted.
+
+    The statement is compiled from the queryset's own filters, which must all
+    be on its table. ``QuerySet.delete()`` would instead load every row to send
+    ``post_delete``, adjusting the counters row by row. Callers keep the
+    counters and change stamps current themselves.
+    """
+    query = queryset.query
+    if sum(1 for alias in query.alias_map if query.alias_refcount[alias]) > 1:
+        raise ValueError("delete_rows() cannot delete through a join.")
+    compiler = query.get_compiler(using=router.db_for_write(queryset.model))
+    try:
+        where, params = compiler.compile(query.where)
+    except EmptyResultSet:
+        return 0
+    except FullResultSet:
+        where, params = '', ()
+    sql = f'DELETE FROM {compiler.connection.ops.quote_name(queryset.model._meta.db_table)}'
+    with compiler.connection.cursor() as cursor:
+        cursor.execute(f'{sql} WHERE {where}' if where else sql, params)
+        return cursor.rowcount
+
+
+def _create(user_id):
+    """Create ``user_id``'s counter from a count of their unread notifications."""
+    unread = Notification.objects.filter(user_id=user_id, is_read=False).count()
+    # A concurrent first write may create the row first; its count is just as current
+    NotificationCounter.objects.bulk_create([NotificationCounter(user_id=user_id, unread=unread)],
+                                            ignore_conflicts=True)
+    return unread
+
+
+def adjust(user_id, delta):
+    """Add ``delta`` to ``user_id``'s unread count (after the notification rows have been written)."""
+    if delta and not NotificationCounter.objects.filter(user_id=user_id).update(unread=F('unread') + delta):
+        # The count already includes the rows just written. Without a row there is nothing to decrement: the
+        # counter is either created from a count later, or was deleted along with its user.
+        if delta > 0:
+            _create(user_id)
+
+
+def unread_count(user_id):
+    unread = NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first()
+    return _create(user_id) if unread is None else unread
+
+
+async def aunread_count(user_id):
+    """``unread_count`` for async views."""
+    unread = await NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).afirst()
+    return await sync_to_async(_create)(user_id) if unread is None else unread
+
+
+def select(user, ids=None, type=None, before=None, is_read=None):
+    """``user``'s notifications, optionally narrowed by ``ids``, ``type``, read state and creation time."""
+    notifications = Notification.objects.filter(user=user)
+    if is_read is not None:
+        notifications = notifications.filter(is_read=is_read)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    if type is not None:
+        notifications = notifications.filter(type=type)
+    if before is not None:
+        notifications = notifications.filter(created_at__lt=before)
+    return notifications
+
+
+def mark(user, notifications, is_read=True):
+    """Set ``is_read`` on ``notifications`` (all ``user``'s) in one UPDATE; returns the number changed."""
+    with transaction.atomic():
+        changed = notifications.filter(is_read=not is_read).update(is_read=is_read)
+        adjust(user.pk, -changed if is_read else changed)
+    if changed:
+        changes.bump_user(user.pk)  # update() skips the save signals
+    return changed
+
+
+def delete(user, notifications):
+    """Delete ``notifications`` (all ``user``'s) without loading them; returns the number deleted."""
+    with transaction.atomic():
+        # Splitting on is_read gives the exact number of unread rows removed, in the same transaction
+        unread = delete_rows(notifications.filter(is_read=False))
+        read = delete_rows(notifications.filter(is_read=True))
+        adjust(user.pk, -unread)
+    if unread or read:
+        changes.bump_user(user.pk)
+    return unread + read
+
+
+def recount(user_ids=None):
+    """Rewrite the counters (optionally only of ``user_ids``) from the notification table."""
+    users = User.objects.all() if user_ids is None else User.objects.filter(pk__in=user_ids)
+    counts = users.annotate(unread=Count('notification', filter=Q(notification__is_read=False))).values_list(
+        'pk', 'unread')
+    counters = [NotificationCounter(user_id=user_id, unread=unread) for user_id, unread in counts]
+    NotificationCounter.objects.bulk_create(counters, batch_size=500, update_conflicts=True,
+                                            unique_fields=['user'], update_fields=['unread'])
+    return len(counters)
+
+
+def archive_read(days=RETENTION_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move read notifications older than ``days`` days to the archive; returns the number moved."""
+    old = Notification.objects.filter(is_read=True, created_at__lt=timezone.now() - timedelta(days=days))
+    moved, users = 0, set()
+    while True:
+        # One short transaction per batch, so writers are never blocked for long
+        with transaction.atomic():
+            # Locked so a row marked unread meanwhile is not archived (SQLite serialises writers anyway)
+            batch = list(old.select_for_update().values_list('id', 'user_id', 'message', 'type', 'created_at')
+                         [:batch_size])
+            if not batch:
+                break
+            NotificationArchive.objects.bulk_create(
+                [NotificationArchive(id=pk, user_id=user_id, message=message, type=type, created_at=created_at)
+                 for pk, user_id, message, type, created_at in batch],
+                ignore_conflicts=True)
+            # Only read rows move, so the unread counters are unaffected
+            delete_rows(Notification.objects.filter(pk__in=[row[0] for row in batch]))
+        moved += len(batch)
+        users.update(row[1] for row in batch)
+    for user_id in users:
+        changes.bump_user(user_id)
+    return moved
@@ -0,0 +1,131 @@
+"""Budget and expense trend insights.
+
+Query builders and payload shaping are shared by the sync views and their
+async variants (``core.async_views``). Trends are cached per user like the
+dashboard snapshot: the payload is keyed by the change stamps of the user's
+transaction groups, so it is recomputed only after one of them changes, and
+the ``insights.precompute`` background job fills the cache ahead of requests.
+"""
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlyRollup, Transaction
+from . import access, changes
+
+TRENDS_TIMEOUT = 60 * 60 * 24
+BUDGET_BREAKDOWNS = {'month', 'category'}
+# Income and expense in a single pass over the (group, date, amount) index
+BUDGET_SUMS = {
+    'income': Sum('amount', filter=Q(amount__gt=0)),
+    'expense': Sum('amount', filter=Q(amount__lt=0)),
+}
+
+
+def parse_period(value):
+    """Breakdown keys from ``?period=``; raises ``ValueError`` for unknown ones."""
+    period = [p for p in (value or '').split(',') if p]
+    if not set(period) <= BUDGET_BREAKDOWNS:
+        raise ValueError("period must be 'month', 'category' or 'month,category'")
+    return period
+
+
+def budget_transactions(group_ids):
+    return Transaction.objects.filter(group__in=group_ids)
+
+
+def budget_rows(transactions, period):
+    """Income/expense sums per ``period`` key (month and/or category)."""
+    keys = []
+    if 'month' in period:
+        transactions = transactions.annotate(month=TruncMonth('date'))
+        keys.append('month')
+    if 'category' in period:
+        keys.append('category')
+    return transactions.values(*keys).annotate(**BUDGET_SUMS).order_by(*keys)
+
+
+def budget(income, expense):
+    income = income or 0
+    expense = expense or 0
+    return {
+        'total_income': str(income),
+        'total_expense': str(expense),
+        'recommended_budget': str(income * Decimal('0.8'))
+    }
+
+
+def budget_breakdown(rows):
+    """Overall budget plus one entry per ``budget_rows`` row."""
+    total_income = total_expense = 0
+    breakdown = []
+    for row in rows:
+        total_income += row['income'] or 0
+        total_expense += row['expense'] or 0
+        entry = budget(row['income'], row['expense'])
+        if 'month' in row:
+            entry['month'] = row['month'].strftime('%Y-%m')
+        if 'category' in row:
+            entry['category'] = row['category']
+        breakdown.append(entry)
+
+    data = budget(total_income, total_expense)
+    data['breakdown'] = breakdown
+    return data
+
+
+def trend_rows(group_ids):
+    # Answered from the monthly rollups rather than scanning every transaction
+    return (
+        MonthlyRollup.objects.filter(group__in=group_ids, count__gt=0)
+        .exclude(category='')
+        .values('month', 'category')
+        .annotate(income=Sum('income'), expense=Sum('expense'))
+        .order_by('month', 'category')
+    )
+
+
+def trends(rows):
+    """``{category: {"YYYY-MM": total}}`` from ``trend_rows``, or ``None`` without transactions."""
+    totals_by_category, months = {}, []
+    for row in rows:
+        month = row['month'].strftime('%Y-%m')
+        if not months or months[-1] != month:
+            months.append(month)
+        totals_by_category.setdefault(row['category'], {})[month] = row['income'] + row['expense']
+    if not totals_by_category:
+        return None
+
+    # Every category gets every month, zero-filled
+    return {
+        category: {month: str(totals.get(month, Decimal('0')).quantize(Decimal('0.01'))) for month in months}
+        for category, totals in totals_by_category.items()
+    }
+
+
+def _trends_key(user):
+    return f"core:trends:{changes.fingerprint(user, access.group_ids(user, 'transactions'))}"
+
+
+def get_trends(user):
+    """Cached ``trends`` for the groups whose transactions ``user`` can read."""
+    key = _trends_key(user)
+    data = cache.get(key)
+    if data is None:
+        data = {'trends': trends(trend_rows(access.group_ids(user, 'transactions')))}
+        cache.set(key, data, TRENDS_TIMEOUT)  # Wrapped so a cached "no data" is not a cache miss
+    return data['trends']
+
+
+async def aget_trends(user):
+    """``get_trends`` for async views."""
+    key = await sync_to_async(_trends_key)(user)
+    data = await cache.aget(key)
+    if data is None:
+        rows = [row async for row in trend_rows(access.group_ids(user, 'transactions'))]
+        data = {'trends': trends(rows)}
+        await cache.aset(key, data, TRENDS_TIMEOUT)
+    return data['trends']
@@ -0,0 +1,126 @@
+"""Database-backed background jobs.
+
+Tasks are plain functions registered with ``@task`` (see ``core.tasks``).
+``enqueue`` stores a ``Job`` row; the ``run_worker`` command claims due rows
+with a conditional ``UPDATE`` (so several workers never run the same job) and
+runs them on a thread pool. Failures are retried with exponential backoff up
+to ``max_attempts``, and periodic tasks enqueue their next run when they end.
+While a job runs the worker refreshes its ``claimed_at`` every
+``HEARTBEAT_EVERY``; a running job whose heartbeat stops for ``STALE_AFTER``
+is assumed lost with its worker and requeued.
+"""
+import logging
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = timedelta(seconds=30)  # Doubled after every failed attempt
+HEARTBEAT_EVERY = timedelta(seconds=30)
+STALE_AFTER = timedelta(minutes=5)  # Running jobs without a heartbeat for this long are requeued
+
+Task = namedtuple('Task', ['func', 'every'])
+REGISTRY = {}
+
+
+def task(name, every=None):
+    """Register ``func`` as task ``name``; ``every`` (a timedelta) makes it periodic."""
+    def decorator(func):
+        REGISTRY[name] = Task(func, every)
+        return func
+    return decorator
+
+
+def enqueue(name, run_at=None, max_attempts=3, **kwargs):
+    """Queue task ``name`` to run at ``run_at`` (default: now) with JSON-serialisable ``kwargs``."""
+    if name not in REGISTRY:
+        raise KeyError(f"Unknown task {name!r}.")
+    return Job.objects.create(task=name, kwargs=kwargs, run_at=run_at or timezone.now(), max_attempts=max_attempts)
+
+
+def schedule_periodic():
+    """Queue every periodic task that has no queued or running job."""
+    pending = set(Job.objects.filter(status__in=['queued', 'running']).values_list('task', flat=True))
+    for name, spec in REGISTRY.items():
+        if spec.every and name not in pending:
+            enqueue(name)
+
+
+def heartbeat(running):
+    """Mark the claimed ``running`` jobs as still alive; returns how many were refreshed."""
+    running = list(running)
+    if not running:
+        return 0
+    # A job requeued and claimed elsewhere meanwhile has a new claim token and is left alone
+    return Job.objects.filter(pk__in=[job.pk for job in running], status='running',
+                              claimed_by__in={job.claimed_by for job in running}).update(claimed_at=timezone.now())
+
+
+def requeue_stale():
+    """Return jobs whose worker died mid-run (no heartbeat for ``STALE_AFTER``) to the queue."""
+    return Job.objects.filter(status='running', claimed_at__lt=timezone.now() - STALE_AFTER).update(
+        status='queued', claimed_by='')
+
+
+def claim(worker, limit):
+    """Claim up to ``limit`` due jobs for ``worker`` and return them."""
+    now = timezone.now()
+    due = list(Job.objects.filter(status='queued', run_at__lte=now)
+               .order_by('run_at', 'id').values_list('id', flat=True)[:limit])
+    if not due:
+        return []
+    token = f'{worker}:{uuid.uuid4().hex[:12]}'
+    # Rows another worker claimed in the meantime no longer match status='queued'
+    Job.objects.filter(id__in=due, status='queued').update(
+        status='running', claimed_by=token, claimed_at=now, attempts=F('attempts') + 1)
+    return list(Job.objects.filter(claimed_by=token, status='running').order_by('run_at', 'id'))
+
+
+def run(job):
+    """Run one claimed job and record the outcome; returns whether it succeeded."""
+    spec = REGISTRY.get(job.task)
+    try:
+        if spec is None:
+            raise LookupError(f"Unknown task {job.task!r}.")
+        spec.func(**job.kwargs)
+    except Exception:
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.task, job.attempts)
+        now = timezone.now()
+        retry = spec is not None and job.attempts < job.max_attempts
+        Job.objects.filter(pk=job.pk).update(
+            status='queued' if retry else 'failed', last_error=traceback.format_exc(), claimed_by='',
+            run_at=now + RETRY_DELAY * 2 ** (job.attempts - 1) if retry else job.run_at,
+            finished_at=None if retry else now)
+        if not retry and spec is not None:
+            _schedule_next(job, spec, now)
+        return False
+
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(status='done', finished_at=now, last_error='')
+    _schedule_next(job, spec, now)
+    return True
+
+
+def _schedule_next(job, spec, now):
+    # A manual run of a periodic task must not start a second chain of runs
+    if spec.every and not Job.objects.filter(task=job.task, status='queued').exists():
+        enqueue(job.task, run_at=now + spec.every, **job.kwargs)
+
+
+def run_pending(worker='inline', batch_size=10):
+    """Run due jobs in this thread until none are left; returns how many ran."""
+    count = 0
+    while True:
+        jobs = claim(worker, batch_size)
+        if not jobs:
+            return count
+        for job in jobs:
+            run(job)
+            count += 1
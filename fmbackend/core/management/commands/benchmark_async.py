@@ -0,0 +1,72 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks
+from core.models import Notification
+from core.views import get_tokens_for_user
+
+ENDPOINTS = [
+    '/api/dashboard/',
+    '/api/assets/',
+    '/api/transactions/?limit=50',
+    '/api/insights/budget/?period=month',
+    '/api/insights/trends/',
+]
+
+
+class Command(BaseCommand):
+    help = "Compare requests/second of the WSGI (DRF) and ASGI (async) views in-process (uses a scratch database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=20000)
+        parser.add_argument('--requests', type=int, default=400, help="Requests per endpoint and server.")
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help="WSGI worker threads / concurrent ASGI requests.")
+
+    def handle(self, *args, transactions, requests, concurrency, **options):
+        with benchmarks.scratch_database():
+            user, group, asset = benchmarks.create_family()
+            benchmarks.add_transactions(group, asset, transactions)
+            Notification.objects.bulk_create(
+                Notification(user=user, message=f'Reminder {i}', type='reminder') for i in range(50))
+            headers = {'Authorization': 'Bearer ' + get_tokens_for_user(user)['access']}
+            wsgi, asgi = WSGIHandler(), ASGIHandler()
+
+            self.stdout.write(f"{'endpoint':<36} {'WSGI req/s':>10} {'ASGI req/s':>10}")
+            for path in ENDPOINTS:
+                wsgi_rps = self.run_wsgi(wsgi, path, headers, requests, concurrency)
+                asgi_rps = asyncio.run(self.run_asgi(asgi, path, headers, requests, concurrency))
+                self.stdout.write(f"{path:<36} {wsgi_rps:>10.0f} {asgi_rps:>10.0f}")
+
+    def check_statuses(self, path, statuses):
+        failed = [code for code in statuses if code != 200]
+        if failed:
+            raise CommandError(f"{path}: {len(failed)} requests failed (e.g. HTTP {failed[0]}).")
+
+    def run_wsgi(self, app, path, headers, requests, concurrency):
+        benchmarks.wsgi_get(app, path, headers)  # Warm up
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            statuses = list(pool.map(lambda _: benchmarks.wsgi_get(app, path, headers), range(requests)))
+            elapsed = time.perf_counter() - start
+        self.check_statuses(path, statuses)
+        return requests / elapsed
+
+    async def run_asgi(self, app, path, headers, requests, concurrency):
+        await benchmarks.asgi_get(app, path, headers)  # Warm up
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                return await benchmarks.asgi_get(app, path, headers)
+
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        self.check_statuses(path, statuses)
+        return requests / elapsed
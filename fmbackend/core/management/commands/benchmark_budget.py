@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from core import benchmarks
+from core.views import get_tokens_for_user
+
+
+class Command(BaseCommand):
+    help = "Measure /api/insights/budget/ latency as the transaction count grows (uses a scratch database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, sizes, repeat, **options):
+        with benchmarks.scratch_database():
+            user, group, asset = benchmarks.create_family()
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_tokens_for_user(user)['access'])
+
+            loaded = 0
+            self.stdout.write(f"{'rows':>10} {'query':>22} {'p50 ms':>9} {'p99 ms':>9}")
+            for size in sorted(sizes):
+                benchmarks.add_transactions(group, asset, size - loaded, seed=size)
+                loaded = size
+                for query in ('', '?period=month', '?period=month,category'):
+                    stats = benchmarks.summarize(
+                        benchmarks.measure(lambda: client.get('/api/insights/budget/' + query), repeat))
+                    self.stdout.write(f"{size:>10} {query or '(totals)':>22} {stats['p50_ms']:>9} {stats['p99_ms']:>9}")
@@ -0,0 +1,53 @@
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core import benchmarks, imports, synthetic
+from core.models import Asset
+
+# name: (overrides of every alias's settings, DATABASE_ROUTERS)
+PROFILES = {
+    'django defaults': ({'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, []),
+    'tuned': ({}, None),  # As configured in settings
+}
+
+
+class Command(BaseCommand):
+    help = ("Measure reader throughput with and without a concurrent bulk import, under Django's default SQLite "
+            "settings and the tuned ones (uses scratch database files).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=20000)
+        parser.add_argument('--readers', type=int, default=4, help="Reader threads.")
+        parser.add_argument('--duration', type=float, default=5, help="Seconds per phase.")
+        parser.add_argument('--batch-size', type=int, default=imports.BATCH_SIZE, help="Rows per import transaction.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, transactions, readers, duration, batch_size, seed, **options):
+        self.stdout.write(f"{'profile':<16} {'phase':<8} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+                          f"{'errors':>6} {'rows/s':>8} {'failed writes':>13}")
+        for name, (overrides, routers) in PROFILES.items():
+            routers = settings.DATABASE_ROUTERS if routers is None else routers
+            with tempfile.TemporaryDirectory() as directory, benchmarks.database_settings(**overrides), \
+                    override_settings(DATABASE_ROUTERS=routers, MEDIA_ROOT=directory, PROFILING_SAMPLE_RATE=0,
+                                      PROFILING_SLOW_MS=None), \
+                    benchmarks.scratch_database(Path(directory) / 'db.sqlite3'):
+                start = time.perf_counter()
+                synthetic.generate(families=max(10, transactions // 1000), transactions=transactions, seed=seed)
+                self.stderr.write(f"{name}: generated {transactions} transactions in "
+                                  f"{time.perf_counter() - start:.1f}s")
+                group = benchmarks.largest_family()
+                asset = Asset.objects.filter(group=group).first()
+                for phase, write in (('idle', False), ('writing', True)):
+                    r = benchmarks.read_contention(group.admin, asset, readers, duration, batch_size, write)
+                    self.stdout.write(
+                        f"{name:<16} {phase:<8} {r['reads_per_s']:>8} {self._ms(r['p50_ms'])} "
+                        f"{self._ms(r['p99_ms'])} {r['read_errors']:>6} {r['rows_per_s']:>8} "
+                        f"{r['write_errors']:>13}")
+
+    def _ms(self, value):
+        return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
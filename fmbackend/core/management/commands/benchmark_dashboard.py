@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from core import benchmarks, changes
+from core.models import Notification
+from core.views import get_tokens_for_user
+
+
+class Command(BaseCommand):
+    help = "Compare cold (recomputed) and warm (cached snapshot) /api/dashboard/ latency (uses a scratch database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=100000)
+        parser.add_argument('--notifications', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, transactions, notifications, repeat, **options):
+        with benchmarks.scratch_database():
+            user, group, asset = benchmarks.create_family()
+            benchmarks.add_transactions(group, asset, transactions)
+            Notification.objects.bulk_create(
+                Notification(user=user, message=f'Reminder {i}', type='reminder') for i in range(notifications))
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_tokens_for_user(user)['access'])
+
+            def cold():
+                # Simulates a write: the snapshot key moves and the next read recomputes.
+                changes.bump_user(user.pk)
+                client.get('/api/dashboard/')
+
+            def warm():
+                client.get('/api/dashboard/')
+
+            client.get('/api/dashboard/')
+            for label, fn in (('cold', cold), ('warm', warm)):
+                stats = benchmarks.summarize(benchmarks.measure(fn, repeat))
+                self.stdout.write(f"{label:>5}  p50 {stats['p50_ms']:>9} ms  p99 {stats['p99_ms']:>9} ms")
@@ -0,0 +1,87 @@
+import json
+import platform
+import tempfile
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core import benchmarks, synthetic
+
+
+class Command(BaseCommand):
+    help = ("Drive every API endpoint against synthetic datasets of several sizes (uses a scratch database) and "
+            "report p50/p99 latency, query counts and peak allocations; optionally write or compare a JSON baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help="Transactions per dataset; families scale with it (one per 1000, at least 10).")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='+', default=[], metavar='TEXT',
+                            help="Only endpoints whose label contains one of these, e.g. dashboard 'GET /api/assets/'.")
+        parser.add_argument('--output', help="Write the results as a JSON baseline to this file.")
+        parser.add_argument('--compare', help="Compare with a baseline written by --output.")
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help="With --compare, flag endpoints whose p50 grew by more than this factor.")
+
+    def handle(self, *args, sizes, repeat, seed, only, output, compare, threshold, **options):
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': seed,
+            'repeat': repeat,
+            'sizes': {},
+        }
+        for size in sizes:
+            with benchmarks.scratch_database(), tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root):
+                self.stdout.write(f"Generating {size} transactions...")
+                start = time.perf_counter()
+                dataset = synthetic.generate(families=max(10, size // 1000), transactions=size, seed=seed)
+                self.stdout.write(f"  {', '.join(f'{n} {name}' for name, n in dataset.items())} "
+                                  f"in {time.perf_counter() - start:.1f}s")
+                requests = benchmarks.endpoint_requests(seed)
+                if only:
+                    requests = {label: r for label, r in requests.items() if any(text in label for text in only)}
+                results = benchmarks.profile_endpoints(requests, repeat)
+            report['sizes'][str(size)] = {'dataset': dataset, 'endpoints': results}
+            self._print(results)
+
+        if output:
+            with open(output, 'w') as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {output}"))
+        if compare:
+            with open(compare) as fh:
+                self._compare(json.load(fh), report, threshold)
+
+    def _print(self, results):
+        self.stdout.write(f"  {'endpoint':<52} {'status':>6} {'cold':>9} {'p50':>9} {'p99':>9} {'queries':>7} "
+                          f"{'peak KB':>8}")
+        for label, r in results.items():
+            self.stdout.write(f"  {label:<52} {r['status']:>6} {r['cold_ms']:>9.2f} {r['p50_ms']:>9.2f} "
+                              f"{r['p99_ms']:>9.2f} {r['queries']:>7} {r['peak_kb']:>8}")
+
+    def _compare(self, old, new, threshold):
+        regressions = 0
+        for size, data in new['sizes'].items():
+            before = old['sizes'].get(size)
+            if before is None:
+                self.stdout.write(f"Size {size} is not in the baseline.")
+                continue
+            self.stdout.write(f"Size {size}: p50 ms and queries, baseline -> now")
+            for label, r in data['endpoints'].items():
+                b = before['endpoints'].get(label)
+                if b is None:
+                    continue
+                slower = b['p50_ms'] > 0 and r['p50_ms'] / b['p50_ms'] > threshold
+                regressed = slower or r['queries'] > b['queries'] or r['status'] != b['status']
+                regressions += regressed
+                self.stdout.write(f"{'!' if regressed else ' '} {label:<52} {b['p50_ms']:>9.2f} -> {r['p50_ms']:>9.2f}"
+                                  f"  {b['queries']:>4} -> {r['queries']:<4} {b['status']} -> {r['status']}")
+        style = self.style.WARNING if regressions else self.style.SUCCESS
+        self.stdout.write(style(f"{regressions} endpoint(s) regressed against the baseline."))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIClient
+
+from core import benchmarks, exports
+from core.views import get_tokens_for_user
+
+
+class Command(BaseCommand):
+    help = "Stream /api/transactions/export/ over a large synthetic ledger and check RSS stays bounded."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        # Parquet has a fixed ~75 MB overhead (arrow memory pool and writer buffers)
+        # that does not grow with the row count.
+        parser.add_argument('--max-rss-growth-mb', type=float, default=128,
+                            help="Fail if RSS grows by more than this while streaming.")
+        parser.add_argument('--formats', nargs='+', default=['csv', 'ndjson', 'parquet'])
+
+    def handle(self, *args, rows, max_rss_growth_mb, formats, **options):
+        if 'parquet' in formats and not exports.parquet_available():
+            self.stdout.write("pyarrow is not installed; skipping parquet.")
+            formats = [f for f in formats if f != 'parquet']
+
+        with benchmarks.scratch_database():
+            user, group, asset = benchmarks.create_family()
+            self.stdout.write(f"Seeding {rows} transactions...")
+            benchmarks.add_transactions(group, asset, rows)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_tokens_for_user(user)['access'])
+
+            failures = []
+            for file_format in formats:
+                # Warm up so one-off costs (e.g. loading pyarrow) don't count as growth
+                warmup = client.get('/api/transactions/export/', {'file_format': file_format, 'date_from': '2999-01-01'})
+                b''.join(warmup.streaming_content)
+
+                start_rss = peak_rss = benchmarks.rss_mb()
+                start = time.perf_counter()
+                response = client.get('/api/transactions/export/', {'file_format': file_format})
+                size = 0
+                for chunk in response.streaming_content:
+                    size += len(chunk)
+                    peak_rss = max(peak_rss, benchmarks.rss_mb())
+                elapsed = time.perf_counter() - start
+                growth = peak_rss - start_rss
+                self.stdout.write(f"{file_format:>8}: {size / 1e6:8.1f} MB in {elapsed:6.1f}s, "
+                                  f"RSS growth {growth:6.1f} MB")
+                if growth > max_rss_growth_mb:
+                    failures.append(file_format)
+
+            if failures:
+                raise CommandError(f"RSS grew by more than {max_rss_growth_mb} MB for: {', '.join(failures)}")
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import anomalies, benchmarks
+
+
+class Command(BaseCommand):
+    help = "Time a full and an incremental unusual-transaction scoring run over a synthetic ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--new-rows', type=int, default=1000,
+                            help="Rows added before the incremental run.")
+
+    def handle(self, *args, rows, new_rows, **options):
+        with benchmarks.scratch_database():
+            user, group, asset = benchmarks.create_family()
+            self.stdout.write(f"Seeding {rows} transactions...")
+            benchmarks.add_transactions(group, asset, rows)
+
+            self.report('full', anomalies.rescore)
+            # New rows arrive over the last month, so only a year and a month of history is reloaded
+            benchmarks.add_transactions(group, asset, new_rows, seed=1, days=30)
+            self.report('incremental', anomalies.score_new)
+
+    def report(self, label, run):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:>12}: {result['scored']} rows in {elapsed:6.2f}s "
+                          f"({result['unusual']} unusual, {result['changed']} changed)")
@@ -0,0 +1,61 @@
+import os
+import random
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from core import benchmarks
+from core.models import Document
+from core.storage import ContentAddressedStorage
+from core.views import get_tokens_for_user
+
+
+def disk_usage(root):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names)
+
+
+class Command(BaseCommand):
+    help = "Upload documents through /api/documents/ with plain and content-addressed storage (scratch database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=200)
+        parser.add_argument('--size-kb', type=int, default=1024)
+        parser.add_argument('--distinct', type=int, default=40, help="Number of distinct file contents uploaded.")
+
+    def handle(self, *args, files, size_kb, distinct, **options):
+        rng = random.Random(0)
+        contents = [rng.randbytes(size_kb * 1024) for _ in range(min(distinct, files))]
+        uploads = [rng.choice(contents) for _ in range(files)]
+        field = Document._meta.get_field('file')
+        original = field.storage
+
+        with benchmarks.scratch_database():
+            user, _, _ = benchmarks.create_family()
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_tokens_for_user(user)['access'])
+
+            self.stdout.write(f"{files} uploads of {size_kb} KB, {len(contents)} distinct")
+            for label, storage_class in (('plain', FileSystemStorage), ('content-addressed', ContentAddressedStorage)):
+                with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                    field.storage = storage_class()
+                    try:
+                        start = time.perf_counter()
+                        for i, data in enumerate(uploads):
+                            response = client.post('/api/documents/', {
+                                'name': f'Policy {i}', 'type': 'policy',
+                                'file': SimpleUploadedFile(f'policy-{i}.pdf', data, content_type='application/pdf'),
+                            }, format='multipart')
+                            if response.status_code != 201:
+                                raise CommandError(f"Upload failed with HTTP {response.status_code}: {response.data}")
+                        elapsed = time.perf_counter() - start
+                    finally:
+                        field.storage = original
+                    total_mb = files * size_kb / 1024
+                    self.stdout.write(f"{label:>18}: {total_mb / elapsed:8.1f} MB/s, {files / elapsed:7.1f} uploads/s, "
+                                      f"{disk_usage(media_root) / 1e6:8.1f} MB on disk")
+                Document.objects.all().delete()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core import jobs
+from core.models import Document, User
+
+
+class Command(BaseCommand):
+    help = "Queue thumbnail/text derivative jobs for documents and profile images that have none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Queue every file, not only those without derivatives.")
+
+    def handle(self, *args, all, **options):
+        documents = Document.objects.exclude(file='')
+        users = User.objects.exclude(profile_img='').exclude(profile_img=None)
+        if not all:
+            documents = documents.filter(preview='', extracted_text=None)
+            users = users.filter(profile_thumb='')
+        queued = 0
+        for pk in documents.values_list('pk', flat=True).iterator():
+            jobs.enqueue('derivatives.document', document_id=str(pk))
+            queued += 1
+        for pk in users.values_list('pk', flat=True).iterator():
+            jobs.enqueue('derivatives.profile', user_id=str(pk))
+            queued += 1
+        self.stdout.write(f"Queued {queued} derivative jobs; python manage.py run_worker builds them.")
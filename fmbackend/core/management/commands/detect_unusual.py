@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core import anomalies
+
+
+class Command(BaseCommand):
+    help = "Score transactions created since the last run and update Transaction.is_unusual."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="Rescore the whole history instead of only new transactions.")
+        parser.add_argument('--group', action='append', dest='groups', metavar='GROUP_ID',
+                            help="With --full, only rescore this group (may be repeated).")
+
+    def handle(self, *args, full=False, groups=None, **options):
+        result = anomalies.rescore(group_ids=groups) if full or groups else anomalies.score_new()
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {result['scored']} transactions: {result['unusual']} unusual, {result['changed']} changed."))
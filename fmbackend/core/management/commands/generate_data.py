@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import synthetic
+from core.models import User
+
+
+class Command(BaseCommand):
+    help = ("Add synthetic families (members, assets, transactions, documents, notifications) to the configured "
+            "database. The same --seed always produces the same data.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--families', type=int, default=100)
+        parser.add_argument('--members', type=int, default=3, help="Average members per family besides its head.")
+        parser.add_argument('--assets', type=int, default=4, help="Average assets per family.")
+        parser.add_argument('--transactions', type=int, default=100000, help="Total, spread unevenly over families.")
+        parser.add_argument('--documents', type=int, default=5, help="Average documents per family.")
+        parser.add_argument('--notifications', type=int, default=50, help="Average notifications per user.")
+        parser.add_argument('--days', type=int, default=730, help="History length in days.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, seed, **options):
+        if User.objects.filter(email__endswith=f'.s{seed}@{synthetic.EMAIL_DOMAIN}').exists():
+            raise CommandError(f"Seed {seed} was already generated into this database; pick another --seed.")
+        counts = synthetic.generate(seed=seed, **{k: options[k] for k in (
+            'families', 'members', 'assets', 'transactions', 'documents', 'notifications', 'days')})
+        self.stdout.write(self.style.SUCCESS(
+            "Created " + ", ".join(f"{n} {name}" for name, n in counts.items()) + "."))
+        self.stdout.write(f"Every user's password is '{synthetic.PASSWORD}'; the site admin is "
+                          f"admin.s{seed}@{synthetic.EMAIL_DOMAIN}.")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-group monthly transaction rollups from the transaction table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', action='append', dest='groups', metavar='GROUP_ID',
+                            help="Only rebuild this group (may be repeated).")
+
+    def handle(self, *args, groups=None, **options):
+        count = rollups.rebuild(group_ids=groups)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} rollup rows."))
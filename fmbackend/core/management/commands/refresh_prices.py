@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import prices
+
+
+class Command(BaseCommand):
+    help = "Revalue assets whose api_source names a PRICE_SOURCES entry from freshly fetched quotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-cache', action='store_true',
+                            help="Fetch every quote instead of reusing ones cached by a recent run.")
+
+    def handle(self, *args, no_cache=False, **options):
+        result = prices.refresh(use_cache=not no_cache)
+        self.stdout.write(self.style.SUCCESS(
+            f"Priced {result['assets']} assets from {result['quotes']} quotes ({result['fetched']} fetched): "
+            f"{result['updated']} updated."))
@@ -0,0 +1,47 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (insight precompute, document expiry scans, ...) on a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--poll', type=float, default=5.0, help="Seconds to wait when no job is due.")
+        parser.add_argument('--once', action='store_true', help="Exit once no job is due instead of polling.")
+
+    def handle(self, *args, threads, poll, once, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        jobs.schedule_periodic()
+        running = {}  # future -> job
+        heartbeat = jobs.HEARTBEAT_EVERY.total_seconds()
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as pool:
+            while True:
+                jobs.requeue_stale()
+                claimed = jobs.claim(worker, threads - len(running)) if len(running) < threads else []
+                running.update((pool.submit(self.run_job, job), job) for job in claimed)
+                if running:
+                    # Wake up at least once per heartbeat so long jobs are not requeued as stale
+                    done, _ = wait(running, timeout=heartbeat if claimed else min(poll, heartbeat),
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del running[future]
+                    jobs.heartbeat(running.values())
+                elif once:
+                    break
+                else:
+                    time.sleep(poll)
+
+    def run_job(self, job):
+        try:
+            ok = jobs.run(job)
+            self.stdout.write(f"{job.task} #{job.pk}: {'done' if ok else 'failed'}")
+        finally:
+            connection.close()  # Each pool thread has its own connection
@@ -0,0 +1,75 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
+from . import profiling, routers
+
+ASYNC_URLCONF = 'fmbackend.urls_async'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+@sync_and_async_middleware
+def async_routing_middleware(get_response):
+    """Route ASGI requests through ``ASYNC_URLCONF`` so they reach the async view variants."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            request.urlconf = ASYNC_URLCONF
+            return await get_response(request)
+    else:
+        def middleware(request):
+            return get_response(request)
+    return middleware
+
+
+@sync_and_async_middleware
+def read_routing_middleware(get_response):
+    """Serve the reads of safe-method requests from the ``read`` connection (see ``core.routers``)."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if request.method not in SAFE_METHODS:
+                return await get_response(request)
+            with routers.reading():
+                return await get_response(request)
+    else:
+        def middleware(request):
+            if request.method not in SAFE_METHODS:
+                return get_response(request)
+            with routers.reading():
+                return get_response(request)
+    return middleware
+
+
+class ProfilingMiddleware:
+    """Time SQL, spans and the view into a ``Server-Timing`` header and the slow-request log.
+
+    Goes first in ``MIDDLEWARE`` so the total covers the other middleware;
+    see ``core.profiling``. cProfile sampling is for WSGI requests only, as
+    an event loop thread interleaves other requests' coroutines.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        profiling.install()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with profiling.recording(sample=True) as profile:
+            response = self.get_response(request)
+        return profiling.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        with profiling.recording() as profile:
+            response = await self.get_response(request)
+        return profiling.finish(request, response, profile)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = profiling.current()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
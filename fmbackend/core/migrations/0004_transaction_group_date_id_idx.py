@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_user_username'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['group', 'date', 'id'], name='txn_group_date_id_idx'),
+        ),
+    ]
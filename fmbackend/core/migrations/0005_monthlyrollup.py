@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_transaction_group_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('category', models.CharField(blank=True, default='', max_length=100)),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('expense', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='core.familygroup')),
+            ],
+            options={
+                'unique_together': {('group', 'month', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['group', 'date', 'amount'], name='txn_group_date_amount_idx'),
+        ),
+    ]
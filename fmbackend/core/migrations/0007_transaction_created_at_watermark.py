@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_transaction_group_date_amount_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+    ]
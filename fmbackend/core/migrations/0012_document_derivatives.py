@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_document_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='extracted_text', serialize=False, to='core.document')),
+                ('text', models.TextField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='preview',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_thumb',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_valuations(apps, schema_editor):
+    """Start every existing asset's history with its current value."""
+    Asset = apps.get_model('core', 'Asset')
+    AssetValuation = apps.get_model('core', 'AssetValuation')
+    AssetValuation.objects.bulk_create(
+        (AssetValuation(asset_id=a.id, group_id=a.group_id, recorded_at=a.last_updated, value=a.value)
+         for a in Asset.objects.only('id', 'group_id', 'last_updated', 'value').iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_document_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('asset', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='core.asset')),
+                ('group', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.familygroup')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['group', 'recorded_at'], name='valuation_group_recorded_idx'), models.Index(fields=['asset', 'recorded_at'], name='valuation_asset_recorded_idx')],
+            },
+        ),
+        migrations.RunPython(seed_valuations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_assetvaluation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='units',
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=20, null=True),
+        ),
+    ]
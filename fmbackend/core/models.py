@@ -1,13 +1,17 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 import uuid
 
+from .storage import document_storage
+
 class User(AbstractUser):
     username = models.CharField(max_length=20, blank=True, null=True)  
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     role = models.CharField(max_length=20, choices=[('admin', 'Admin'), ('family_member', 'Family Member'), ('accountant', 'Accountant')])
     email = models.EmailField(unique=True)
     profile_img = models.ImageField(upload_to='profile_images/', null=True, blank=True)
+    profile_thumb = models.CharField(max_length=255, blank=True, default='', editable=False)  # See core.derivatives
     USERNAME_FIELD = 'email'
     
     REQUIRED_FIELDS = ['username']
@@ -37,7 +41,21 @@ class Asset(models.Model):
     name = models.CharField(max_length=255)
     value = models.DecimalField(max_digits=15, decimal_places=2)
     last_updated = models.DateTimeField(auto_now=True)
-    api_source = models.CharField(max_length=255, null=True, blank=True)
+    api_source = models.CharField(max_length=255, null=True, blank=True)  # '<source>:<symbol>', see core.prices
+    units = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True)  # Quoted value = price x units
+
+# Append-only asset value history (written by core.valuations whenever a value changes)
+class AssetValuation(models.Model):
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE, related_name='valuations', db_index=False)
+    group = models.ForeignKey(FamilyGroup, on_delete=models.CASCADE, related_name='+', db_index=False)  # Denormalised
+    recorded_at = models.DateTimeField(default=timezone.now)
+    value = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'recorded_at'], name='valuation_group_recorded_idx'),
+            models.Index(fields=['asset', 'recorded_at'], name='valuation_asset_recorded_idx'),
+        ]
 
 # Transactions
 class Transaction(models.Model):
@@ -49,17 +67,41 @@ class Transaction(models.Model):
     description = models.TextField()
     date = models.DateTimeField()
     is_unusual = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Scoring watermark, see core.anomalies
+
+    class Meta:
+        indexes = [
+            # Keyset pagination and date-range filters on the transaction list
+            models.Index(fields=['group', 'date', 'id'], name='txn_group_date_id_idx'),
+            # Covers budget aggregation so it never has to visit the table rows
+            models.Index(fields=['group', 'date', 'amount'], name='txn_group_date_amount_idx'),
+        ]
 
 # Documents (Using Filesystem)
 class Document(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     group = models.ForeignKey(FamilyGroup, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
-    file = models.FileField(upload_to='documents/')  # Stores in /media/documents/
+    file = models.FileField(upload_to='documents/', storage=document_storage)  # Deduplicated under /media/blobs/
     type = models.CharField(max_length=20, choices=[('will', 'Will'), ('policy', 'Policy'), ('tax_form', 'Tax Form')])
     expiry_date = models.DateField(null=True, blank=True)
+    expiry_reminded_for = models.DateField(null=True, blank=True, editable=False)  # expiry_date last reminded about
+    preview = models.CharField(max_length=255, blank=True, default='', editable=False)  # Thumbnail, see core.derivatives
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+# Text extracted from a document's file for search (kept out of Document so list queries stay narrow)
+class DocumentText(models.Model):
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, primary_key=True, related_name='extracted_text')
+    text = models.TextField()
+
+# Stored document contents, one per distinct SHA-256 (see core.storage)
+class Blob(models.Model):
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
 # Notifications
 class Notification(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -67,4 +109,68 @@ class Notification(models.Model):
     message = models.TextField()
     type = models.CharField(max_length=20, choices=[('reminder', 'Reminder'), ('alert', 'Alert')])
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's notifications
+            models.Index(fields=['user', 'created_at', 'id'], name='notif_user_created_id_idx'),
+            # Unread inbox queries only touch unread rows
+            models.Index(fields=['user', 'created_at'], condition=models.Q(is_read=False),
+                         name='notif_unread_user_created_idx'),
+        ]
+
+# Read notifications past retention (moved here by core.inbox.archive_read)
+class NotificationArchive(models.Model):
+    id = models.UUIDField(primary_key=True, editable=False)  # The original notification's id
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)  # Led by the index below
+    message = models.TextField()
+    type = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='notif_arch_user_created_id_idx'),
+        ]
+
+# Denormalised unread notification count per user (maintained by core.inbox)
+class NotificationCounter(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+
+# Per-group monthly transaction rollups (maintained by core.signals)
+class MonthlyRollup(models.Model):
+    group = models.ForeignKey(FamilyGroup, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField()  # First day of the month
+    category = models.CharField(max_length=100, blank=True, default='')  # '' for uncategorised
+    income = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('group', 'month', 'category')
+
+# Progress markers for incremental batch jobs
+class Watermark(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    value = models.DateTimeField()
+
+# Background jobs (claimed and run by the run_worker command, see core.jobs)
+class Job(models.Model):
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, default='queued', choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')])
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    claimed_by = models.CharField(max_length=100, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
@@ -0,0 +1,100 @@
+import base64
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def _params(request):
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination keyed on (date, id), newest first.
+
+    The cursor encodes the (date, id) of the last row of the previous page, so
+    each page is a single range scan on the (group, date, id) index and page N
+    costs the same as page 1. Subclasses may key on another datetime field.
+    """
+    date_field = 'date'
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+
+    def is_requested(self, request):
+        params = _params(request)
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views (plain Django requests are accepted too)."""
+        return self._page([row async for row in self._page_queryset(queryset, request)])
+
+    def _page_queryset(self, queryset, request):
+        self.limit = self.get_page_size(request)
+        cursor = _params(request).get(self.cursor_query_param)
+        queryset = queryset.order_by(f'-{self.date_field}', '-id')
+        if cursor:
+            date, pk = self.decode_cursor(cursor)
+            field = self.date_field
+            queryset = queryset.filter(Q(**{f'{field}__lt': date}) | Q(**{field: date, 'id__lt': pk}))
+        # Fetch one extra row to know whether another page exists.
+        return queryset[:self.limit + 1]
+
+    def _page(self, rows):
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data, **extra):
+        return Response(self.get_paginated_data(data, **extra))
+
+    def get_paginated_data(self, data, **extra):
+        return {
+            'next_cursor': self.next_cursor,
+            'results': data,
+            **extra,
+        }
+
+    def get_page_size(self, request):
+        value = _params(request).get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            raise ValidationError({"error": "limit must be an integer."})
+        if size <= 0:
+            raise ValidationError({"error": "limit must be positive."})
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, obj):
+        # Rows may be model instances, values() dicts or (date, id) tuples.
+        if isinstance(obj, tuple):
+            date, pk = obj
+        elif isinstance(obj, dict):
+            date, pk = obj[self.date_field], obj['id']
+        else:
+            date, pk = getattr(obj, self.date_field), obj.id
+        raw = f"{date.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            date, pk = raw.split('|')
+            return datetime.fromisoformat(date), uuid.UUID(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError({"error": "Invalid cursor."})
+
+
+class NotificationPagination(KeysetPagination):
+    """Keyset pagination over notifications, newest first."""
+    date_field = 'created_at'
@@ -0,0 +1,198 @@
+"""Refreshing asset values from quote sources.
+
+An asset with ``api_source = '<source>:<symbol>'`` is revalued from the
+``PRICE_SOURCES`` entry named ``<source>``. Its new value is the quote times
+``Asset.units`` (for a holding) or the quote itself (a balance). Each source
+in settings is a dict::
+
+    PRICE_SOURCES = {
+        'stocks': {
+            'url': 'https://quotes.example.com/v1/quote?symbol={symbol}',
+            'field': 'price',       # Dotted path to the price in the JSON response
+            'rate': 5,              # Requests per second (0 for no limit)
+            'connections': 4,       # Keep-alive connections held open
+            'timeout': 5,           # Seconds per request
+            'headers': {'Authorization': 'Bearer ...'},
+        },
+    }
+
+``refresh`` collects the distinct (source, symbol) pairs, so a ticker held by
+many families is fetched once. Quotes are cached for ``QUOTE_TTL``, so a
+run soon after another fetches nothing. The rest are fetched concurrently
+from an asyncio loop, through one rate limiter and one urllib3 connection
+pool per source (``QuoteClient``). Changed assets are written back with ``bulk_update``, which
+bypasses the signals, so the valuation history and change stamps are
+updated here. A failed quote leaves its assets untouched until the next run.
+"""
+import asyncio
+import json
+import logging
+from decimal import ROUND_HALF_UP, Decimal
+from urllib.parse import quote, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+import urllib3
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Asset
+from . import changes, valuations
+
+QUOTE_TTL = 15 * 60
+DEFAULT_TIMEOUT = 10
+DEFAULT_CONNECTIONS = 4
+MAX_REDIRECTS = 3
+UPDATE_BATCH_SIZE = 500
+CENTS = Decimal('0.01')
+MAX_VALUE = Decimal(10) ** 13  # Asset.value has 15 digits, 2 of them decimal
+
+logger = logging.getLogger(__name__)
+
+
+def sources():
+    return getattr(settings, 'PRICE_SOURCES', {})
+
+
+def parse_source(api_source):
+    """``(source, symbol)`` of an ``api_source``, or ``None`` when it names no configured source."""
+    source, sep, symbol = (api_source or '').partition(':')
+    if not sep or not symbol or source not in sources():
+        return None
+    return source, symbol
+
+
+def _cache_key(source, symbol):
+    return f'core:prices:{source}:{quote(symbol, safe="")}'
+
+
+class RateLimiter:
+    """Spaces calls to ``wait`` at least ``1 / rate`` seconds apart."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        delay = self.next_at - now
+        self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class QuoteClient:
+    """Keep-alive HTTP client for one source: urllib3 on worker threads, ``size`` requests at a time.
+
+    Follows redirects (dropping ``Authorization`` when one leaves the host),
+    decodes gzip and deflate bodies, uses the proxy from the environment
+    (``HTTPS_PROXY``, ``NO_PROXY``...) and retries a request once when the
+    connection fails before a response arrives.
+    """
+
+    def __init__(self, url, size, timeout, headers=None):
+        options = {
+            'maxsize': size,
+            'block': True,  # Never more than size connections per host
+            'timeout': urllib3.Timeout(total=timeout),
+            'retries': urllib3.Retry(total=MAX_REDIRECTS + 1, connect=1, read=1, redirect=MAX_REDIRECTS),
+            'headers': {'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate', **(headers or {})},
+        }
+        parts = urlsplit(url)
+        proxy = getproxies().get(parts.scheme)
+        if proxy and not proxy_bypass(parts.hostname or ''):
+            self.http = urllib3.ProxyManager(proxy, **options)
+        else:
+            self.http = urllib3.PoolManager(**options)
+        self.slots = asyncio.Semaphore(size)
+
+    async def get(self, url):
+        """``(status, body)`` of ``GET url``."""
+        async with self.slots:
+            response = await asyncio.to_thread(self.http.request, 'GET', url)
+        return response.status, response.data
+
+    def close(self):
+        self.http.clear()
+
+
+def _price(body, field):
+    value = json.loads(body, parse_float=Decimal)
+    for key in field.split('.'):
+        value = value[key]
+    price = Decimal(str(value))
+    if not price.is_finite() or price < 0:
+        raise ValueError(f'Invalid price {value!r}')
+    return price
+
+
+async def fetch_quotes(pairs):
+    """``{(source, symbol): price}`` for the ``pairs`` that could be fetched."""
+    config = sources()
+    clients, limiters, quotes = {}, {}, {}
+    for source in {source for source, _ in pairs}:
+        options = config[source]
+        clients[source] = QuoteClient(options['url'], options.get('connections', DEFAULT_CONNECTIONS),
+                                      options.get('timeout', DEFAULT_TIMEOUT), options.get('headers'))
+        limiters[source] = RateLimiter(options.get('rate', 0))
+
+    async def fetch(source, symbol):
+        options = config[source]
+        url = options['url'].format(symbol=quote(symbol, safe=''))
+        await limiters[source].wait()
+        try:
+            status, body = await clients[source].get(url)
+            if status != 200:
+                raise ValueError(f'HTTP {status}')
+            quotes[source, symbol] = _price(body, options.get('field', 'price'))
+        except Exception as exc:  # Network, HTTP and payload errors alike: skip this quote until the next run
+            logger.warning("Quote for %s:%s failed: %r", source, symbol, exc)
+
+    try:
+        await asyncio.gather(*(fetch(source, symbol) for source, symbol in pairs))
+    finally:
+        for client in clients.values():
+            client.close()
+    return quotes
+
+
+def get_quotes(pairs, use_cache=True):
+    """Prices for ``pairs``, from the cache where fresh and fetched concurrently otherwise."""
+    pairs = set(pairs)
+    keys = {_cache_key(*pair): pair for pair in pairs}
+    cached = cache.get_many(list(keys)) if use_cache else {}
+    quotes = {keys[key]: Decimal(price) for key, price in cached.items()}
+    missing = [pair for pair in pairs if pair not in quotes]
+    fetched = asyncio.run(fetch_quotes(missing)) if missing else {}
+    cache.set_many({_cache_key(*pair): str(price) for pair, price in fetched.items()}, QUOTE_TTL)
+    quotes.update(fetched)
+    return quotes, len(fetched)
+
+
+def refresh(use_cache=True):
+    """Revalue every asset with a configured ``api_source``; returns counts of what happened."""
+    assets = [
+        (asset, pair) for asset in Asset.objects.exclude(api_source=None).exclude(api_source='')
+        .only('id', 'group_id', 'value', 'units', 'api_source').iterator()
+        if (pair := parse_source(asset.api_source)) is not None
+    ]
+    quotes, fetched = get_quotes((pair for _, pair in assets), use_cache)
+
+    now, changed = timezone.now(), []
+    for asset, pair in assets:
+        if pair not in quotes:
+            continue
+        units = asset.units if asset.units is not None else 1
+        value = (quotes[pair] * units).quantize(CENTS, rounding=ROUND_HALF_UP)
+        if value >= MAX_VALUE:
+            logger.warning("Quoted value %s of asset %s is out of range", value, asset.pk)
+        elif value != asset.value:
+            asset.value, asset.last_updated = value, now
+            changed.append(asset)
+    with transaction.atomic():
+        Asset.objects.bulk_update(changed, ['value', 'last_updated'], batch_size=UPDATE_BATCH_SIZE)
+        valuations.record(changed, recorded_at=now)
+    for group_id in {asset.group_id for asset in changed}:
+        changes.bump_group(group_id)
+    return {'assets': len(assets), 'quotes': len(quotes), 'fetched': fetched, 'updated': len(changed)}
@@ -0,0 +1,54 @@
+"""CPU-heavy derivative work run in ``core.derivatives``' process pool.
+
+Only file paths cross the process boundary and nothing here touches Django,
+so spawned workers import this module without setting Django up. Outputs are
+written to a temporary file and renamed into place, so a reader never sees a
+partial derivative.
+"""
+import os
+import tempfile
+
+THUMBNAIL_QUALITY = 80
+MAX_TEXT_CHARS = 200000
+
+
+def _write_atomically(dst, write):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            write(fh)
+        os.replace(tmp, dst)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def render_thumbnail(src, dst, size):
+    """Write a WebP of the image at ``src`` fitted within ``size`` x ``size`` pixels."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as image:
+        image.draft('RGB', (size, size))  # Lets JPEG decode at a reduced scale
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        _write_atomically(dst, lambda fh: image.save(fh, 'WEBP', quality=THUMBNAIL_QUALITY))
+    return dst
+
+
+def extract_pdf_text(src, dst):
+    """Write the text of the PDF at ``src`` (first ``MAX_TEXT_CHARS`` characters) to ``dst``."""
+    from pypdf import PdfReader
+
+    parts, length = [], 0
+    for page in PdfReader(src).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    text = '\n'.join(parts)[:MAX_TEXT_CHARS]
+    _write_atomically(dst, lambda fh: fh.write(text.encode()))
+    return dst
@@ -0,0 +1,209 @@
+"""Per-request profiling: SQL, named spans, Server-Timing and the slow-request log.
+
+``ProfilingMiddleware`` (``core.middleware``) records a ``RequestProfile``
+for every request and makes it current in a context variable, which follows
+the request into ``sync_to_async`` threads. Every database connection
+carries ``record_query`` as its outermost execute wrapper, so queries are
+counted and timed, grouped by their SQL, wherever they run. Code marks its
+own phases with ``span``: JWT authentication (``auth``), group permission
+lookups (``access``), DRF serialization (``serialize``, timed by
+``core.serializers.TimedSerializerMixin``) and numpy work (``compute``).
+Outside a request these cost one context variable lookup.
+
+A fraction ``PROFILING_SAMPLE_RATE`` of WSGI requests also runs under
+cProfile and tracemalloc, one at a time since both are process-wide.
+Requests slower than ``PROFILING_SLOW_MS``, and sampled ones, are logged as
+one JSON object per line with their top queries to the ``core.profiling``
+logger, which settings send to a rotating file. Queries are logged without
+their parameters, so the log holds no user data.
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+DEFAULT_SLOW_MS = 500
+TOP_QUERIES = 10
+PROFILE_LINES = 30
+
+logger = logging.getLogger(__name__)
+_current = ContextVar('core_request_profile', default=None)
+_sampling = threading.Lock()
+_installed = False
+
+
+def _ms_since(start):
+    return (time.perf_counter() - start) * 1000
+
+
+class RequestProfile:
+    """Timings collected while one request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.by_sql = {}  # sql: [count, ms]
+        self.spans = {}
+        self.open_spans = set()
+        self.peak_kb = None
+        self.stats = None
+
+    def add_query(self, sql, ms):
+        self.queries += 1
+        self.sql_ms += ms
+        entry = self.by_sql.setdefault(sql, [0, 0.0])
+        entry[0] += 1
+        entry[1] += ms
+
+    def top_queries(self, n=TOP_QUERIES):
+        """The ``n`` statements that took longest in total, with how often each ran."""
+        ranked = sorted(self.by_sql.items(), key=lambda item: item[1][1], reverse=True)[:n]
+        return [{'sql': sql, 'count': count, 'ms': round(ms, 2)} for sql, (count, ms) in ranked]
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to the current request's ``name`` span (outermost block only)."""
+    profile = _current.get()
+    if profile is None or name in profile.open_spans:
+        yield
+        return
+    profile.open_spans.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.open_spans.discard(name)
+        profile.spans[name] = profile.spans.get(name, 0.0) + _ms_since(start)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper timing each query into the current request's profile."""
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, _ms_since(start))
+
+
+def _wrap_connection(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        # First, so it is outermost and never popped by a caller's ``execute_wrapper`` block
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def install():
+    """Hook ``record_query`` into every database connection; idempotent."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_wrap_connection)
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection=connection)
+
+
+@contextmanager
+def recording(sample=False):
+    """Make a new ``RequestProfile`` current for the block; ``sample`` allows cProfile and tracemalloc."""
+    profile = RequestProfile()
+    token = _current.set(profile)
+    try:
+        if sample and _sampled() and _sampling.acquire(blocking=False):
+            try:
+                with _profiled(profile):
+                    yield profile
+            finally:
+                _sampling.release()
+        else:
+            yield profile
+    finally:
+        _current.reset(token)
+
+
+def _sampled():
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def _profiled(profile):
+    trace = not tracemalloc.is_tracing()  # Leave tracing started by someone else (benchmarks) alone
+    if trace:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+    finally:
+        if trace:
+            profile.peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    profile.stats = out.getvalue()
+
+
+def server_timing(profile, total_ms, view_ms):
+    """``Server-Timing`` header value for ``profile``."""
+    metrics = [f'db;dur={profile.sql_ms:.1f};desc="{profile.queries} queries"']
+    metrics += [f'{name};dur={ms:.1f}' for name, ms in profile.spans.items()]
+    if view_ms is not None:
+        metrics.append(f'view;dur={view_ms:.1f}')
+    if profile.peak_kb is not None:
+        metrics.append(f'mem;desc="peak {profile.peak_kb} KB"')
+    metrics.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(metrics)
+
+
+def finish(request, response, profile):
+    """Add the ``Server-Timing`` header and log the request if it was slow or sampled; returns ``response``."""
+    total_ms = _ms_since(profile.started)
+    view_ms = _ms_since(profile.view_started) if profile.view_started is not None else None
+    if getattr(settings, 'PROFILING_SERVER_TIMING', settings.DEBUG):
+        response['Server-Timing'] = server_timing(profile, total_ms, view_ms)
+
+    slow_ms = getattr(settings, 'PROFILING_SLOW_MS', DEFAULT_SLOW_MS)
+    slow = slow_ms is not None and total_ms >= slow_ms
+    if slow or profile.stats is not None:
+        record = {
+            'at': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,  # Not the query string, which may carry a token
+            'status': response.status_code,
+            'slow': slow,
+            'total_ms': round(total_ms, 2),
+            'view_ms': round(view_ms, 2) if view_ms is not None else None,
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_ms, 2),
+            'spans': {name: round(ms, 2) for name, ms in profile.spans.items()},
+            'top_queries': profile.top_queries(),
+            'peak_kb': profile.peak_kb,
+            'profile': profile.stats,
+        }
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record))
+    return response
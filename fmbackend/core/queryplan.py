@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _concrete_names(model):
+    return [f.name for f in model._meta.concrete_fields]
+
+
+def _walk(serializer, model, prefix, select, prefetch, only):
+    """Collect the lookups needed to render ``serializer`` without extra queries."""
+    names = {model._meta.pk.name}
+    restrict = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField) or field.source == '*' or '.' in field.source:
+            # Can't tell which columns these read, so load the whole row.
+            restrict = False
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            restrict = False
+            continue
+
+        many = isinstance(field, serializers.ListSerializer)
+        nested = field.child if many else field
+        if model_field.is_relation and isinstance(nested, serializers.ModelSerializer):
+            path = prefix + field.source
+            if (model_field.many_to_one or model_field.one_to_one) and not many:
+                select.append(path)
+                names.add(field.source)
+                _walk(nested, model_field.related_model, path + '__', select, prefetch, only)
+            else:
+                prefetch.append((path, type(nested)))
+            continue
+        names.add(field.source)
+
+    if not restrict:
+        names.update(_concrete_names(model))
+    only.extend(prefix + name for name in sorted(names))
+
+
+@lru_cache(maxsize=None)
+def get_query_plan(serializer_class):
+    """Return ``(select_related, prefetch_related, only)`` lookups for a serializer.
+
+    The plan is derived from the serializer's field tree: forward foreign keys
+    rendered by a nested serializer are joined, many-valued nested serializers
+    are prefetched, and only the columns the tree actually reads are loaded.
+    """
+    select, prefetch, only = [], [], []
+    serializer = serializer_class()
+    _walk(serializer, serializer_class.Meta.model, '', select, prefetch, only)
+    return tuple(select), tuple(prefetch), tuple(only)
+
+
+def optimize_queryset(queryset, serializer_class, restrict_columns=True):
+    """Apply the serializer's query plan to ``queryset``."""
+    select, prefetch, only = get_query_plan(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    for path, nested_class in prefetch:
+        # Prefetch querysets keep every column so the link back to the parent
+        # row is always available.
+        nested_qs = optimize_queryset(nested_class.Meta.model._default_manager.all(), nested_class,
+                                      restrict_columns=False)
+        queryset = queryset.prefetch_related(Prefetch(path, queryset=nested_qs))
+    if restrict_columns:
+        queryset = queryset.only(*only)
+    return queryset
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import MonthlyRollup, Transaction
+
+ZERO = Decimal('0.00')
+
+
+def month_of(date):
+    """First day of the (local) month a transaction date falls in."""
+    if timezone.is_aware(date):
+        date = timezone.localtime(date)
+    return date.date().replace(day=1)
+
+
+def _add(group_id, month, category, income, expense, count):
+    updates = {'income': F('income') + income, 'expense': F('expense') + expense, 'count': F('count') + count}
+    if count < 0:
+        # Removals only update: a missing row was deleted along with its group, and has nothing left to subtract
+        MonthlyRollup.objects.filter(group_id=group_id, month=month, category=category).update(**updates)
+        return
+    with transaction.atomic():
+        rollup, _ = MonthlyRollup.objects.get_or_create(group_id=group_id, month=month, category=category)
+        MonthlyRollup.objects.filter(pk=rollup.pk).update(**updates)
+
+
+def apply_transaction(group_id, date, category, amount, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) one transaction from its rollup row."""
+    amount = Decimal(amount)
+    income = amount if amount > 0 else ZERO
+    expense = amount if amount < 0 else ZERO
+    _add(group_id, month_of(date), category or '', sign * income, sign * expense, sign)
+
+
+def apply_many(transactions):
+    """Add bulk-created transactions, touching each rollup row once."""
+    deltas = {}
+    for txn in transactions:
+        key = (txn.group_id, month_of(txn.date), txn.category or '')
+        income, expense, count = deltas.get(key, (ZERO, ZERO, 0))
+        amount = Decimal(txn.amount)
+        if amount > 0:
+            income += amount
+        else:
+            expense += amount
+        deltas[key] = (income, expense, count + 1)
+    for (group_id, month, category), (income, expense, count) in deltas.items():
+        _add(group_id, month, category, income, expense, count)
+
+
+def rebuild(group_ids=None):
+    """Recompute rollups from the transaction table in one aggregate query.
+
+    Used for the initial backfill and after bulk writes that bypass signals.
+    Returns the number of rollup rows written.
+    """
+    transactions = Transaction.objects.all()
+    rollups = MonthlyRollup.objects.all()
+    if group_ids is not None:
+        transactions = transactions.filter(group_id__in=group_ids)
+        rollups = rollups.filter(group_id__in=group_ids)
+
+    money = DecimalField(max_digits=17, decimal_places=2)
+    rows = (
+        transactions
+        .annotate(month=TruncMonth('date'), bucket=Coalesce('category', Value('')))
+        .values('group_id', 'month', 'bucket')
+        .annotate(
+            income=Coalesce(Sum('amount', filter=Q(amount__gt=0)), ZERO, output_field=money),
+            expense=Coalesce(Sum('amount', filter=Q(amount__lt=0)), ZERO, output_field=money),
+            count=Count('id'),
+        )
+    )
+    objs = [
+        MonthlyRollup(group_id=row['group_id'], month=month_of(row['month']), category=row['bucket'],
+                      income=row['income'], expense=row['expense'], count=row['count'])
+        for row in rows
+    ]
+    with transaction.atomic():
+        rollups.delete()
+        MonthlyRollup.objects.bulk_create(objs, batch_size=500)
+    return len(objs)
@@ -0,0 +1,51 @@
+"""Read routing: queries of read-only requests go to the ``read`` connection.
+
+``read_routing_middleware`` (``core.middleware``) wraps GET, HEAD and
+OPTIONS requests in ``reading``, and ``ReadRouter`` sends their reads to
+``READ_ALIAS``. That connection opens the same SQLite file ``query_only``
+(see ``fmbackend/database.py``). Under WAL its reads never queue behind an
+import or bulk update holding the write lock, and a stray write through it
+fails loudly.
+
+Writes always go to ``default``, even for objects read through ``read``.
+Reads inside an atomic block on ``default`` stay there too, so they see the
+block's own writes. Outside a transaction every read is a fresh snapshot,
+so a request still reads what it just wrote. Without a ``read`` entry in
+``DATABASES`` everything stays on ``default``.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'read'
+
+_reading = ContextVar('core_reading', default=False)
+
+
+@contextmanager
+def reading():
+    """Send the reads in the block to ``READ_ALIAS``."""
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+class ReadRouter:
+    def db_for_read(self, model, **hints):
+        if (_reading.get() and READ_ALIAS in settings.DATABASES
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return READ_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Both aliases are the same database
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != READ_ALIAS
@@ -1,6 +1,34 @@
 from rest_framework import serializers
 from .models import User, FamilyGroup, UserGroup, Asset, Transaction, Document, Notification
 from django.contrib.auth import authenticate
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from .storage import MAX_UPLOAD_SIZE
+from . import profiling
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with profiling.span('serialize'):
+            return super().data
+
+class TimedSerializerMixin:
+    """Count the time spent producing ``.data`` as the request's ``serialize`` span (see ``core.profiling``).
+
+    Also times ``many=True`` use, by defaulting ``Meta.list_serializer_class``
+    to ``TimedListSerializer``. Nested serializers never produce ``.data``.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = cls.__dict__.get('Meta')
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with profiling.span('serialize'):
+            return super().data
 
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -22,10 +50,22 @@ class LoginSerializer(serializers.Serializer):
         data['user'] = user
         return data
 
-class UserSerializer(serializers.ModelSerializer):
+class StorageURLField(serializers.ReadOnlyField):
+    """URL of a file stored under the name held in a CharField (absolute when a request is in the context)."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = default_storage.url(value)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    profile_thumb = StorageURLField()
+
     class Meta:
         model = User
-        fields = ['id', 'email', 'role', 'first_name', 'last_name', 'date_joined', 'profile_img']
+        fields = ['id', 'email', 'role', 'first_name', 'last_name', 'date_joined', 'profile_img', 'profile_thumb']
         read_only_fields = ['id', 'date_joined']
         extra_kwargs = {
             'password': {'write_only': True}
@@ -43,7 +83,7 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
-class FamilyGroupSerializer(serializers.ModelSerializer):
+class FamilyGroupSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     admin = UserSerializer(read_only=True)
 
     class Meta:
@@ -51,7 +91,7 @@ class FamilyGroupSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'admin', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-class UserGroupSerializer(serializers.ModelSerializer):
+class UserGroupSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     group = FamilyGroupSerializer(read_only=True)
 
@@ -71,12 +111,12 @@ class UserGroupSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(f"Invalid permission value for {key}: {value[key]}")
         return value
 
-class AssetSerializer(serializers.ModelSerializer):
+class AssetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     group = FamilyGroupSerializer(read_only=True)
 
     class Meta:
         model = Asset
-        fields = ['id', 'group', 'type', 'name', 'value', 'last_updated', 'api_source']
+        fields = ['id', 'group', 'type', 'name', 'value', 'last_updated', 'api_source', 'units']
         read_only_fields = ['id', 'last_updated']
 
     def validate_value(self, value):
@@ -84,7 +124,7 @@ class AssetSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Asset value cannot be negative.")
         return value
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     asset = AssetSerializer(read_only=True)
     group = FamilyGroupSerializer(read_only=True)
 
@@ -98,14 +138,26 @@ class TransactionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Amount is required.")
         return value
 
-class DocumentSerializer(serializers.ModelSerializer):
+class TransactionImportSerializer(TransactionSerializer):
+    """Validates one row of a bulk transaction import."""
+    asset = serializers.UUIDField()
+    group = None
+
+    class Meta:
+        model = Transaction
+        fields = ['asset', 'amount', 'category', 'description', 'date']
+
+class DocumentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     group = FamilyGroupSerializer(read_only=True)
     file_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+    preview = StorageURLField()
 
     class Meta:
         model = Document
-        fields = ['id', 'group', 'name', 'file', 'file_url', 'type', 'expiry_date', 'uploaded_at']
-        read_only_fields = ['id', 'uploaded_at', 'file_url']
+        fields = ['id', 'group', 'name', 'file', 'file_url', 'download_url', 'preview', 'type', 'expiry_date',
+                  'uploaded_at']
+        read_only_fields = ['id', 'uploaded_at', 'file_url', 'download_url']
 
     def get_file_url(self, obj):
         request = self.context.get('request')
@@ -113,12 +165,18 @@ class DocumentSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.file.url)
         return None
 
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        if obj.file and request:
+            return request.build_absolute_uri(reverse('document_download', args=[obj.id]))
+        return None
+
     def validate_file(self, value):
-        if value.size > 10 * 1024 * 1024:  # 10MB limit
+        if value.size > MAX_UPLOAD_SIZE:  # 10MB; larger uploads are not stored past the limit
             raise serializers.ValidationError("File size must not exceed 10MB.")
         return value
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
@@ -131,17 +189,27 @@ class NotificationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Message cannot be empty.")
         return value
 
-class UserGroupUpdateSerializer(serializers.ModelSerializer):
+class UserGroupUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = UserGroup
         fields = ['permissions']
 
-class DocumentUpdateSerializer(serializers.ModelSerializer):
+class DocumentUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = ['name', 'type', 'expiry_date']
 
-class NotificationUpdateSerializer(serializers.ModelSerializer):
+class NotificationUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['is_read']
\ No newline at end of file
+        fields = ['is_read']
+
+class NotificationSelectionSerializer(serializers.Serializer):
+    """Which of the user's notifications a bulk operation applies to (all of them when no filter is given)."""
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, max_length=10000)
+    type = serializers.ChoiceField(choices=Notification._meta.get_field('type').choices, required=False)
+    before = serializers.DateTimeField(required=False)
+    is_read = serializers.BooleanField(required=False)
+
+class NotificationBulkUpdateSerializer(NotificationSelectionSerializer):
+    is_read = serializers.BooleanField(default=True)  # The value to set rather than a filter
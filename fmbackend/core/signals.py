@@ -0,0 +1,149 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User, FamilyGroup, UserGroup, Asset, Transaction, Document, Notification
+from . import access, changes, inbox, jobs, rollups, storage, valuations
+from .authentication import bump_membership_version
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_rollup_key(sender, instance, **kwargs):
+    """Stash the stored values of an updated transaction so its old rollup can be reversed."""
+    instance._rollup_old = None
+    if not instance._state.adding:
+        instance._rollup_old = (
+            Transaction.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'date', 'category', 'amount')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_rollup_old', None)
+    if old is not None:
+        rollups.apply_transaction(*old, sign=-1)
+    rollups.apply_transaction(instance.group_id, instance.date, instance.category, instance.amount)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleting a group (or its admin) cascades to its rollups as well, so there is nothing to subtract from
+    if getattr(origin, 'model', type(origin)) in (FamilyGroup, User):
+        return
+    rollups.apply_transaction(instance.group_id, instance.date, instance.category, instance.amount, sign=-1)
+
+
+@receiver(post_save, sender=UserGroup)
+@receiver(post_delete, sender=UserGroup)
+def invalidate_group_permissions(sender, instance, **kwargs):
+    access.invalidate(instance.user_id)
+    bump_membership_version(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    bump_membership_version(instance.pk)
+    # Group payloads embed the group admin
+    for group_id in FamilyGroup.objects.filter(admin=instance).values_list('id', flat=True):
+        changes.bump_group(group_id)
+
+
+@receiver(post_save, sender=FamilyGroup)
+@receiver(post_delete, sender=FamilyGroup)
+def bump_group_stamp(sender, instance, **kwargs):
+    changes.bump_group(instance.pk)
+
+
+@receiver(pre_save, sender=Asset)
+def remember_asset_value(sender, instance, **kwargs):
+    instance._old_value = None
+    if not instance._state.adding:
+        instance._old_value = Asset.objects.filter(pk=instance.pk).values_list('value', flat=True).first()
+
+
+@receiver(post_save, sender=Asset)
+def record_valuation(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created or instance.value != getattr(instance, '_old_value', None):
+        valuations.record([instance])
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_delete, sender=Asset)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def bump_group_data_stamp(sender, instance, **kwargs):
+    changes.bump_group(instance.group_id)
+
+
+@receiver(pre_save, sender=Notification)
+def remember_read_state(sender, instance, **kwargs):
+    instance._was_unread = False
+    if not instance._state.adding:
+        instance._was_unread = Notification.objects.filter(pk=instance.pk, is_read=False).exists()
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_unread = not created and instance._was_unread
+    inbox.adjust(instance.user_id, (not instance.is_read) - was_unread)
+
+
+@receiver(post_delete, sender=Notification)
+def count_unread_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        inbox.adjust(instance.user_id, -1)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def bump_notification_stamp(sender, instance, **kwargs):
+    changes.bump_user(instance.user_id)
+
+
+@receiver(pre_save, sender=Document)
+def remember_blob(sender, instance, **kwargs):
+    instance._old_file = None
+    if not instance._state.adding:
+        instance._old_file = Document.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+
+@receiver(post_save, sender=Document)
+def count_blob_references(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._old_file
+    if instance.file.name != old:
+        storage.retain(instance.file.name)
+        storage.release(old)
+        if instance.file:
+            transaction.on_commit(lambda: jobs.enqueue('derivatives.document', document_id=str(instance.pk)))
+
+
+@receiver(post_delete, sender=Document)
+def release_blob(sender, instance, **kwargs):
+    storage.release(instance.file.name)
+
+
+@receiver(pre_save, sender=User)
+def remember_profile_img(sender, instance, update_fields=None, **kwargs):
+    instance._old_profile_img = instance.profile_img.name
+    if not instance._state.adding and (update_fields is None or 'profile_img' in update_fields):
+        instance._old_profile_img = User.objects.filter(pk=instance.pk).values_list('profile_img', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def queue_profile_derivatives(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._old_profile_img
+    if (instance.profile_img.name or None) != (old or None):
+        transaction.on_commit(lambda: jobs.enqueue('derivatives.profile', user_id=str(instance.pk)))
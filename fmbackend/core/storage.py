@@ -0,0 +1,188 @@
+"""Content-addressed document storage.
+
+Uploaded files are stored once per distinct content under
+``blobs/<first two hex digits>/<sha256><ext>`` and tracked by a ``Blob`` row
+with a reference count (kept by the ``Document`` signals in
+``core.signals``). Saving content that is already stored writes nothing and
+returns the existing name.
+
+Document uploads go through the handlers of ``use_upload_handlers``. They
+hash each file while Django streams the request body to memory or a
+temporary file, so the storage knows the digest without reading the file
+again, and stop writing a file once it passes ``MAX_UPLOAD_SIZE`` (the
+serializer then rejects it with the full size). Other uploads, such as bulk
+imports, keep Django's handlers and are never cut short. Blobs whose count
+drops to zero are deleted by ``collect_garbage`` after a grace period.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+BLOB_DIR = 'blobs'
+GARBAGE_GRACE = timedelta(hours=1)  # Longer than any upload takes to go from storage to a saved Document
+BLOB_NAME = re.compile(rf'^{BLOB_DIR}/[0-9a-f]{{2}}/([0-9a-f]{{64}})')
+
+
+def _blobs():
+    # Resolved lazily: models.py imports this module for Document.file
+    return apps.get_model('core', 'Blob').objects
+
+
+class HashingUploadMixin:
+    """Hash a file's bytes as they arrive and drop everything past ``MAX_UPLOAD_SIZE``."""
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        self.received = 0
+        super().new_file(*args, **kwargs)  # Raises StopFutureHandlers when the memory handler takes the file
+
+    def receive_data_chunk(self, raw_data, start):
+        if getattr(self, 'activated', True):
+            self.received += len(raw_data)
+            if self.received > MAX_UPLOAD_SIZE:
+                return None  # Too large: stop storing; the reported size still counts every byte
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None and self.received <= MAX_UPLOAD_SIZE:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def use_upload_handlers(request):
+    """Receive ``request``'s files with the hashing handlers; call before its body is read."""
+    request.upload_handlers = [HashingMemoryFileUploadHandler(request), HashingTemporaryFileUploadHandler(request)]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that keeps one copy of each distinct content."""
+
+    def _save(self, name, content):
+        digest = getattr(content, 'sha256', None)
+        if digest is not None:
+            existing = self._reuse(digest)
+            if existing is not None:
+                return existing
+            blob_name = self._blob_name(digest, name)
+            if not self.exists(blob_name):
+                blob_name = super()._save(blob_name, content)
+        else:
+            digest, blob_name = self._save_hashing(name, content)
+            existing = self._reuse(digest)
+            if existing is not None:
+                if existing != blob_name:
+                    self.delete(blob_name)  # Same content stored under another extension
+                return existing
+        return self._register(digest, blob_name, content.size)
+
+    def _blob_name(self, digest, name):
+        return f'{BLOB_DIR}/{digest[:2]}/{digest}{os.path.splitext(name)[1].lower()}'
+
+    def _reuse(self, digest):
+        """Name of the stored blob with ``digest`` (touched so garbage collection skips it), if any."""
+        if _blobs().filter(sha256=digest).update(last_used_at=timezone.now()):
+            return _blobs().filter(sha256=digest).values_list('name', flat=True).first()
+        return None
+
+    def _save_hashing(self, name, content):
+        """Stream ``content`` to a temporary file while hashing it, then move it into place."""
+        directory = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(directory, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+            digest = hasher.hexdigest()
+            blob_name = self._blob_name(digest, name)
+            if self.exists(blob_name):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(self.path(blob_name)), exist_ok=True)
+                file_move_safe(tmp_path, self.path(blob_name), allow_overwrite=True)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest, blob_name
+
+    def _register(self, digest, blob_name, size):
+        try:
+            _blobs().create(sha256=digest, name=blob_name, size=size)
+        except IntegrityError:
+            # A concurrent upload of the same content registered it first
+            return self._reuse(digest) or blob_name
+        return blob_name
+
+
+def blob_digest(name):
+    """SHA-256 of the blob stored as ``name``, or ``None`` for files outside the content-addressed layout."""
+    match = BLOB_NAME.match(name or '')
+    return match.group(1) if match else None
+
+
+def file_digest(field_file):
+    """SHA-256 of a stored file, read from its name when it is a blob."""
+    digest = blob_digest(field_file.name)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with field_file.storage.open(field_file.name, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+    return digest
+
+
+def retain(name):
+    """Count one more document referencing the blob stored as ``name`` (no-op for non-blob files)."""
+    if name:
+        _blobs().filter(name=name).update(ref_count=F('ref_count') + 1, last_used_at=timezone.now())
+
+
+def release(name):
+    if name:
+        _blobs().filter(name=name).update(ref_count=F('ref_count') - 1, last_used_at=timezone.now())
+
+
+def collect_garbage(grace=GARBAGE_GRACE):
+    """Delete blobs no document has referenced for ``grace``; returns the number deleted."""
+    storage = apps.get_model('core', 'Document')._meta.get_field('file').storage
+    cutoff = timezone.now() - grace
+    deleted = 0
+    for sha256, name in _blobs().filter(ref_count__lte=0, last_used_at__lt=cutoff).values_list('sha256', 'name'):
+        # Re-checked in the DELETE so a blob reused meanwhile survives
+        if _blobs().filter(sha256=sha256, ref_count__lte=0, last_used_at__lt=cutoff).delete()[0]:
+            storage.delete(name)
+            deleted += 1
+    return deleted
+
+
+def document_storage():
+    """Storage for ``Document.file`` (a callable, so migrations do not serialise the instance)."""
+    return ContentAddressedStorage()
@@ -0,0 +1,142 @@
+"""Server-sent event stream of a user's new notifications.
+
+Idle connections cost no database work. One poller per process reads the
+notification change stamps (``core.changes``) of every connected user with a
+single ``cache.get_many`` per ``POLL_INTERVAL`` and wakes only the streams
+whose stamp moved; those then fetch their rows past the stream's cursor. The
+stamps are bumped by the ``Notification`` signals and by bulk writers such as
+the document expiry job, in this process or any other sharing the cache.
+
+``created_at`` is set before a row is inserted, so a notification can commit
+after a later one that the stream already passed. Each fetch therefore also
+re-scans the ``OVERLAP`` behind the cursor, skipping the ids it already sent.
+"""
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Notification
+from .pagination import NotificationPagination
+from .queryplan import optimize_queryset
+from .serializers import NotificationSerializer
+from . import changes
+
+POLL_INTERVAL = 1.0
+KEEPALIVE_INTERVAL = 15.0
+BATCH_SIZE = 100
+RETRY_MS = 3000
+OVERLAP = timedelta(seconds=30)  # Longer than a writer waits for the lock (fmbackend/database.py)
+
+cursors = NotificationPagination()
+
+
+class Hub:
+    """Wakes the streams of users whose notification stamp changed."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.listeners = {}  # user_id -> set of asyncio.Event
+        self.stamps = {}
+        self.task = None
+
+    def subscribe(self, user_id, stamp):
+        """Listen for changes to ``user_id`` made after ``stamp`` was read."""
+        event = asyncio.Event()
+        self.listeners.setdefault(user_id, set()).add(event)
+        self.stamps.setdefault(user_id, stamp)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.poll())
+        return event
+
+    def unsubscribe(self, user_id, event):
+        events = self.listeners.get(user_id, set())
+        events.discard(event)
+        if not events:
+            self.listeners.pop(user_id, None)
+            self.stamps.pop(user_id, None)
+
+    async def poll(self):
+        while self.listeners:
+            user_ids = list(self.listeners)
+            stamps = await sync_to_async(changes.user_stamps)(user_ids)
+            for user_id, stamp in zip(user_ids, stamps):
+                if user_id in self.stamps and self.stamps[user_id] != stamp:
+                    for event in self.listeners.get(user_id, ()):
+                        event.set()
+                if user_id in self.listeners:
+                    self.stamps[user_id] = stamp
+            await asyncio.sleep(self.interval)
+
+
+hub = Hub()
+
+
+def _frame(notification, cursor):
+    data = json.dumps(NotificationSerializer(notification).data, cls=JSONEncoder, separators=(',', ':'))
+    return f'id: {cursors.encode_cursor(cursor)}\nevent: notification\ndata: {data}\n\n'
+
+
+@sync_to_async
+def _fetch(user, cursor, sent):
+    """Frames for up to ``BATCH_SIZE`` notifications not yet sent, and the new cursor.
+
+    Looks past ``cursor`` and in the ``OVERLAP`` behind it. ``sent`` maps the
+    ids streamed within the overlap to their ``created_at``; it is updated in
+    place. A frame's id is the cursor after it, which never moves backwards.
+    """
+    notifications = Notification.objects.filter(user=user)
+    if cursor is not None:
+        notifications = notifications.filter(created_at__gte=cursor[0] - OVERLAP).exclude(id__in=list(sent))
+    rows = list(optimize_queryset(notifications.order_by('created_at', 'id'), NotificationSerializer)[:BATCH_SIZE])
+    frames = []
+    for row in rows:
+        key = (row.created_at, row.id)
+        cursor = max(cursor, key) if cursor is not None else key
+        sent[row.id] = row.created_at
+        frames.append(_frame(row, cursor))
+    if cursor is not None:
+        horizon = cursor[0] - OVERLAP
+        for pk in [pk for pk, created_at in sent.items() if created_at < horizon]:
+            del sent[pk]
+    return frames, cursor
+
+
+@sync_to_async
+def _start(user, cursor):
+    """The cursor to stream from (default: the latest notification) and the ids in the overlap up to it."""
+    notifications = Notification.objects.filter(user=user)
+    if cursor is None:
+        cursor = notifications.order_by('-created_at', '-id').values_list('created_at', 'id').first()
+        if cursor is None:
+            return None, {}
+    created_at, pk = cursor
+    seen = notifications.filter(created_at__gte=created_at - OVERLAP).filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk))
+    return cursor, dict(seen.values_list('id', 'created_at'))
+
+
+async def events(user, cursor=None):
+    """Yield SSE frames for ``user``'s notifications created after ``cursor`` (default: from now on)."""
+    [stamp] = await sync_to_async(changes.user_stamps)([user.pk])
+    cursor, sent = await _start(user, cursor)
+    event = hub.subscribe(user.pk, stamp)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            event.clear()
+            while True:
+                frames, cursor = await _fetch(user, cursor, sent)
+                if frames:
+                    yield ''.join(frames)
+                if len(frames) < BATCH_SIZE:
+                    break
+            try:
+                await asyncio.wait_for(event.wait(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        hub.unsubscribe(user.pk, event)
@@ -0,0 +1,218 @@
+"""Deterministic synthetic families for benchmarks and local development.
+
+``generate`` creates families (a group, its head and members with a mix of
+permission profiles), their assets with a valuation history, a transaction
+ledger, documents and notifications. Everything random, primary keys
+included, comes from one ``random.Random(seed)``, so a seed reproduces the
+same dataset relative to ``end``. Ledger sizes are heavy-tailed across
+families and amounts are log-normal per category, as real ledgers are.
+
+Small tables are inserted with ``bulk_create``. Transactions, valuations
+and notifications (millions of rows) are inserted as value tuples with
+``executemany``, which avoids building model instances and costs about half
+as much per row. Both skip the signals, so the rollups, unread counters and
+blob reference counts those maintain are rebuilt at the end. The whole
+dataset is written in one transaction. Read notifications past the
+retention period are archived as the worker would.
+"""
+import random
+import uuid
+from datetime import timedelta
+from itertools import islice
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import (User, FamilyGroup, UserGroup, Asset, AssetValuation, Transaction, Document, Notification,
+                     Blob)
+from . import inbox, rollups
+
+PASSWORD = 'synthetic'
+EMAIL_DOMAIN = 'synthetic.example'
+BATCH_SIZE = 5000
+FULL_PERMISSIONS = {'assets': 'write', 'transactions': 'write', 'documents': 'write'}
+# (role, permissions, weight) of the members besides each family's head
+MEMBER_PROFILES = [
+    ('family_member', FULL_PERMISSIONS, 4),
+    ('family_member', {'assets': 'read', 'transactions': 'read', 'documents': 'read'}, 3),
+    ('family_member', {'assets': 'none', 'transactions': 'write', 'documents': 'none'}, 2),
+    ('accountant', {'assets': 'read', 'transactions': 'write', 'documents': 'read'}, 2),
+    ('family_member', {'assets': 'none', 'transactions': 'none', 'documents': 'read'}, 1),
+]
+# type: (weight, log-normal mu and sigma of the value)
+ASSET_TYPES = {
+    'bank_account': (5, 9.0, 1.0),
+    'security': (3, 9.5, 1.2),
+    'property': (1, 12.8, 0.5),
+    'business': (1, 12.0, 1.0),
+}
+TICKERS = ['AAPL', 'MSFT', 'GOOG', 'AMZN', 'NVDA', 'VTI', 'VOO', 'BND', 'VXUS', 'SCHD']
+# category: (weight, sign, log-normal mu and sigma of the amount, description)
+CATEGORIES = {
+    'groceries': (30, -1, 4.0, 0.6, 'Supermarket'),
+    'dining': (15, -1, 3.4, 0.7, 'Restaurant'),
+    'utilities': (8, -1, 4.8, 0.4, 'Utility bill'),
+    'rent': (5, -1, 7.3, 0.3, 'Rent'),
+    'insurance': (3, -1, 5.2, 0.5, 'Insurance premium'),
+    'travel': (4, -1, 6.0, 1.0, 'Travel booking'),
+    'salary': (6, 1, 8.2, 0.3, 'Salary'),
+    None: (9, -1, 3.8, 1.0, 'Card payment'),
+}
+DOCUMENT_TYPES = ['will', 'policy', 'tax_form']
+DOCUMENT_CONTENTS = 20  # Distinct files shared by all documents, as scanned forms often are
+NOTIFICATION_TYPES = ['reminder', 'alert']
+READ_FRACTION = 0.7
+VALUATION_STEP = timedelta(days=30)
+NOTIFICATION_DAYS = 180
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _money(value):
+    return Decimal(round(value * 100)) / 100
+
+
+def _insert(model, field_names, rows):
+    """INSERT the value tuples ``rows`` (any iterable) in ``BATCH_SIZE`` batches; returns the number inserted."""
+    db = transaction.get_connection()  # The wrapper itself: every attribute of the connection proxy is a lookup
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = db.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(quote(f.column) for f in fields), ', '.join(['%s'] * len(fields)))
+    rows, count = iter(rows), 0
+    with db.cursor() as cursor:
+        while batch := list(islice(rows, BATCH_SIZE)):
+            cursor.executemany(sql, [[f.get_db_prep_save(v, db) for f, v in zip(fields, row)]
+                                     for row in batch])
+            count += len(batch)
+    return count
+
+
+def generate(families=100, members=3, assets=4, transactions=100000, documents=5, notifications=50, days=730,
+             seed=0, end=None):
+    """Create a synthetic dataset; returns the number of rows created per model.
+
+    ``members``, ``assets``, ``documents`` and ``notifications`` (per user)
+    are averages; ``transactions`` is the ledger's total size.
+    """
+    with transaction.atomic():
+        return _generate(families, members, assets, transactions, documents, notifications, days, seed, end)
+
+
+def _generate(families, members, assets, transactions, documents, notifications, days, seed, end):
+    rng = random.Random(seed)
+    end = end or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    password = make_password(PASSWORD)
+
+    def email(name):
+        return f'{name}.s{seed}@{EMAIL_DOMAIN}'
+
+    admin = User(id=_uuid(rng), email=email('admin'), username='admin', role='admin', is_staff=True,
+                 password=password, first_name='Site', last_name='Admin')
+    users, groups, memberships, family_assets = [admin], [], [], []
+    roles, profiles, weights = zip(*MEMBER_PROFILES)
+    asset_weights = [spec[0] for spec in ASSET_TYPES.values()]
+    for f in range(families):
+        head = User(id=_uuid(rng), email=email(f'head{f}'), username=f'head{f}', role='family_member',
+                    password=password, first_name='Head', last_name=f'Family{f}')
+        group = FamilyGroup(id=_uuid(rng), name=f'Family {f}', admin=head)
+        users.append(head)
+        groups.append(group)
+        memberships.append(UserGroup(user=head, group=group, permissions=FULL_PERMISSIONS))
+        for m in range(rng.randint(0, 2 * members)):
+            i = rng.choices(range(len(MEMBER_PROFILES)), weights=weights)[0]
+            user = User(id=_uuid(rng), email=email(f'member{f}.{m}'), username=f'member{f}.{m}'[:20],
+                        role=roles[i], password=password, first_name='Member', last_name=f'Family{f}')
+            users.append(user)
+            memberships.append(UserGroup(user=user, group=group, permissions=profiles[i]))
+        owned = []
+        for a in range(max(1, rng.randint(1, 2 * assets - 1))):
+            type = 'bank_account' if a == 0 else rng.choices(list(ASSET_TYPES), asset_weights)[0]
+            _, mu, sigma = ASSET_TYPES[type]
+            units = api_source = None
+            if type == 'security':
+                units = Decimal(rng.randint(1, 500))
+                api_source = f'stocks:{rng.choice(TICKERS)}'
+            owned.append(Asset(id=_uuid(rng), group=group, type=type, name=f'{type.replace("_", " ").title()} {a}',
+                               value=_money(rng.lognormvariate(mu, sigma)), units=units, api_source=api_source))
+        family_assets.append(owned)
+
+    all_assets = [a for owned in family_assets for a in owned]
+    counts = {
+        'users': len(User.objects.bulk_create(users, batch_size=BATCH_SIZE)),
+        'groups': len(FamilyGroup.objects.bulk_create(groups, batch_size=BATCH_SIZE)),
+        'memberships': len(UserGroup.objects.bulk_create(memberships, batch_size=BATCH_SIZE)),
+        'assets': len(Asset.objects.bulk_create(all_assets, batch_size=BATCH_SIZE)),
+    }
+    counts['valuations'] = _insert(AssetValuation, ('asset', 'group', 'recorded_at', 'value'),
+                                   _valuations(rng, all_assets, start, end))
+    counts['transactions'] = _insert(
+        Transaction, ('id', 'group', 'asset', 'amount', 'category', 'description', 'date', 'is_unusual', 'created_at'),
+        _transactions(rng, groups, family_assets, transactions, start, end))
+    counts['documents'] = _documents(rng, groups, documents, end)
+    counts['notifications'] = _insert(Notification, ('id', 'user', 'message', 'type', 'is_read', 'created_at'),
+                                      _notifications(rng, users, notifications, end))
+
+    rollups.rebuild()
+    inbox.archive_read()
+    inbox.recount()
+    return counts
+
+
+def _valuations(rng, assets, start, end):
+    """A monthly random walk ending at each asset's current value."""
+    for asset in assets:
+        value, at = float(asset.value), end
+        while at >= start:
+            yield asset.pk, asset.group_id, at, _money(value)
+            value /= rng.lognormvariate(0.004, 0.03)
+            at -= VALUATION_STEP
+
+
+def _transactions(rng, groups, family_assets, count, start, end):
+    # Heavy-tailed ledger sizes: a few families hold most of the transactions
+    family_weights = [rng.paretovariate(1.2) for _ in groups]
+    categories = list(CATEGORIES)
+    category_weights = [spec[0] for spec in CATEGORIES.values()]
+    span = int((end - start).total_seconds())
+    created_at = timezone.now()
+    for _ in range(0, count, BATCH_SIZE):
+        n = min(BATCH_SIZE, count)
+        count -= n
+        for f, category in zip(rng.choices(range(len(groups)), family_weights, k=n),
+                               rng.choices(categories, category_weights, k=n)):
+            _, sign, mu, sigma, description = CATEGORIES[category]
+            amount = sign * _money(rng.lognormvariate(mu, sigma))
+            yield (_uuid(rng), groups[f].pk, rng.choice(family_assets[f]).pk, amount, category, description,
+                   start + timedelta(seconds=rng.randrange(span)), False, created_at)
+
+
+def _documents(rng, groups, per_family, end):
+    storage = Document._meta.get_field('file').storage
+    names = [storage.save(f'documents/synthetic-{i}.txt',
+                          ContentFile(f'Synthetic document {i}\n'.encode() * rng.randint(10, 2000)))
+             for i in range(DOCUMENT_CONTENTS)]
+    created = len(Document.objects.bulk_create([
+        Document(id=_uuid(rng), group=group, name=f'{type.replace("_", " ").title()} {d}', type=type,
+                 file=rng.choice(names),
+                 expiry_date=(end + timedelta(days=rng.randint(-30, 3 * 365))).date() if rng.random() < 0.6 else None)
+        for group in groups
+        for d, type in enumerate(rng.choices(DOCUMENT_TYPES, k=rng.randint(0, 2 * per_family)))
+    ], batch_size=BATCH_SIZE))
+    for name, references in Document.objects.filter(file__in=names).values_list('file').annotate(n=Count('id')):
+        Blob.objects.filter(name=name).update(ref_count=F('ref_count') + references)
+    return created
+
+
+def _notifications(rng, users, per_user, end):
+    for user in users:
+        for _ in range(rng.randint(0, 2 * per_user)):
+            yield (_uuid(rng), user.pk, 'Synthetic notification', rng.choice(NOTIFICATION_TYPES),
+                   rng.random() < READ_FRACTION, end - timedelta(seconds=rng.randrange(NOTIFICATION_DAYS * 24 * 3600)))
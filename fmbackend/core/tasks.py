@@ -0,0 +1,104 @@
+"""Background tasks run by the job worker (see ``core.jobs``)."""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import User, UserGroup, Document, Notification
+from . import access, anomalies, changes, dashboard, derivatives, inbox, insights, jobs, prices, rollups, storage
+
+REMINDER_DAYS = 30
+REMINDER_BATCH_SIZE = 500
+ACTIVE_USER_DAYS = 30
+
+
+@jobs.task('anomalies.score_new', every=timedelta(minutes=15))
+def score_unusual_transactions():
+    anomalies.score_new()
+
+
+@jobs.task('prices.refresh', every=timedelta(minutes=15))
+def refresh_asset_prices():
+    prices.refresh()
+
+
+@jobs.task('rollups.rebuild', every=timedelta(days=1))
+def rebuild_rollups():
+    """Reconcile the rollups with the transaction table (they are otherwise kept current by signals)."""
+    rollups.rebuild()
+
+
+@jobs.task('inbox.recount', every=timedelta(days=1))
+def recount_unread_notifications():
+    """Reconcile the unread counters with the notification table."""
+    inbox.recount()
+
+
+@jobs.task('inbox.archive_read', every=timedelta(days=1))
+def archive_read_notifications():
+    inbox.archive_read()
+
+
+@jobs.task('storage.collect_garbage', every=timedelta(days=1))
+def collect_unreferenced_blobs():
+    """Delete stored document contents no document refers to any more."""
+    storage.collect_garbage()
+
+
+@jobs.task('derivatives.document')
+def build_document_derivatives(document_id):
+    derivatives.build_document(document_id)
+
+
+@jobs.task('derivatives.profile')
+def build_profile_derivatives(user_id):
+    derivatives.build_profile(user_id)
+
+
+@jobs.task('insights.precompute', every=timedelta(hours=1))
+def precompute_insights(days=ACTIVE_USER_DAYS):
+    """Warm the dashboard and trend caches of users who logged in within ``days`` days."""
+    users = User.objects.filter(is_active=True, last_login__gte=timezone.now() - timedelta(days=days))
+    for user in users.iterator():
+        dashboard.get_snapshot(user)
+        insights.get_trends(user)
+
+
+@jobs.task('documents.scan_expiring', every=timedelta(days=1))
+def scan_expiring_documents(days=REMINDER_DAYS, batch_size=REMINDER_BATCH_SIZE):
+    """Notify everyone who can read a document expiring within ``days`` days, once per expiry date."""
+    today = timezone.localdate()
+    due = (Document.objects.filter(expiry_date__gte=today, expiry_date__lte=today + timedelta(days=days))
+           .exclude(expiry_reminded_for=F('expiry_date')))
+    last_pk, sent = None, 0
+    while True:
+        batch = due.order_by('pk') if last_pk is None else due.filter(pk__gt=last_pk).order_by('pk')
+        batch = list(batch.values_list('id', 'group_id', 'name', 'expiry_date')[:batch_size])
+        if not batch:
+            return sent
+        last_pk = batch[-1][0]
+
+        readers = {}
+        memberships = UserGroup.objects.filter(group__in={row[1] for row in batch}).values_list(
+            'group_id', 'user_id', 'permissions', 'user__role')
+        for group_id, user_id, permissions, role in memberships:
+            if access.allows(role, permissions, 'documents'):
+                readers.setdefault(group_id, []).append(user_id)
+
+        notifications = [
+            Notification(user_id=user_id, type='reminder', message=f"Document '{name}' expires on {expiry:%Y-%m-%d}.")
+            for _, group_id, name, expiry in batch
+            for user_id in readers.get(group_id, ())
+        ]
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications)
+            Document.objects.filter(id__in=[row[0] for row in batch]).update(expiry_reminded_for=F('expiry_date'))
+            # bulk_create skips the save signals
+            recipients = Counter(n.user_id for n in notifications)
+            for user_id, count in recipients.items():
+                inbox.adjust(user_id, count)
+        for user_id in recipients:
+            changes.bump_user(user_id)
+        sent += len(notifications)
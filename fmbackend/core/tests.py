@@ -1,3 +1,1136 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import tracemalloc
+import unittest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from fmbackend import database
+from . import (access, anomalies, benchmarks, dashboard, derivatives, exports, inbox, jobs, prices, profiling,
+               rollups, routers, streams, synthetic)
+from .authentication import VERSION_CLAIM, membership_version
+from .models import (User, FamilyGroup, UserGroup, Asset, Transaction, Document, Notification, Job, Blob,
+                     AssetValuation, MonthlyRollup, NotificationCounter, Watermark)
+from .urls import urlpatterns
+from .views import get_tokens_for_user
+
+
+def create_user(username='admin', role='admin'):
+    return User.objects.create_user(username=username, email=f'{username}@example.com', password='pw', role=role)
+
+
+def create_family(permissions, username='admin', role='admin'):
+    """Create a user who administers a "Family" group and holds ``permissions`` in it."""
+    user = create_user(username, role)
+    group = FamilyGroup.objects.create(name='Family', admin=user)
+    UserGroup.objects.create(user=user, group=group, permissions=permissions)
+    return user, group
+
+
+def api_client(user):
+    """An ``APIClient`` sending a JWT access token for ``user``."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_tokens_for_user(user)['access'])
+    return client
+
+
+class KeysetPaginationTests(TestCase):
+    """Transaction pages follow a (date, id) cursor without gaps or repeats, even across equal dates."""
+
+    def setUp(self):
+        admin, group = create_family({'transactions': 'write'})
+        asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('100.00'))
+        tied = datetime(2026, 1, 10, 12, tzinfo=dt_timezone.utc)
+        for i, date in enumerate([tied] * 5 + [tied - timedelta(days=1), tied + timedelta(days=1)]):
+            Transaction.objects.create(asset=asset, group=group, amount=Decimal('-5.00'), description=f'Row {i}',
+                                       category='food' if i % 2 else 'rent', date=date)
+        self.client = api_client(admin)
+
+    def pages(self, query):
+        ids, cursor = [], ''
+        while True:
+            body = self.client.get(f'/api/transactions/?limit=2{query}{cursor}').json()
+            self.assertLessEqual(len(body['results']), 2)
+            ids += [row['id'] for row in body['results']]
+            if body['next_cursor'] is None:
+                return ids
+            cursor = '&cursor=' + body['next_cursor']
+
+    def test_pages_across_ties(self):
+        expected = [str(pk) for pk in Transaction.objects.order_by('-date', '-id').values_list('id', flat=True)]
+        self.assertEqual(self.pages(''), expected)
+        food = Transaction.objects.filter(category='food', date__lt=datetime(2026, 1, 11, tzinfo=dt_timezone.utc))
+        self.assertEqual(self.pages('&category=food&date_to=2026-01-10'),
+                         [str(pk) for pk in food.order_by('-date', '-id').values_list('id', flat=True)])
+
+    def test_bad_parameters(self):
+        for query in ('cursor=nope', 'limit=0', 'limit=ten', 'date_from=yesterday', 'asset=1', 'is_unusual=maybe'):
+            response = self.client.get(f'/api/transactions/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.json())
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must run a constant number of queries regardless of row count."""
+
+    endpoints = ['/api/transactions/', '/api/assets/', '/api/documents/', '/api/notifications/', '/api/dashboard/']
+
+    def setUp(self):
+        self.user = create_user('member', 'family_member')
+        self.client = api_client(self.user)
+
+    def add_rows(self, count):
+        admin = create_user(f'admin{count}')
+        group = FamilyGroup.objects.create(name=f'Family {count}', admin=admin)
+        UserGroup.objects.create(user=self.user, group=group,
+                                 permissions={'assets': 'read', 'transactions': 'read', 'documents': 'read'})
+        now = timezone.now()
+        for i in range(count):
+            asset = Asset.objects.create(group=group, type='bank_account', name=f'Account {i}', value=Decimal('10.00'))
+            Transaction.objects.create(asset=asset, group=group, amount=Decimal('-5.00'), category='food',
+                                       description='Groceries', date=now - timedelta(days=i))
+            Document.objects.create(group=group, name=f'Doc {i}', file='documents/doc.pdf', type='policy')
+            Notification.objects.create(user=self.user, message=f'Alert {i}', type='alert')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_query_count_is_constant(self):
+        self.add_rows(2)
+        small = {url: self.count_queries(url) for url in self.endpoints}
+        self.add_rows(20)
+        large = {url: self.count_queries(url) for url in self.endpoints}
+        self.assertEqual(small, large)
+
+
+class CompactShapeTests(TestCase):
+    """``?shape=compact`` returns flat rows and each referenced asset, group and user once."""
+
+    def setUp(self):
+        admin = create_user()
+        self.assets = []
+        for name in ('Family', 'Business'):
+            group = FamilyGroup.objects.create(name=name, admin=admin)
+            UserGroup.objects.create(user=admin, group=group, permissions={'assets': 'read', 'transactions': 'read'})
+            asset = Asset.objects.create(group=group, type='bank_account', name=name, value=Decimal('100.00'))
+            self.assets.append(asset)
+            for i in range(3):
+                Transaction.objects.create(asset=asset, group=group, amount=Decimal('-5.50'), category='food',
+                                           description='Groceries', date=timezone.now() - timedelta(days=i))
+        self.admin = admin
+        self.client = api_client(admin)
+
+    def test_transactions(self):
+        nested = {row['id']: row for row in self.client.get('/api/transactions/').json()}
+        body = self.client.get('/api/transactions/?shape=compact').json()
+        self.assertEqual(len(body['results']), 6)
+        for row in body['results']:
+            self.assertEqual((row['asset_id'], row['amount']), (nested[row['id']]['asset']['id'], '-5.50'))
+        self.assertEqual(set(body['assets']), {str(asset.id) for asset in self.assets})
+        self.assertEqual(set(body['groups']), {str(asset.group_id) for asset in self.assets})
+        self.assertEqual(list(body['users']), [str(self.admin.id)])
+        self.assertEqual(body['users'][str(self.admin.id)]['email'], 'admin@example.com')
+
+        body = self.client.get('/api/transactions/?shape=compact&limit=2').json()
+        self.assertEqual(len(body['results']), 2)
+        self.assertIsNotNone(body['next_cursor'])
+        self.assertEqual(set(body['assets']), {row['asset_id'] for row in body['results']})
+
+    def test_assets(self):
+        body = self.client.get('/api/assets/?shape=compact').json()
+        self.assertEqual({row['id']: row['value'] for row in body['results']},
+                         {str(asset.id): '100.00' for asset in self.assets})
+        self.assertNotIn('assets', body)
+        self.assertEqual(set(body['groups']), {str(asset.group_id) for asset in self.assets})
+
+    def test_documents(self):
+        UserGroup.objects.filter(user=self.admin).update(permissions={'documents': 'write'})
+        # Serve blobs from elsewhere so a URL built with the wrong storage shows up
+        file_storage = Document._meta.get_field('file').storage
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                mock.patch.object(file_storage, 'base_url', 'https://cdn.example.com/'):
+            response = self.client.post('/api/documents/', {
+                'name': 'Policy', 'type': 'policy', 'file': SimpleUploadedFile('policy.pdf', b'%PDF-1.4 policy'),
+            }, format='multipart')
+            self.assertEqual(response.status_code, 201)
+            Document.objects.update(preview='derivatives/ab/abcd/thumb.webp')
+            full = self.client.get('/api/documents/').json()
+            compact = self.client.get('/api/documents/?shape=compact').json()['results']
+        fields = ('file_url', 'download_url', 'preview')
+        self.assertEqual([{name: row[name] for name in fields} for row in compact],
+                         [{name: row[name] for name in fields} for row in full])
+        self.assertTrue(compact[0]['file_url'].startswith('https://cdn.example.com/blobs/'))
+
+
+class RollupTests(TestCase):
+    """Monthly rollups follow transaction writes, including deletes cascading from assets, groups and users."""
+
+    def setUp(self):
+        self.user = create_user('head', 'family_member')
+        self.group = FamilyGroup.objects.create(name='Family', admin=self.user)
+        self.asset = Asset.objects.create(group=self.group, type='bank_account', name='Checking',
+                                          value=Decimal('100.00'))
+        self.date = datetime(2026, 3, 10, 12, tzinfo=dt_timezone.utc)
+
+    def add(self, amount, category='groceries', asset=None):
+        return Transaction.objects.create(group=self.group, asset=asset or self.asset, amount=Decimal(amount),
+                                          category=category, description='Test', date=self.date)
+
+    def rollups(self):
+        return {(r.month.isoformat(), r.category): (r.income, r.expense, r.count)
+                for r in MonthlyRollup.objects.filter(group=self.group)}
+
+    def test_add_update_delete(self):
+        salary = self.add('1000.00', 'salary')
+        shop = self.add('-40.50')
+        self.add('-9.50')
+        self.assertEqual(self.rollups(), {
+            ('2026-03-01', 'salary'): (Decimal('1000.00'), Decimal('0.00'), 1),
+            ('2026-03-01', 'groceries'): (Decimal('0.00'), Decimal('-50.00'), 2),
+        })
+
+        shop.category, shop.date = None, datetime(2026, 4, 2, tzinfo=dt_timezone.utc)
+        shop.save()
+        salary.delete()
+        self.assertEqual(self.rollups(), {
+            ('2026-03-01', 'salary'): (Decimal('0.00'), Decimal('0.00'), 0),
+            ('2026-03-01', 'groceries'): (Decimal('0.00'), Decimal('-9.50'), 1),
+            ('2026-04-01', ''): (Decimal('0.00'), Decimal('-40.50'), 1),
+        })
+        self.assertEqual(rollups.rebuild([self.group.pk]), 2)
+        self.assertEqual(self.rollups(), {
+            ('2026-03-01', 'groceries'): (Decimal('0.00'), Decimal('-9.50'), 1),
+            ('2026-04-01', ''): (Decimal('0.00'), Decimal('-40.50'), 1),
+        })
+
+    def test_cascading_deletes(self):
+        savings = Asset.objects.create(group=self.group, type='bank_account', name='Savings', value=Decimal('5.00'))
+        self.add('-20.00', asset=savings)
+        self.add('-30.00')
+        savings.delete()
+        self.assertEqual(self.rollups(), {('2026-03-01', 'groceries'): (Decimal('0.00'), Decimal('-30.00'), 1)})
+
+        self.group.delete()
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+        group = FamilyGroup.objects.create(name='Second', admin=self.user)
+        asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('1.00'))
+        Transaction.objects.create(group=group, asset=asset, amount=Decimal('-5.00'), description='Test',
+                                   date=self.date)
+        self.user.delete()
+        self.assertFalse(FamilyGroup.objects.exists())
+        self.assertFalse(MonthlyRollup.objects.exists())
+
+
+class BudgetInsightTests(TestCase):
+    """Budget totals and their month/category breakdowns come from one grouped aggregate."""
+
+    def setUp(self):
+        admin, group = create_family({'transactions': 'read'})
+        asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('100.00'))
+        for amount, category, day in (('1000.00', 'salary', 1), ('-200.00', 'food', 5), ('-50.00', 'food', 20),
+                                      ('-100.00', 'rent', 32)):
+            Transaction.objects.create(asset=asset, group=group, amount=Decimal(amount), category=category,
+                                       description=category,
+                                       date=datetime(2026, 1, 1, 12, tzinfo=dt_timezone.utc) + timedelta(days=day - 1))
+        self.client = api_client(admin)
+
+    def get(self, query=''):
+        body = self.client.get('/api/insights/budget/' + query).json()
+        amounts = ('total_income', 'total_expense', 'recommended_budget')
+        for entry in [body] + body.get('breakdown', []):
+            entry.update({name: Decimal(entry[name]) for name in amounts})
+        return body
+
+    def test_totals(self):
+        body = self.get()
+        self.assertEqual((body['total_income'], body['total_expense'], body['recommended_budget']),
+                         (Decimal('1000'), Decimal('-350'), Decimal('800')))
+
+    def test_breakdowns(self):
+        body = self.get('?period=month')
+        self.assertEqual((body['total_income'], body['total_expense']), (Decimal('1000'), Decimal('-350')))
+        self.assertEqual([(row['month'], row['total_income'], row['total_expense']) for row in body['breakdown']],
+                         [('2026-01', Decimal('1000'), Decimal('-250')), ('2026-02', Decimal('0'), Decimal('-100'))])
+
+        body = self.get('?period=month,category')
+        self.assertEqual([(row['month'], row['category'], row['total_expense']) for row in body['breakdown']],
+                         [('2026-01', 'food', Decimal('-250')), ('2026-01', 'salary', Decimal('0')),
+                          ('2026-02', 'rent', Decimal('-100'))])
+
+        response = self.client.get('/api/insights/budget/?period=decade')
+        self.assertEqual(response.status_code, 400)
+
+
+class GroupPermissionCacheTests(TestCase):
+    """The cached permission map is dropped whenever one of the user's memberships is saved or deleted."""
+
+    def setUp(self):
+        self.user, self.group = create_family({'assets': 'read'}, 'member', 'family_member')
+        self.membership = UserGroup.objects.get(user=self.user)
+        Asset.objects.create(group=self.group, type='bank_account', name='Checking', value=Decimal('10.00'))
+        cache.clear()
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)  # Without the per-request memo
+
+    def test_cached_map(self):
+        self.assertTrue(access.can(self.fresh_user(), self.group, 'assets'))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(access.get_memberships(user), {self.group.pk: {'assets': 'read'}})
+
+    def test_invalidated_on_save_and_delete(self):
+        client = api_client(self.user)
+        self.assertEqual(len(client.get('/api/assets/').json()), 1)
+        self.assertFalse(access.can(self.fresh_user(), self.group, 'assets', 'write'))
+
+        self.membership.permissions = {'assets': 'none'}
+        self.membership.save()
+        self.assertFalse(access.can(self.fresh_user(), self.group, 'assets'))
+        self.assertEqual(client.get('/api/assets/').json(), [])
+
+        self.membership.permissions = {'assets': 'write'}
+        self.membership.save()
+        self.assertTrue(access.can(self.fresh_user(), self.group, 'assets', 'write'))
+
+        self.membership.delete()
+        self.assertEqual(access.get_memberships(self.fresh_user()), {})
+        self.assertEqual(client.get('/api/assets/').status_code, 403)
+
+
+class TokenVersionTests(TestCase):
+    """Tokens stop being served from the user cache once the user or their memberships change."""
+
+    def setUp(self):
+        self.user, _ = create_family({'assets': 'read'}, 'member', 'family_member')
+        cache.clear()
+
+    def get_assets(self, client):
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/assets/')
+        return response.status_code, sum('FROM "core_user"' in q['sql'] for q in ctx.captured_queries)
+
+    def test_membership_change(self):
+        client = api_client(self.user)
+        self.assertEqual(self.get_assets(client), (200, 1))
+        self.assertEqual(self.get_assets(client), (200, 0))  # Served from the user cache
+
+        UserGroup.objects.filter(user=self.user).get().delete()
+        self.assertEqual(self.get_assets(client), (403, 1))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_assets(client)[0], 401)
+
+    def test_refresh_restamps_claims(self):
+        refresh = get_tokens_for_user(self.user)['refresh']
+        User.objects.filter(pk=self.user.pk).update(role='admin')
+        self.user.save(update_fields=['email'])  # Replaces the version stamp
+        response = self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.json()['access'])
+        self.assertEqual(access['role'], 'admin')
+        self.assertEqual(access[VERSION_CLAIM], membership_version(self.user.pk))
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.save(update_fields=['email'])
+        response = self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_uses_user_id_settings(self):
+        # simplejwt rebinds rather than updates its settings on override_settings, so patch the shared instance
+        with mock.patch.object(jwt_settings, 'USER_ID_CLAIM', 'uid'), \
+                mock.patch.object(jwt_settings, 'USER_ID_FIELD', 'username'):
+            refresh = get_tokens_for_user(self.user)['refresh']
+            self.user.save(update_fields=['email'])
+            response = self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['uid'], 'member')
+
+
+class ConditionalGetTests(TestCase):
+    """Polls with a current ETag get 304 without running the view; any write to what they show changes it."""
+
+    def setUp(self):
+        self.user, group = create_family({'assets': 'write', 'transactions': 'write'})
+        self.asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('10.00'))
+        self.notification = Notification.objects.create(user=self.user, message='Hello', type='alert')
+        cache.clear()
+        self.client = api_client(self.user)
+
+    def assert_not_modified(self, url, etag):
+        self.client.get(url)  # Warm the user and permission caches
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['ETag'], len(ctx)), (304, etag, 0))
+
+    def test_not_modified_until_write(self):
+        writes = {
+            '/api/assets/': lambda: self.client.put(f'/api/assets/{self.asset.id}/', {'value': '20.00'},
+                                                    format='json'),
+            '/api/notifications/': lambda: self.client.put(f'/api/notifications/{self.notification.id}/',
+                                                           {'is_read': True}, format='json'),
+            '/api/dashboard/': lambda: Notification.objects.create(user=self.user, message='New', type='alert'),
+        }
+        for url, write in writes.items():
+            etag = self.client.get(url)['ETag']
+            self.assert_not_modified(url, etag)
+            write()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response['ETag'], etag)
+
+
+class DashboardSnapshotTests(TestCase):
+    """Unchanged dashboards come from the cached snapshot; writes move the user to a fresh one."""
+
+    def setUp(self):
+        self.user, self.group = create_family({'assets': 'read', 'transactions': 'read'})
+        self.asset = Asset.objects.create(group=self.group, type='bank_account', name='Checking',
+                                          value=Decimal('10.00'))
+        cache.clear()
+
+    def test_snapshot(self):
+        user = User.objects.get(pk=self.user.pk)
+        first = dashboard.get_snapshot(user)
+        self.assertEqual((first['total_asset_value'], first['recent_transactions'], first['unread_count']),
+                         (Decimal('10.00'), [], 0))
+        with self.assertNumQueries(0):
+            self.assertEqual(dashboard.get_snapshot(user), first)
+
+        Transaction.objects.create(asset=self.asset, group=self.group, amount=Decimal('-5.00'), category='food',
+                                   description='Groceries', date=timezone.now())
+        Notification.objects.create(user=self.user, message='Hello', type='alert')
+        Asset.objects.create(group=self.group, type='bank_account', name='Savings', value=Decimal('5.00'))
+        snapshot = dashboard.get_snapshot(User.objects.get(pk=self.user.pk))
+        self.assertEqual((snapshot['total_asset_value'], len(snapshot['recent_transactions']),
+                          snapshot['unread_count']), (Decimal('15.00'), 1, 1))
+        self.assertEqual(snapshot['notifications'][0]['message'], 'Hello')
+
+
+class TransactionImportTests(TestCase):
+    """CSV, OFX and NDJSON imports validate each row and skip rows that already exist."""
+
+    OFX = b"""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260105120000[0:GMT]<TRNAMT>-12.50<NAME>Coffee</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260110<TRNAMT>100.00<MEMO>Refund</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+    def setUp(self):
+        admin, self.group = create_family({'transactions': 'write'})
+        self.asset = Asset.objects.create(group=self.group, type='bank_account', name='Checking',
+                                          value=Decimal('100.00'))
+        other = FamilyGroup.objects.create(name='Other', admin=admin)
+        self.other_asset = Asset.objects.create(group=other, type='bank_account', name='Theirs', value=Decimal('1'))
+        self.client = api_client(admin)
+
+    def upload(self, content):
+        return self.client.post('/api/transactions/import/', {
+            'file': SimpleUploadedFile('ledger.csv', content, content_type='text/csv'),
+            'asset': str(self.asset.id),
+        }, format='multipart')
+
+    def test_csv(self):
+        content = (
+            'date,amount,description,category,asset\n'
+            '2026-01-05T12:00:00Z,-20.00,Groceries,food,\n'
+            '2026-01-06T12:00:00Z,-8.00,Bus,transport,\n'
+            '2026-01-05T12:00:00Z,-20.00,Groceries,food,\n'
+            '2026-01-07T12:00:00Z,lots,Bad,food,\n'
+            f'2026-01-07T12:00:00Z,-1.00,Elsewhere,food,{self.other_asset.id}\n'
+        ).encode()
+        report = self.upload(content).json()
+        self.assertEqual((report['created'], report['duplicates'], report['error_count']), (2, 1, 2))
+        self.assertEqual([(error['row'], list(error['errors'])) for error in report['errors']],
+                         [(4, ['amount']), (5, ['asset'])])
+        self.assertEqual(MonthlyRollup.objects.get(group=self.group, category='food').expense, Decimal('-20.00'))
+
+        report = self.upload(content).json()
+        self.assertEqual((report['created'], report['duplicates']), (0, 3))
+        self.assertEqual(Transaction.objects.filter(group=self.group).count(), 2)
+
+    def test_raw_bodies(self):
+        url = f'/api/transactions/import/?asset={self.asset.id}'
+        report = self.client.post(url, self.OFX, content_type='application/x-ofx').json()
+        self.assertEqual((report['created'], report['error_count']), (2, 0))
+        self.assertEqual(sorted(Transaction.objects.values_list('description', 'amount')),
+                         [('Coffee', Decimal('-12.50')), ('Refund', Decimal('100.00'))])
+
+        rows = [{'date': '2026-01-05T12:00:00Z', 'amount': '-12.50', 'description': 'Coffee'},
+                {'date': '2026-02-01T09:00:00Z', 'amount': '-3.00', 'description': 'Tea', 'category': 'food'}]
+        body = ''.join(json.dumps(row) + '\n' for row in rows).encode()
+        report = self.client.post(url, body, content_type='application/x-ndjson').json()
+        self.assertEqual((report['created'], report['duplicates']), (1, 1))
+
+        response = self.client.post(url, b'<xml/>', content_type='application/xml')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, b'{"date": ', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+
+
+class TransactionExportTests(TestCase):
+    """Exports stream every visible transaction, oldest first, with the list filters applied."""
+
+    def setUp(self):
+        admin, group = create_family({'transactions': 'read'})
+        asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('100.00'))
+        day = datetime(2026, 1, 5, 12, tzinfo=dt_timezone.utc)
+        self.rows = [
+            Transaction.objects.create(asset=asset, group=group, amount=Decimal('-3.50'), category=None,
+                                       description='Fee', date=day + timedelta(days=1)),
+            Transaction.objects.create(asset=asset, group=group, amount=Decimal('-20.00'), category='food',
+                                       description='Bread, "sourdough"', date=day),
+        ]
+        other = FamilyGroup.objects.create(name='Other', admin=admin)
+        other_asset = Asset.objects.create(group=other, type='bank_account', name='Theirs', value=Decimal('1'))
+        Transaction.objects.create(asset=other_asset, group=other, amount=Decimal('-1.00'), category='food',
+                                   description='Hidden', date=day)
+        self.client = api_client(admin)
+
+    def export(self, query):
+        response = self.client.get('/api/transactions/export/' + query)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.export('')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], list(exports.EXPORT_COLUMNS))
+        self.assertEqual([row[1:] for row in rows[1:]], [
+            ['2026-01-05T12:00:00+00:00', str(self.rows[1].asset_id), str(self.rows[1].group_id), '-20.00', 'food',
+             'Bread, "sourdough"', 'False'],
+            ['2026-01-06T12:00:00+00:00', str(self.rows[0].asset_id), str(self.rows[0].group_id), '-3.50', '',
+             'Fee', 'False'],
+        ])
+        _, body = self.export('?category=food')
+        self.assertEqual([row[0] for row in csv.reader(io.StringIO(body))][1:], [str(self.rows[1].id)])
+
+    def test_ndjson(self):
+        response, body = self.export('?file_format=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(r['id'], r['amount'], r['category']) for r in records],
+                         [(str(self.rows[1].id), '-20.00', 'food'), (str(self.rows[0].id), '-3.50', None)])
+        response = self.client.get('/api/transactions/export/?file_format=xlsx')
+        self.assertEqual(response.status_code, 400)
+
+    @unittest.skipUnless(exports.parquet_available(), "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        response = self.client.get('/api/transactions/export/?file_format=parquet')
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(table.schema.names, list(exports.EXPORT_COLUMNS))
+        self.assertEqual(str(table.schema.field('amount').type), 'decimal128(15, 2)')
+        self.assertEqual(table.to_pylist(), [
+            {'id': str(row.id), 'date': row.date, 'asset_id': str(row.asset_id), 'group_id': str(row.group_id),
+             'amount': row.amount, 'category': row.category, 'description': row.description, 'is_unusual': False}
+            for row in reversed(self.rows)
+        ])
+        response = self.client.get('/api/transactions/export/?file_format=parquet&date_from=2999-01-01')
+        empty = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual((empty.num_rows, empty.schema), (0, table.schema))
+
+    def test_bounded_memory(self):
+        # A scaled-down benchmark_export: quadrupling the ledger must not grow the peak Python allocation
+        # while streaming, since only one chunk of rows is held at a time.
+        group, asset = self.rows[0].group, self.rows[0].asset
+        peaks = {}
+        for rows in (exports.CHUNK_SIZE, 3 * exports.CHUNK_SIZE):
+            benchmarks.add_transactions(group, asset, rows)
+            for file_format in ('csv', 'ndjson'):
+                response = self.client.get('/api/transactions/export/', {'file_format': file_format})
+                tracemalloc.start()
+                try:
+                    size = sum(len(chunk) for chunk in response.streaming_content)
+                    peaks.setdefault(file_format, []).append(tracemalloc.get_traced_memory()[1])
+                finally:
+                    tracemalloc.stop()
+                self.assertGreater(size, rows * 100)
+        for file_format, (small, large) in peaks.items():
+            self.assertLess(large, small * 1.5, file_format)
+
+
+class UnusualTransactionTests(TestCase):
+    """Batch scoring flags outliers and only rescores rows added since the last run."""
+
+    def setUp(self):
+        admin = create_user()
+        self.group = FamilyGroup.objects.create(name='Family', admin=admin)
+        self.asset = Asset.objects.create(group=self.group, type='bank_account', name='Checking', value=Decimal('0'))
+        self.noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        for i in range(30):
+            self.add(Decimal(-45 - i % 10), days_ago=60 - i)
+
+    def add(self, amount, days_ago):
+        return Transaction.objects.create(asset=self.asset, group=self.group, amount=amount, category='food',
+                                          description='Groceries', date=self.noon - timedelta(days=days_ago))
+
+    def test_flags_outliers_incrementally(self):
+        outlier = self.add(Decimal('-2000.00'), days_ago=10)
+        self.assertEqual(anomalies.score_new(), {'scored': 31, 'unusual': 1, 'changed': 1})
+        self.assertEqual(list(Transaction.objects.filter(is_unusual=True)), [outlier])
+
+        self.add(Decimal('-50.00'), days_ago=5)
+        # The new row, plus every row within OVERLAP of the watermark (here all of them)
+        self.assertEqual(anomalies.score_new()['scored'], 32)
+        self.assertEqual(Transaction.objects.filter(is_unusual=True).count(), 1)
+        self.assertEqual(anomalies.rescore()['changed'], 0)
+
+    def test_late_commit(self):
+        anomalies.score_new()
+        watermark = Watermark.objects.get(name=anomalies.WATERMARK).value
+        # Inserted before the run's watermark was taken, but committed after the run
+        late = self.add(Decimal('-2000.00'), days_ago=10)
+        Transaction.objects.filter(pk=late.pk).update(created_at=watermark - timedelta(minutes=1))
+        Transaction.objects.exclude(pk=late.pk).update(created_at=watermark - anomalies.OVERLAP - timedelta(minutes=1))
+
+        self.assertEqual(anomalies.score_new(), {'scored': 1, 'unusual': 1, 'changed': 1})
+        self.assertEqual(list(Transaction.objects.filter(is_unusual=True)), [late])
+
+
+@jobs.task('tests.flaky')
+def flaky(fail_times):
+    if Job.objects.get(task='tests.flaky').attempts <= fail_times:
+        raise RuntimeError("flaky")
+
+
+class JobTests(TestCase):
+    """Queued jobs run once, failures back off and retry, expiry reminders fan out once."""
+
+    def test_failed_jobs_retry_with_backoff(self):
+        job = jobs.enqueue('tests.flaky', max_attempts=2, fail_times=1)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_heartbeat_keeps_long_jobs_claimed(self):
+        jobs.enqueue('tests.flaky', fail_times=0)
+        jobs.enqueue('tests.flaky', fail_times=0)
+        alive, lost = jobs.claim('worker', 2)
+        Job.objects.update(claimed_at=timezone.now() - jobs.STALE_AFTER - timedelta(minutes=1))
+        self.assertEqual(jobs.heartbeat([alive]), 1)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(dict(Job.objects.values_list('pk', 'status')), {alive.pk: 'running', lost.pk: 'queued'})
+
+        # Once requeued and claimed by another worker, the old claim no longer refreshes it
+        jobs.claim('other', 1)
+        self.assertEqual(jobs.heartbeat([lost]), 0)
+
+    def test_expiring_documents_notify_readers_once(self):
+        admin = create_user()
+        reader = create_user('reader', 'family_member')
+        outsider = create_user('outsider', 'family_member')
+        group = FamilyGroup.objects.create(name='Family', admin=admin)
+        UserGroup.objects.create(user=reader, group=group, permissions={'documents': 'read'})
+        UserGroup.objects.create(user=outsider, group=group, permissions={'documents': 'none'})
+        today = timezone.localdate()
+        Document.objects.create(group=group, name='Policy', file='documents/p.pdf', type='policy',
+                                expiry_date=today + timedelta(days=10))
+        Document.objects.create(group=group, name='Will', file='documents/w.pdf', type='will',
+                                expiry_date=today + timedelta(days=90))
+
+        for _ in range(2):
+            jobs.enqueue('documents.scan_expiring')
+            jobs.run_pending()
+        self.assertEqual(list(Notification.objects.values_list('user', 'type')), [(reader.pk, 'reminder')])
+        self.assertTrue(Job.objects.filter(task='documents.scan_expiring', status='queued',
+                                           run_at__gt=timezone.now()).exists())
+
+
+class NotificationStreamTests(TestCase):
+    """The SSE stream pushes new notifications and resumes after Last-Event-ID."""
+
+    def setUp(self):
+        self.user = create_user('member', 'family_member')
+        self.token = get_tokens_for_user(self.user)['access']
+        patcher = mock.patch.object(streams.hub, 'interval', 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def read(self, response):
+        return (await anext(response.streaming_content)).decode()
+
+    async def test_pushes_and_resumes(self):
+        create = sync_to_async(Notification.objects.create)
+        await create(user=self.user, message='Old', type='alert')
+        client = AsyncClient()
+
+        response = await client.get('/api/notifications/stream/', {'token': self.token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue((await self.read(response)).startswith('retry:'))
+        await create(user=self.user, message='New', type='alert')
+        frame = await self.read(response)
+        self.assertIn('"message":"New"', frame)
+        await response.streaming_content.aclose()
+
+        last_event_id = frame.split('\n')[0].removeprefix('id: ')
+        await create(user=self.user, message='Missed', type='alert')
+        response = await client.get('/api/notifications/stream/', {'token': self.token},
+                                    headers={'Last-Event-ID': last_event_id})
+        await self.read(response)
+        frame = await self.read(response)
+        self.assertIn('"message":"Missed"', frame)
+        self.assertNotIn('"message":"New"', frame)
+        await response.streaming_content.aclose()
+
+    async def test_late_commit(self):
+        def create_late(message, before):
+            # A row whose created_at was taken before ``before`` was inserted, but that committed after it
+            notification = Notification.objects.create(user=self.user, message=message, type='alert')
+            Notification.objects.filter(pk=notification.pk).update(created_at=before.created_at - timedelta(seconds=1))
+
+        create = sync_to_async(Notification.objects.create)
+        response = await AsyncClient().get('/api/notifications/stream/', {'token': self.token})
+        await self.read(response)
+        new = await create(user=self.user, message='New', type='alert')
+        await self.read(response)
+        await sync_to_async(create_late)('Late', new)
+        frame = await self.read(response)
+        self.assertIn('"message":"Late"', frame)
+        self.assertNotIn('"message":"New"', frame)
+        await create(user=self.user, message='After', type='alert')
+        frame = await self.read(response)
+        self.assertIn('"message":"After"', frame)
+        self.assertNotIn('"message":"Late"', frame)
+        await response.streaming_content.aclose()
+
+    async def test_rejects_missing_token(self):
+        response = await AsyncClient().get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncViewTests(TestCase):
+    """Under ASGI the read-heavy endpoints are served by the async views with identical responses."""
+
+    endpoints = ['/api/dashboard/', '/api/assets/', '/api/assets/?shape=compact', '/api/transactions/?limit=2',
+                 '/api/transactions/?shape=compact', '/api/insights/budget/?period=month',
+                 '/api/insights/budget/?period=month,category', '/api/insights/budget/?period=decade',
+                 '/api/insights/trends/']
+
+    def setUp(self):
+        self.admin, group = create_family({'assets': 'read', 'transactions': 'read'})
+        asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('100.00'))
+        for i in range(3):
+            Transaction.objects.create(asset=asset, group=group, amount=Decimal('-5.00'), category='food',
+                                       description='Groceries', date=timezone.now() - timedelta(days=i))
+        Transaction.objects.create(asset=asset, group=group, amount=Decimal('250.00'), category='salary',
+                                   description='Pay', date=timezone.now() - timedelta(days=40))
+        self.token = 'Bearer ' + get_tokens_for_user(self.admin)['access']
+
+    async def test_matches_sync_views(self):
+        sync_client = APIClient()
+        sync_client.credentials(HTTP_AUTHORIZATION=self.token)
+        for url in self.endpoints:
+            cache.clear()
+            expected = await sync_to_async(sync_client.get)(url)
+            self.assertNotIn(expected.content, (b'[]', b'{"results":[]}'), url)
+            cache.clear()
+            response = await AsyncClient().get(url, headers={'Authorization': self.token})
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content), url)
+
+    async def test_authentication_errors_match(self):
+        expired = AccessToken.for_user(self.admin)
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        for authorization in (None, 'Bearer nope', f'Bearer {expired}', 'Bearer two parts'):
+            headers = {'Authorization': authorization} if authorization else {}
+            expected = await sync_to_async(APIClient().get)('/api/dashboard/', headers=headers)
+            response = await AsyncClient().get('/api/dashboard/', headers=headers)
+            self.assertEqual(response.status_code, 401, authorization)
+            self.assertEqual((response.status_code, response.content, response['WWW-Authenticate']),
+                             (expected.status_code, expected.content, expected['WWW-Authenticate']), authorization)
+
+
+class NotificationBulkTests(TestCase):
+    """Bulk operations are single statements and keep the unread counter exact."""
+
+    def setUp(self):
+        self.user = create_user('member')
+        self.client = api_client(self.user)
+        Notification.objects.bulk_create(
+            Notification(user=self.user, message=f'Alert {i}', type='alert' if i % 2 else 'reminder')
+            for i in range(10))
+        Notification.objects.create(user=self.user, message='Read', type='alert', is_read=True)
+        self.assertEqual(inbox.unread_count(self.user.pk), 10)
+
+    def test_bulk_mark_and_delete(self):
+        # User, savepoint, notification UPDATE, counter UPDATE, release, counter read
+        with self.assertNumQueries(6):
+            response = self.client.put('/api/notifications/bulk/', {'type': 'alert'}, format='json')
+        self.assertEqual(response.data, {'updated': 5, 'unread_count': 5})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.delete('/api/notifications/bulk/', {'is_read': True}, format='json')
+        self.assertEqual(response.data, {'deleted': 6, 'unread_count': 5})
+        # One DELETE per read state, each filtered in SQL; no ids are read first
+        notification_sql = [q['sql'] for q in ctx.captured_queries if 'core_notification"' in q['sql']]
+        self.assertEqual([sql.split()[0] for sql in notification_sql], ['DELETE', 'DELETE'])
+        self.assertIn('"user_id" = ', notification_sql[0])
+        Notification.objects.filter(is_read=False).first().delete()
+        self.assertEqual(self.client.get('/api/dashboard/').data['unread_count'], 4)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 4)
+
+    def test_delete_user_with_unread(self):
+        self.user.delete()
+        self.assertFalse(NotificationCounter.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+
+class NotificationRetentionTests(TestCase):
+    """Old read notifications move to the archive; unread and recent ones stay."""
+
+    def test_archive_read(self):
+        user = create_user('member', 'family_member')
+        old = timezone.now() - timedelta(days=inbox.RETENTION_DAYS + 1)
+        for is_read in (True, True, False):
+            Notification.objects.create(user=user, message='Old', type='alert', is_read=is_read)
+        Notification.objects.create(user=user, message='New', type='alert', is_read=True)
+        Notification.objects.filter(message='Old').update(created_at=old)
+
+        self.assertEqual(inbox.archive_read(batch_size=1), 2)
+        self.assertEqual(sorted(Notification.objects.values_list('message', 'is_read')),
+                         [('New', True), ('Old', False)])
+        client = api_client(user)
+        response = client.get('/api/notifications/archive/')
+        self.assertEqual([row['message'] for row in response.data['results']], ['Old', 'Old'])
+
+
+class DocumentStorageTests(TestCase):
+    """Identical uploads share one stored blob and preview; downloads honour Range and ETag."""
+
+    def test_duplicate_uploads_share_a_blob(self):
+        user, _ = create_family({'documents': 'write'})
+        client = api_client(user)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            for name in ('a.pdf', 'b.pdf'):
+                response = client.post('/api/documents/', {
+                    'name': name, 'type': 'policy', 'file': SimpleUploadedFile(name, b'%PDF-1.4 policy'),
+                }, format='multipart')
+                self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(set(Document.objects.values_list('file', flat=True))), 1)
+            self.assertEqual(list(Blob.objects.values_list('ref_count', flat=True)), [2])
+            Document.objects.first().delete()
+            self.assertEqual(list(Blob.objects.values_list('ref_count', flat=True)), [1])
+
+    def test_upload_size_cap(self):
+        user, group = create_family({'documents': 'write', 'transactions': 'write'})
+        asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('10.00'))
+        client = api_client(user)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                mock.patch('core.storage.MAX_UPLOAD_SIZE', 1024), mock.patch('core.serializers.MAX_UPLOAD_SIZE', 1024):
+            response = client.post('/api/documents/', {
+                'name': 'big.pdf', 'type': 'policy', 'file': SimpleUploadedFile('big.pdf', b'x' * 4096),
+            }, format='multipart')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('file', response.json())
+            self.assertFalse(Document.objects.exists())
+
+            # Other uploads are not capped
+            rows = ''.join(f'2026-01-01T12:00:00Z,-{i}.00,Row {i},food,\n' for i in range(1, 201))
+            response = client.post('/api/transactions/import/', {
+                'file': SimpleUploadedFile('ledger.csv', ('date,amount,description,category,asset\n' + rows).encode()),
+                'asset': str(asset.id),
+            }, format='multipart')
+            self.assertEqual((response.json()['created'], response.json()['error_count']), (200, 0))
+
+    def test_ranged_download(self):
+        user, group = create_family({'documents': 'read'})
+        client = api_client(user)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            document = Document.objects.create(group=group, name='Scan', type='policy',
+                                               file=SimpleUploadedFile('scan.pdf', b'0123456789'))
+            url = f'/api/documents/{document.id}/download/'
+            response = client.get(url, HTTP_RANGE='bytes=2-4')
+            self.assertEqual((response.status_code, response['Content-Range']), (206, 'bytes 2-4/10'))
+            self.assertEqual(b''.join(response.streaming_content), b'234')
+            self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+            self.assertEqual(client.get(url, HTTP_RANGE='bytes=10-').status_code, 416)
+
+    def test_image_previews_are_cached_by_content(self):
+        user = create_user()
+        group = FamilyGroup.objects.create(name='Family', admin=user)
+        image = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(image, 'JPEG')
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            for name in ('front.jpg', 'copy.jpg'):
+                document = Document.objects.create(group=group, name=name, type='policy',
+                                                   file=SimpleUploadedFile(name, image.getvalue()))
+                derivatives.build_document(document.pk)
+            previews = set(Document.objects.values_list('preview', flat=True))
+            self.assertEqual(len(previews), 1)
+            with Image.open(os.path.join(media_root, previews.pop())) as preview:
+                self.assertEqual(preview.size, (derivatives.THUMBNAIL_SIZE, 171))
+
+
+class NetWorthTests(TestCase):
+    """Value changes are recorded, carried forward per bucket and summed across assets."""
+
+    def setUp(self):
+        admin, group = create_family({'assets': 'write'})
+        self.house = Asset.objects.create(group=group, type='property', name='House', value=Decimal('1000.00'))
+        self.bank = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('50.00'))
+        AssetValuation.objects.update(recorded_at=datetime(2026, 1, 10, tzinfo=dt_timezone.utc))
+        self.client = api_client(admin)
+
+    def test_monthly_series(self):
+        self.client.put(f'/api/assets/{self.house.id}/', {'name': 'Home'}, format='json')
+        response = self.client.put(f'/api/assets/{self.house.id}/', {'value': '1200.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AssetValuation.objects.filter(asset=self.house).count(), 2)
+        AssetValuation.objects.filter(asset=self.house, value=Decimal('1200.00')).update(
+            recorded_at=datetime(2026, 3, 5, tzinfo=dt_timezone.utc))
+
+        response = self.client.get('/api/insights/net-worth/?interval=month&start=2026-02-01&end=2026-04-30')
+        self.assertEqual(response.json()['results'], [
+            {'date': '2026-02-01', 'net_worth': '1050.00'},
+            {'date': '2026-03-01', 'net_worth': '1250.00'},
+            {'date': '2026-04-01', 'net_worth': '1250.00'},
+        ])
+        response = self.client.get('/api/insights/net-worth/?start=2026-01-01&end=2026-04-30&points=5')
+        self.assertEqual(len(response.json()['results']), 5)
+        response = self.client.get('/api/insights/net-worth/?interval=year')
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_without_end(self):
+        etag = self.client.get('/api/insights/net-worth/')['ETag']
+        response = self.client.get('/api/insights/net-worth/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # The open-ended series gains a bucket tomorrow, so yesterday's ETag must not match
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=1)):
+            response = self.client.get('/api/insights/net-worth/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PROFILING_SERVER_TIMING=True)
+class ProfilingTests(TestCase):
+    """Responses carry Server-Timing; slow and sampled requests are logged with their top queries."""
+
+    def setUp(self):
+        user, group = create_family({'assets': 'read'}, 'u', 'family_member')
+        Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('10.00'))
+        cache.clear()
+        self.client = api_client(user)
+
+    @override_settings(PROFILING_SLOW_MS=None)
+    def test_server_timing(self):
+        with self.assertNoLogs('core.profiling'):
+            response = self.client.get('/api/assets/')
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'auth;dur=', 'access;dur=', 'serialize;dur=', 'view;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+        with override_settings(PROFILING_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get('/api/assets/'))
+
+    @override_settings(PROFILING_SLOW_MS=0, PROFILING_SAMPLE_RATE=1)
+    def test_slow_request_log(self):
+        with self.assertLogs('core.profiling', 'WARNING') as logs:
+            response = self.client.get('/api/assets/')
+        self.assertIn('mem;desc="peak', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['method'], record['path'], record['status']), ('GET', '/api/assets/', 200))
+        self.assertEqual(record['queries'], sum(q['count'] for q in record['top_queries']))
+        self.assertTrue(any('core_asset' in q['sql'] for q in record['top_queries']))
+        self.assertGreater(record['peak_kb'], 0)
+        self.assertIn('cumulative', record['profile'])
+        self.assertIsNone(profiling.current())
+
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, as real quote APIs
+    quotes = {'AAPL': '200.125', 'CHK': '1500.5', 'ZIP': '10', 'CHUNK': '20', 'CLOSE': '30', 'CUT': '40'}
+    requests = []
+
+    def do_GET(self):
+        symbol = parse_qs(urlsplit(self.path).query)['symbol'][0]
+        self.requests.append(symbol)
+        body = json.dumps({'data': {'price': self.quotes[symbol]}} if symbol in self.quotes else {}).encode()
+        if symbol == 'MOVED':
+            self.send_response(302)
+            self.send_header('Location', '/quote?symbol=ZIP')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200 if symbol in self.quotes else 404)
+        self.send_header('Content-Type', 'application/json')
+        if symbol == 'ZIP':
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        if symbol == 'CHUNK':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for part in (body[:5], body[5:]):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(part), part))
+            self.wfile.write(b'0\r\n\r\n')
+        elif symbol == 'CLOSE':  # Body delimited by closing the connection
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(body)
+            self.close_connection = True
+        elif symbol == 'CUT':  # Closed before the promised body was sent
+            self.send_header('Content-Length', str(len(body) + 100))
+            self.end_headers()
+            self.wfile.write(body)
+            self.close_connection = True
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PriceRefreshTests(TestCase):
+    """Each distinct quote is fetched once from the stub server and cached; assets are revalued in bulk."""
+
+    def setUp(self):
+        cache.clear()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), QuoteHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        QuoteHandler.requests = []
+        admin = create_user()
+        self.assets = []
+        for i in range(3):
+            group = FamilyGroup.objects.create(name=f'Family {i}', admin=admin)
+            self.assets.append(Asset.objects.create(group=group, type='security', name='Apple', value=0,
+                                                    api_source='stocks:AAPL', units=Decimal(i + 1)))
+        self.assets.append(Asset.objects.create(group=group, type='bank_account', name='Checking', value=0,
+                                                api_source='stocks:CHK'))
+        self.assets.append(Asset.objects.create(group=group, type='security', name='Gone', value=7,
+                                                api_source='stocks:GONE', units=1))
+
+    def test_refresh(self):
+        url = f'http://127.0.0.1:{self.server.server_port}/quote?symbol={{symbol}}'
+        with override_settings(PRICE_SOURCES={'stocks': {'url': url, 'field': 'data.price', 'rate': 100}}):
+            result = prices.refresh()
+            self.assertEqual(sorted(QuoteHandler.requests), ['AAPL', 'CHK', 'GONE'])
+            self.assertEqual(result, {'assets': 5, 'quotes': 2, 'fetched': 2, 'updated': 4})
+            values = list(Asset.objects.order_by('name', 'units').values_list('value', flat=True))
+            self.assertEqual(values, [Decimal('200.13'), Decimal('400.25'), Decimal('600.38'), Decimal('1500.50'), 7])
+            self.assertEqual(AssetValuation.objects.filter(asset=self.assets[2]).count(), 2)
+
+            result = prices.refresh()
+            self.assertEqual((result['fetched'], result['updated'], len(QuoteHandler.requests)), (0, 0, 4))
+
+    def test_response_framing(self):
+        url = f'http://127.0.0.1:{self.server.server_port}/quote?symbol={{symbol}}'
+        with override_settings(PRICE_SOURCES={'stocks': {'url': url, 'field': 'data.price', 'connections': 2}}), \
+                self.assertLogs('core.prices', 'WARNING') as logs:
+            quotes, fetched = prices.get_quotes([('stocks', symbol) for symbol in
+                                                 ('ZIP', 'CHUNK', 'CLOSE', 'MOVED', 'CUT', 'GONE')], use_cache=False)
+        self.assertEqual({symbol: price for (_, symbol), price in quotes.items()},
+                         {'ZIP': 10, 'CHUNK': 20, 'CLOSE': 30, 'MOVED': 10})
+        self.assertEqual(fetched, 4)
+        self.assertEqual(sorted(record.getMessage().split()[2] for record in logs.records),
+                         ['stocks:CUT', 'stocks:GONE'])
+
+
+class ReadRoutingTests(TransactionTestCase):
+    """Reads of GET requests use the query-only read connection; writes and transactions stay on default."""
+    databases = {'default', 'read'}
+
+    def setUp(self):
+        user, group = create_family({'assets': 'write'}, 'u', 'family_member')
+        self.asset = Asset.objects.create(group=group, type='bank_account', name='Checking', value=Decimal('10.00'))
+        cache.clear()
+        self.client = api_client(user)
+
+    def test_routing(self):
+        with CaptureQueriesContext(connections['default']) as writes, \
+                CaptureQueriesContext(connections['read']) as reads:
+            response = self.client.get('/api/assets/')
+        self.assertEqual(response.json()[0]['name'], 'Checking')
+        self.assertGreater(len(reads), 0)
+        self.assertEqual(len(writes), 0)
+
+        with CaptureQueriesContext(connections['read']) as reads:
+            response = self.client.put(f'/api/assets/{self.asset.id}/', {'name': 'Savings'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(reads), 0)
+
+        with routers.reading():
+            self.assertEqual(Asset.objects.all().db, 'read')
+            with transaction.atomic():
+                self.assertEqual(Asset.objects.all().db, 'default')
+
+    def test_pragmas(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -database.CACHE_SIZE_KB)
+        with self.assertRaises(OperationalError):
+            Asset.objects.using('read').update(name='Changed')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SyntheticDataTests(TransactionTestCase):
+    """A seed reproduces the same dataset, and the endpoint suite covers every route on it."""
+    databases = {'default', 'read'}  # Outside a transaction, GETs read through the mirrored read alias
+
+    options = {'families': 4, 'transactions': 500, 'documents': 2, 'notifications': 5, 'seed': 3,
+               'end': datetime(2026, 6, 1, tzinfo=dt_timezone.utc)}
+
+    def test_generate_and_profile(self):
+        ledgers = []
+        for _ in range(2):
+            with transaction.atomic():
+                counts = synthetic.generate(**self.options)
+                ledgers.append(list(Transaction.objects.order_by('id').values_list('id', 'group', 'amount', 'date')))
+                transaction.set_rollback(True)
+        self.assertEqual(counts['transactions'], 500)
+        self.assertEqual(ledgers[0], ledgers[1])
+
+        cache.clear()
+        synthetic.generate(**self.options)
+        results = benchmarks.profile_endpoints(benchmarks.endpoint_requests(seed=3), repeat=1)
+        routes = {re.sub(r'<[^>]+>', '<id>', '/api/' + str(p.pattern)) for p in urlpatterns}
+        covered = {label.split()[1].split('?')[0] for label in results}
+        self.assertEqual(routes - covered, {'/api/notifications/stream/'})
+        for label, result in results.items():
+            if label.startswith('GET') and label != 'GET /api/':
+                self.assertEqual(result['status'], 200, label)
@@ -2,8 +2,10 @@ from django.urls import path
 from .views import (
     index, RefreshTokenView, LoginView, RegisterUserView, UserDetailView,
     FamilyGroupListView, UserGroupPermissionsView, AssetListView, AssetDetailView,
-    DashboardView, TransactionListView, DocumentListView, DocumentDetailView,
-    NotificationListView, NotificationUpdateView, BudgetInsightView, TrendInsightView
+    DashboardView, TransactionListView, TransactionImportView, TransactionExportView,
+    DocumentListView, DocumentDetailView, DocumentDownloadView,
+    NotificationListView, NotificationArchiveListView, NotificationStreamView, NotificationBulkView,
+    NotificationUpdateView, BudgetInsightView, TrendInsightView, NetWorthView
 )
 
 urlpatterns = [
@@ -31,16 +33,23 @@ urlpatterns = [
     
     # Transaction routes
     path('transactions/', TransactionListView.as_view(), name='transaction_list'),
+    path('transactions/import/', TransactionImportView.as_view(), name='transaction_import'),
+    path('transactions/export/', TransactionExportView.as_view(), name='transaction_export'),
     
     # Document routes
     path('documents/', DocumentListView.as_view(), name='document_list'),
     path('documents/<uuid:id>/', DocumentDetailView.as_view(), name='document_detail'),
+    path('documents/<uuid:id>/download/', DocumentDownloadView.as_view(), name='document_download'),
     
     # Notification routes
     path('notifications/', NotificationListView.as_view(), name='notification_list'),
+    path('notifications/archive/', NotificationArchiveListView.as_view(), name='notification_archive'),
+    path('notifications/stream/', NotificationStreamView.as_view(), name='notification_stream'),
+    path('notifications/bulk/', NotificationBulkView.as_view(), name='notification_bulk'),
     path('notifications/<uuid:id>/', NotificationUpdateView.as_view(), name='notification_update'),
     
     # AI-driven insight routes
     path('insights/budget/', BudgetInsightView.as_view(), name='budget_insight'),
     path('insights/trends/', TrendInsightView.as_view(), name='trend_insight'),
+    path('insights/net-worth/', NetWorthView.as_view(), name='net_worth_insight'),
 ]
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""Asset valuation history and the net-worth time series.
+
+Every change of an asset's value appends an ``AssetValuation`` row (see
+``core.signals``; bulk writers call ``record`` themselves). Rows are only
+written when the value actually changes, so the history stays as small as
+the number of real revaluations.
+
+``series`` buckets the history by day, week or month in SQL: a window
+function keeps each asset's last value per bucket, and valuations before the
+requested start fold into the first bucket as the opening balance. numpy
+then carries each asset's value forward through buckets without a change,
+sums across assets in integer cents and, for a requested point count,
+downsamples with Largest-Triangle-Three-Buckets (LTTB), which keeps the
+peaks and troughs a plain stride would drop.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import DateField, F, Min, Value
+from django.db.models.functions import Greatest, RowNumber, Trunc
+from django.db.models.expressions import Window
+from django.utils import timezone
+
+from .models import AssetValuation
+from . import profiling
+
+INTERVALS = ('day', 'week', 'month')
+MIN_POINTS = 3
+MAX_POINTS = 5000
+
+
+def record(assets, recorded_at=None):
+    """Append the current value of each of ``assets`` to the history."""
+    recorded_at = recorded_at or timezone.now()
+    return AssetValuation.objects.bulk_create([
+        AssetValuation(asset_id=a.pk, group_id=a.group_id, recorded_at=recorded_at, value=a.value)
+        for a in assets
+    ])
+
+
+def parse_interval(value):
+    """Bucket size from ``?interval=`` (default ``day``); raises ``ValueError`` for unknown ones."""
+    interval = value or 'day'
+    if interval not in INTERVALS:
+        raise ValueError("interval must be 'day', 'week' or 'month'")
+    return interval
+
+
+def parse_points(value):
+    """Point count from ``?points=`` (``None`` keeps every bucket); raises ``ValueError`` when out of range."""
+    if value in (None, ''):
+        return None
+    try:
+        points = int(value)
+    except ValueError:
+        raise ValueError('points must be an integer')
+    if not MIN_POINTS <= points <= MAX_POINTS:
+        raise ValueError(f'points must be between {MIN_POINTS} and {MAX_POINTS}')
+    return points
+
+
+def _bucket_of(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday, as TruncWeek does
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(bucket, interval):
+    if interval == 'week':
+        return bucket + timedelta(weeks=1)
+    if interval == 'month':
+        return date(bucket.year + bucket.month // 12, bucket.month % 12 + 1, 1)
+    return bucket + timedelta(days=1)
+
+
+def buckets(start, end, interval):
+    """Start dates of the ``interval`` buckets from ``start`` up to and including ``end``."""
+    bucket, last, result = _bucket_of(start, interval), _bucket_of(end, interval), []
+    while bucket <= last:
+        result.append(bucket)
+        bucket = _next_bucket(bucket, interval)
+    return result
+
+
+def last_values(group_ids, interval, start, end):
+    """``(asset_id, bucket, value)`` for each asset's last valuation per bucket, ordered by asset and bucket.
+
+    Valuations before ``start`` are counted in the first bucket, so each
+    asset's opening value comes from the same query.
+    """
+    at = Greatest(F('recorded_at'), Value(start))
+    bucket = Trunc(at, interval, output_field=DateField())
+    return (
+        AssetValuation.objects.filter(group__in=group_ids, recorded_at__lt=end)
+        .annotate(bucket=bucket, rank=Window(
+            RowNumber(),
+            partition_by=[F('asset_id'), bucket],
+            order_by=[F('recorded_at').desc(), F('id').desc()],
+        ))
+        .filter(rank=1)
+        .order_by('asset_id', 'bucket')
+        .values_list('asset_id', 'bucket', 'value')
+    )
+
+
+def lttb(y, threshold):
+    """Indexes of the ``threshold`` points of ``y`` kept by Largest-Triangle-Three-Buckets."""
+    n = len(y)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_hi = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        # Twice the area of the triangle (previous pick, candidate, next bucket's average)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def as_of(params):
+    """Today's local date when ``params`` leave ``end`` open, as the series then runs up to now; else ``''``."""
+    return '' if params.get('end') else timezone.localdate().isoformat()
+
+
+def series(group_ids, interval='day', start=None, end=None, points=None):
+    """Net worth of ``group_ids`` at the end of each bucket, as ``[{'date', 'net_worth'}]``."""
+    end = end or timezone.now()
+    if start is None:
+        start = AssetValuation.objects.filter(group__in=group_ids).aggregate(first=Min('recorded_at'))['first']
+        if start is None or start >= end:
+            return []
+    dates = buckets(timezone.localdate(start), timezone.localdate(end - timedelta(microseconds=1)), interval)
+    index = {d: i for i, d in enumerate(dates)}
+
+    rows = list(last_values(group_ids, interval, start, end))
+    if not rows:
+        return []
+    with profiling.span('compute'):
+        positions = np.fromiter((index[r[1]] for r in rows), dtype=np.int64, count=len(rows))
+        cents = np.fromiter((int(r[2] * 100) for r in rows), dtype=np.int64, count=len(rows))
+
+        # Each row changes its asset's level by the difference from the asset's previous row
+        deltas = cents.copy()
+        same_asset = np.fromiter((a[0] == b[0] for a, b in zip(rows[1:], rows)), dtype=bool, count=len(rows) - 1)
+        deltas[1:][same_asset] -= cents[:-1][same_asset]
+        totals = np.zeros(len(dates), dtype=np.int64)
+        np.add.at(totals, positions, deltas)
+        totals = np.cumsum(totals)
+
+        keep = lttb(totals.astype(np.float64), points) if points else np.arange(len(dates))
+    return [
+        {'date': dates[i].isoformat(), 'net_worth': str(Decimal(int(totals[i])).scaleb(-2))}
+        for i in keep.tolist()
+    ]
@@ -2,23 +2,37 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import status
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
-from decimal import Decimal
-import pandas as pd  # Required for AI insights
-from .models import User, FamilyGroup, UserGroup, Asset, Transaction, Document, Notification
+from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from asgiref.sync import sync_to_async
+import csv
+import os
+from .models import User, FamilyGroup, UserGroup, Asset, Transaction, Document, Notification, NotificationArchive
+from .filters import filter_notifications, filter_transactions, parse_range
+from .pagination import KeysetPagination, NotificationPagination
+from .queryplan import optimize_queryset
+from . import (access, changes, compact, dashboard, downloads, exports, imports, inbox, insights, storage, streams,
+               valuations)
+from .authentication import CachedJWTAuthentication, VERSION_CLAIM, authenticate_request, membership_version
 from .serializers import (
     UserSerializer, FamilyGroupSerializer, UserGroupSerializer, AssetSerializer,
     TransactionSerializer, DocumentSerializer, NotificationSerializer,
-    UserGroupUpdateSerializer, DocumentUpdateSerializer, NotificationUpdateSerializer, LoginSerializer
+    UserGroupUpdateSerializer, DocumentUpdateSerializer, NotificationUpdateSerializer,
+    NotificationSelectionSerializer, NotificationBulkUpdateSerializer, LoginSerializer
 )
 
 # Custom token generation function
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
     refresh['role'] = user.role  # Add role to token payload
+    refresh[VERSION_CLAIM] = membership_version(user.pk)  # Lets CachedJWTAuthentication skip the user lookup
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -36,17 +50,29 @@ class RefreshTokenView(APIView):
             return Response({"error": "Refresh token required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
             refresh = RefreshToken(refresh_token)
-            access_token = str(refresh.access_token)
-            return Response({'access': access_token}, status=status.HTTP_200_OK)
+            access = refresh.access_token
         except Exception:
             return Response({"error": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
+        # Re-stamp claims that may have changed since the refresh token was issued
+        user_id = refresh.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return Response({"error": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
+        version = membership_version(user_id)
+        if refresh.get(VERSION_CLAIM) != version:
+            lookup = {api_settings.USER_ID_FIELD: user_id, 'is_active': True}
+            user = User.objects.filter(**lookup).only('role').first()
+            if user is None:
+                return Response({"error": "Invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
+            access['role'] = user.role
+        access[VERSION_CLAIM] = version
+        return Response({'access': str(access)}, status=status.HTTP_200_OK)
 
 # Custom Permission for Group Access
 class HasGroupPermission(IsAuthenticated):
     def has_permission(self, request, view):
         if not super().has_permission(request, view):
             return False
-        return request.user.role == 'admin' or UserGroup.objects.filter(user=request.user).exists()
+        return request.user.role == 'admin' or bool(access.get_memberships(request.user))
 
 # Authentication Views
 class LoginView(APIView):
@@ -66,7 +92,7 @@ class LoginView(APIView):
 class RegisterUserView(APIView):
     """Register a new user (admin only)."""
     permission_classes = [IsAdminUser]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request):
         serializer = UserSerializer(data=request.data)
@@ -79,7 +105,7 @@ class RegisterUserView(APIView):
 class UserDetailView(APIView):
     """Get or update user details."""
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get(self, request, id):
         user = get_object_or_404(User, id=id)
@@ -102,7 +128,7 @@ class UserDetailView(APIView):
 class FamilyGroupListView(APIView):
     """List or create family groups."""
     permission_classes = [IsAdminUser]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get(self, request):
         groups = FamilyGroup.objects.all()
@@ -120,7 +146,7 @@ class FamilyGroupListView(APIView):
 class UserGroupPermissionsView(APIView):
     """Update user permissions in a group."""
     permission_classes = [IsAdminUser]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def put(self, request, group_id):
         group = get_object_or_404(FamilyGroup, id=group_id)
@@ -136,37 +162,43 @@ class UserGroupPermissionsView(APIView):
 class AssetListView(APIView):
     """List or create assets."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
+    @changes.conditional_get(lambda request: (access.group_ids(request.user, 'assets'), ()))
     def get(self, request):
-        user_groups = UserGroup.objects.filter(user=request.user)
-        assets = Asset.objects.filter(group__in=[ug.group for ug in user_groups])
+        assets = Asset.objects.filter(group__in=access.group_ids(request.user, 'assets'))
+        if compact.wants_compact(request):
+            rows = compact.finalize(assets.values(*compact.ASSET_FIELDS))
+            return Response({'results': rows, **compact.side_load(rows)})
+        assets = optimize_queryset(assets, AssetSerializer)
         serializer = AssetSerializer(assets, many=True)
         return Response(serializer.data)
 
     def post(self, request):
         serializer = AssetSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            group = UserGroup.objects.filter(user=request.user).first().group
-            serializer.save(group=group)
+            group_ids = access.group_ids(request.user, 'assets', 'write')
+            if not group_ids:
+                return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+            serializer.save(group_id=group_ids[0])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class AssetDetailView(APIView):
     """Get or update an asset."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get(self, request, id):
         asset = get_object_or_404(Asset, id=id)
-        if not self._has_permission(request.user, asset.group):
+        if not self._has_permission(request.user, asset.group_id):
             return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
         serializer = AssetSerializer(asset)
         return Response(serializer.data)
 
     def put(self, request, id):
         asset = get_object_or_404(Asset, id=id)
-        if not self._has_permission(request.user, asset.group, 'write'):
+        if not self._has_permission(request.user, asset.group_id, 'write'):
             return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
         serializer = AssetSerializer(asset, data=request.data, partial=True)
         if serializer.is_valid():
@@ -175,87 +207,170 @@ class AssetDetailView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def _has_permission(self, user, group, permission='read'):
-        user_group = UserGroup.objects.filter(user=user, group=group).first()
-        if not user_group or user_group.permissions.get('assets', 'none') == 'none':
-            return False
-        return user.role == 'admin' or user_group.permissions.get('assets') in [permission, 'write']
+        return access.can(user, group, 'assets', permission)
 
 # Dashboard View
 class DashboardView(APIView):
     """Fetch aggregated data for the dashboard."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
+    @changes.conditional_get(lambda request: dashboard.dependencies(request.user))
     def get(self, request):
-        user_groups = UserGroup.objects.filter(user=request.user)
-        groups = [ug.group for ug in user_groups]
-        
-        assets = Asset.objects.filter(group__in=groups).aggregate(total_value=Sum('value'))
-        transactions = Transaction.objects.filter(group__in=groups)
-        notifications = Notification.objects.filter(user=request.user, is_read=False)
-        
-        data = {
-            'total_asset_value': assets['total_value'] or Decimal('0.00'),
-            'recent_transactions': TransactionSerializer(transactions[:5], many=True).data,
-            'notifications': NotificationSerializer(notifications, many=True).data
-        }
-        return Response(data)
+        return Response(dashboard.get_snapshot(request.user))
 
 # Transaction Views
 class TransactionListView(APIView):
     """List or create transactions."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get(self, request):
-        user_groups = UserGroup.objects.filter(user=request.user)
-        transactions = Transaction.objects.filter(group__in=[ug.group for ug in user_groups])
+        transactions = Transaction.objects.filter(group__in=access.group_ids(request.user, 'transactions'))
+        transactions = filter_transactions(transactions, request.query_params)
+
+        # Opt-in keyset pagination: ?limit=N and/or ?cursor=<next_cursor>
+        paginator = KeysetPagination()
+        # ?shape=compact: flat rows with foreign-key ids plus side-loaded references
+        if compact.wants_compact(request):
+            rows = transactions.values(*compact.TRANSACTION_FIELDS)
+            if paginator.is_requested(request):
+                rows = compact.finalize(paginator.paginate_queryset(rows, request, view=self))
+                return paginator.get_paginated_response(rows, **compact.side_load(rows, with_assets=True))
+            rows = compact.finalize(rows)
+            return Response({'results': rows, **compact.side_load(rows, with_assets=True)})
+
+        transactions = optimize_queryset(transactions, TransactionSerializer)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(transactions, request, view=self)
+            serializer = TransactionSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
         serializer = TransactionSerializer(transactions, many=True)
         return Response(serializer.data)
 
     def post(self, request):
         serializer = TransactionSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            group = UserGroup.objects.filter(user=request.user).first().group
-            serializer.save(group=group)
+            group_ids = access.group_ids(request.user, 'transactions', 'write')
+            if not group_ids:
+                return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+            serializer.save(group_id=group_ids[0])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class TransactionImportView(APIView):
+    """Bulk import transactions from a CSV, OFX, JSON or NDJSON file.
+
+    Send the file as the ``file`` field of a multipart upload, or as the raw
+    request body with a matching Content-Type. ``asset`` (form field or query
+    parameter) is used for rows without an asset column.
+    """
+    permission_classes = [HasGroupPermission]
+    authentication_classes = [CachedJWTAuthentication]
+    parser_classes = [MultiPartParser]  # Raw bodies are read from request.stream, unparsed
+
+    def post(self, request):
+        content_type = request.content_type.split(';')[0].strip().lower()
+        if content_type == 'multipart/form-data':
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({"error": "A file is required."}, status=status.HTTP_400_BAD_REQUEST)
+            file_format = request.data.get('file_format') or imports.detect_format(upload.name)
+            stream = upload
+            asset = request.data.get('asset') or request.query_params.get('asset')
+        else:
+            file_format = request.query_params.get('file_format') or imports.CONTENT_TYPES.get(content_type)
+            stream = request.stream
+            asset = request.query_params.get('asset')
+
+        reader = imports.READERS.get(file_format)
+        if reader is None or stream is None:
+            return Response({"error": "Upload a CSV, OFX, JSON or NDJSON file."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        importer = imports.TransactionImporter(request.user, default_asset=asset)
+        try:
+            report = importer.run(reader(stream))
+        except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+            return Response({"error": f"Could not parse file: {exc}", **importer.report()},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK)
+
+class TransactionExportView(APIView):
+    """Stream the transaction ledger as CSV, NDJSON or Parquet.
+
+    ``?file_format=`` picks the format (default CSV); the transaction list
+    filters apply.
+    """
+    permission_classes = [HasGroupPermission]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in exports.STREAMERS:
+            return Response({"error": "file_format must be csv, ndjson or parquet"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if file_format == 'parquet' and not exports.parquet_available():
+            return Response({"error": "Parquet export requires pyarrow"}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        transactions = Transaction.objects.filter(group__in=access.group_ids(request.user, 'transactions'))
+        transactions = filter_transactions(transactions, request.query_params).order_by('date', 'id')
+
+        response = StreamingHttpResponse(exports.STREAMERS[file_format](transactions),
+                                         content_type=exports.CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="transactions.{file_format}"'
+        return response
+
 # Document Views
 class DocumentListView(APIView):
     """List or upload documents."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Only document uploads are hashed for the blob storage and capped at MAX_UPLOAD_SIZE
+        storage.use_upload_handlers(request)
+        return super().initialize_request(request, *args, **kwargs)
 
     def get(self, request):
-        user_groups = UserGroup.objects.filter(user=request.user)
-        documents = Document.objects.filter(group__in=[ug.group for ug in user_groups])
+        documents = Document.objects.filter(group__in=access.group_ids(request.user, 'documents'))
+        search = request.query_params.get('search')
+        if search:
+            # Matches the name or the text extracted from the file (see core.derivatives)
+            documents = documents.filter(Q(name__icontains=search) | Q(extracted_text__text__icontains=search))
+        if compact.wants_compact(request):
+            rows = compact.add_file_urls(list(documents.values(*compact.DOCUMENT_FIELDS)), request)
+            return Response({'results': rows, **compact.side_load(rows)})
+        documents = optimize_queryset(documents, DocumentSerializer)
         serializer = DocumentSerializer(documents, many=True, context={'request': request})
         return Response(serializer.data)
 
     def post(self, request):
         serializer = DocumentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            group = UserGroup.objects.filter(user=request.user).first().group
-            serializer.save(group=group)
+            group_ids = access.group_ids(request.user, 'documents', 'write')
+            if not group_ids:
+                return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+            serializer.save(group_id=group_ids[0])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class DocumentDetailView(APIView):
     """Get or update a document."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get(self, request, id):
         document = get_object_or_404(Document, id=id)
-        if not self._has_permission(request.user, document.group):
+        if not self._has_permission(request.user, document.group_id):
             return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
         serializer = DocumentSerializer(document, context={'request': request})
         return Response(serializer.data)
 
     def put(self, request, id):
         document = get_object_or_404(Document, id=id)
-        if not self._has_permission(request.user, document.group, 'write'):
+        if not self._has_permission(request.user, document.group_id, 'write'):
             return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
         serializer = DocumentUpdateSerializer(document, data=request.data, partial=True)
         if serializer.is_valid():
@@ -264,26 +379,87 @@ class DocumentDetailView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def _has_permission(self, user, group, permission='read'):
-        user_group = UserGroup.objects.filter(user=user, group=group).first()
-        if not user_group or user_group.permissions.get('documents', 'none') == 'none':
-            return False
-        return user.role == 'admin' or user_group.permissions.get('documents') in [permission, 'write']
+        return access.can(user, group, 'documents', permission)
+
+class DocumentDownloadView(DocumentDetailView):
+    """Download a document's file (supports Range, ETag and Last-Modified; ?download=1 for an attachment)."""
+    http_method_names = ['get', 'head', 'options']
+
+    def get(self, request, id):
+        document = get_object_or_404(Document.objects.only('group_id', 'name', 'file'), id=id)
+        if not self._has_permission(request.user, document.group_id):
+            return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+        extension = os.path.splitext(document.file.name)[1]
+        filename = document.name if document.name.lower().endswith(extension) else document.name + extension
+        response = downloads.serve(request, document.file, filename,
+                                   as_attachment=request.query_params.get('download') in ('1', 'true'))
+        if response is None:
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        return response
 
 # Notification Views
 class NotificationListView(APIView):
     """List notifications for the user."""
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
+    @changes.conditional_get(lambda request: ((), [request.user.pk]))
     def get(self, request):
-        notifications = Notification.objects.filter(user=request.user)
+        notifications = filter_notifications(Notification.objects.filter(user=request.user), request.query_params)
+        notifications = optimize_queryset(notifications, NotificationSerializer)
+
+        # Opt-in keyset pagination: ?limit=N and/or ?cursor=<next_cursor>
+        paginator = NotificationPagination()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(notifications, request, view=self)
+            return paginator.get_paginated_response(NotificationSerializer(page, many=True).data)
+
         serializer = NotificationSerializer(notifications, many=True)
         return Response(serializer.data)
 
+class NotificationArchiveListView(APIView):
+    """List the user's archived notifications, newest first (always paginated)."""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedJWTAuthentication]
+
+    @changes.conditional_get(lambda request: ((), [request.user.pk]))
+    def get(self, request):
+        archived = NotificationArchive.objects.filter(user=request.user)
+        type = request.query_params.get('type')
+        if type:
+            archived = archived.filter(type=type)
+        paginator = NotificationPagination()
+        page = paginator.paginate_queryset(archived.values('id', 'message', 'type', 'created_at', 'archived_at'),
+                                           request, view=self)
+        return paginator.get_paginated_response(page)
+
+class NotificationStreamView(View):
+    """Push new notifications as server-sent events (ASGI only; resumes from Last-Event-ID)."""
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # A WSGI worker would buffer the endless stream instead of sending it
+            return JsonResponse({"error": "The notification stream is only served over ASGI (fmbackend.asgi)."},
+                                status=status.HTTP_501_NOT_IMPLEMENTED)
+        user = await sync_to_async(authenticate_request)(request, token_param='token')
+        if user is None:
+            return JsonResponse({"error": "Authentication credentials were not provided or are invalid."},
+                                status=status.HTTP_401_UNAUTHORIZED)
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            cursor = NotificationPagination().decode_cursor(last_event_id) if last_event_id else None
+        except ValidationError:
+            return JsonResponse({"error": "Invalid Last-Event-ID."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(streams.events(user, cursor), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+        return response
+
 class NotificationUpdateView(APIView):
     """Mark a notification as read."""
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def put(self, request, id):
         notification = get_object_or_404(Notification, id=id, user=request.user)
@@ -293,38 +469,76 @@ class NotificationUpdateView(APIView):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class NotificationBulkView(APIView):
+    """Mark many notifications read/unread or delete them, each in a single statement.
+
+    The body selects the user's notifications by ``ids``, ``type``, ``before``
+    (created before a timestamp) and, for deletes, ``is_read``; with no filter
+    it applies to all of them. ``put`` sets ``is_read`` (default true).
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def put(self, request):
+        serializer = NotificationBulkUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        is_read = serializer.validated_data.pop('is_read')
+        updated = inbox.mark(request.user, inbox.select(request.user, **serializer.validated_data), is_read)
+        return Response({'updated': updated, 'unread_count': inbox.unread_count(request.user.pk)})
+
+    def delete(self, request):
+        serializer = NotificationSelectionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        deleted = inbox.delete(request.user, inbox.select(request.user, **serializer.validated_data))
+        return Response({'deleted': deleted, 'unread_count': inbox.unread_count(request.user.pk)})
+
 # AI-Driven Insights Views
 class BudgetInsightView(APIView):
     """Get budget recommendations."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get(self, request):
-        user_groups = UserGroup.objects.filter(user=request.user)
-        transactions = Transaction.objects.filter(group__in=[ug.group for ug in user_groups])
-        
-        total_income = transactions.filter(amount__gt=0).aggregate(Sum('amount'))['amount__sum'] or 0
-        total_expense = transactions.filter(amount__lt=0).aggregate(Sum('amount'))['amount__sum'] or 0
-        budget_recommendation = total_income * Decimal('0.8')
-        
-        return Response({
-            'total_income': str(total_income),
-            'total_expense': str(total_expense),
-            'recommended_budget': str(budget_recommendation)
-        })
+        try:
+            period = insights.parse_period(request.query_params.get('period'))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        transactions = insights.budget_transactions(access.group_ids(request.user, 'transactions'))
+        if not period:
+            totals = transactions.aggregate(**insights.BUDGET_SUMS)
+            return Response(insights.budget(totals['income'], totals['expense']))
+        return Response(insights.budget_breakdown(insights.budget_rows(transactions, period)))
 
 class TrendInsightView(APIView):
     """Get expense trends."""
     permission_classes = [HasGroupPermission]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def get(self, request):
+        trends = insights.get_trends(request.user)
+        if trends is None:
+            return Response({"message": "No transactions available"})
+        return Response(trends)
+
+class NetWorthView(APIView):
+    """Get the net worth of the user's groups over time."""
+    permission_classes = [HasGroupPermission]
+    authentication_classes = [CachedJWTAuthentication]
 
+    @changes.conditional_get(lambda request: (access.group_ids(request.user, 'assets'), ()),
+                             extra=lambda request: valuations.as_of(request.query_params))
     def get(self, request):
-        user_groups = UserGroup.objects.filter(user=request.user)
-        transactions = Transaction.objects.filter(group__in=[ug.group for ug in user_groups])
-        
-        df = pd.DataFrame(list(transactions.values('date', 'amount', 'category')))
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-            monthly_trends = df.groupby([df['date'].dt.to_period('M'), 'category'])['amount'].sum().unstack().fillna(0)
-            return Response(monthly_trends.to_dict())
-        return Response({"message": "No transactions available"})
\ No newline at end of file
+        try:
+            interval = valuations.parse_interval(request.query_params.get('interval'))
+            points = valuations.parse_points(request.query_params.get('points'))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        start, end = parse_range(request.query_params)
+        group_ids = access.group_ids(request.user, 'assets')
+        return Response({
+            'interval': interval,
+            'results': valuations.series(group_ids, interval, start, end, points),
+        })
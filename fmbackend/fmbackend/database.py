@@ -0,0 +1,63 @@
+"""SQLite settings for serving concurrent requests.
+
+``sqlite_database`` builds a ``DATABASES`` entry whose connections run
+``PRAGMAS`` as they open (Django's ``init_command`` option):
+
+- WAL journaling, so readers never wait for a writer and a writer only
+  waits for other writers.
+- ``synchronous=NORMAL``. In WAL mode this is still crash-safe; a power
+  loss can only roll back the last transactions, and commits skip an fsync.
+- A memory-mapped file and a larger page cache, so that hot pages are read
+  without a system call.
+
+Write transactions begin ``IMMEDIATE``: they take the write lock up front
+and wait up to ``BUSY_TIMEOUT`` seconds for it. A deferred transaction that
+reads and then writes would instead fail at once with "database is locked"
+when another writer got there first.
+
+Connections are kept for ``CONN_MAX_AGE`` seconds instead of one per
+request. Health checks are on, so a connection that broke while idle is
+replaced before a request uses it. SQLite's own check always passes, but
+the setting carries over unchanged to a server database.
+
+A ``read_only`` entry opens the same file with ``query_only``; see
+``core.routers`` for which queries it serves. Under tests it mirrors
+``default``.
+"""
+BUSY_TIMEOUT = 20
+CONN_MAX_AGE = 600
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KB = 32 * 1024  # Per connection
+JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024  # Truncate the WAL back to this after checkpoints
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': MMAP_SIZE,
+    'cache_size': -CACHE_SIZE_KB,  # Negative values are in KiB rather than pages
+    'temp_store': 'MEMORY',
+    'journal_size_limit': JOURNAL_SIZE_LIMIT,
+}
+# The journal mode is a property of the file, which the read-write connections set
+READ_PRAGMAS = {**{k: v for k, v in PRAGMAS.items() if k != 'journal_mode'}, 'query_only': 'ON'}
+
+
+def init_command(pragmas):
+    return '; '.join(f'PRAGMA {name} = {value}' for name, value in pragmas.items())
+
+
+def sqlite_database(name, read_only=False):
+    """A ``DATABASES`` entry for the SQLite file ``name``."""
+    options = {'timeout': BUSY_TIMEOUT, 'init_command': init_command(READ_PRAGMAS if read_only else PRAGMAS)}
+    if not read_only:
+        options['transaction_mode'] = 'IMMEDIATE'
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': options,
+    }
+    if read_only:
+        config['TEST'] = {'MIRROR': 'default'}
+    return config
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 
+from .database import sqlite_database
+
 from django.conf import settings
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',  # First, so its timings cover the rest
+    'core.middleware.read_routing_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.async_routing_middleware',  # ASGI requests use the async views
 ]
 
 ROOT_URLCONF = 'fmbackend.urls'
@@ -79,10 +84,27 @@ WSGI_APPLICATION = 'fmbackend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# WAL, pragmas and persistent connections (see fmbackend/database.py). Reads of GET requests use
+# the query-only 'read' connection to the same file (see core/routers.py).
 DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
+    'read': sqlite_database(BASE_DIR / 'db.sqlite3', read_only=True),
+}
+DATABASE_ROUTERS = ['core.routers.ReadRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# File-based so that invalidations (e.g. group permission changes) are seen by
+# every worker process on the host.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
@@ -128,7 +150,7 @@ STATIC_URL = 'static/'
 AUTH_USER_MODEL='core.User'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SIMPLE_JWT = {
-    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=20),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": False,
@@ -171,9 +193,37 @@ REST_FRAMEWORK = {
    
     'DEFAULT_AUTHENTICATION_CLASSES': (
         
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     )
    
 }
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Let the web server send document downloads: 'X-Accel-Redirect' (nginx, with an
+# internal location at DOCUMENT_SENDFILE_PREFIX aliased to MEDIA_ROOT) or 'X-Sendfile'
+DOCUMENT_SENDFILE_HEADER = None
+DOCUMENT_SENDFILE_PREFIX = '/protected-media/'
+# Quote sources for assets with api_source = '<source>:<symbol>' (see core/prices.py for the options)
+PRICE_SOURCES = {}
+# Request profiling (core/profiling.py): a Server-Timing header on every response, cProfile and
+# tracemalloc on a sampled fraction of requests, and slow or sampled requests logged as JSON lines.
+# The header exposes query counts and timings to clients, so it is only on in development by default.
+PROFILING_SERVER_TIMING = DEBUG
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_SLOW_MS = 500
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'slow-requests.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.profiling': {'handlers': ['slow_requests'], 'level': 'INFO', 'propagate': False},
+    },
+}
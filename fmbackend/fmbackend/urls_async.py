@@ -0,0 +1,18 @@
+"""URL configuration used for ASGI requests (see core.middleware).
+
+The read-heavy endpoints go to their async variants in ``core.async_views``;
+every other route is the same as in ``fmbackend.urls``.
+"""
+from django.urls import path
+
+from core import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/assets/', async_views.AssetListView.as_view(), name='asset_list'),
+    path('api/dashboard/', async_views.DashboardView.as_view(), name='dashboard'),
+    path('api/transactions/', async_views.TransactionListView.as_view(), name='transaction_list'),
+    path('api/insights/budget/', async_views.BudgetInsightView.as_view(), name='budget_insight'),
+    path('api/insights/trends/', async_views.TrendInsightView.as_view(), name='trend_insight'),
+] + sync_urlpatterns